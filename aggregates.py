@@ -0,0 +1,291 @@
+from heapq import heappush, heappop
+from collections import Counter
+from math import sqrt
+from animal import Sex
+
+class RunningStat:
+	"""
+	Running count, mean and variance of a changing multiset of values
+
+	Uses Welford's update, extended to removals, so every change is O(1).
+	Minimum and maximum are kept in lazily pruned heaps when track_extrema
+	is set, which is only worth it for values that rarely change. Heaps are
+	only pruned by the writer, so a Tracker thread can read min and max
+	while the world is stepping.
+	"""
+
+	def __init__(self, track_extrema: bool = False):
+		"""
+		Initializes the RunningStat
+
+		Args:
+			track_extrema (bool): Also keep the minimum and maximum
+		"""
+
+		self.count = 0
+		self.mean = 0.0
+		self._m2 = 0.0
+
+		self._track_extrema = track_extrema
+		self._low = []
+		self._high = []
+		# Removed values still sitting in each heap
+		self._removed_low = Counter()
+		self._removed_high = Counter()
+
+	def add(self, value: float) -> None:
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self._m2 += delta * (value - self.mean)
+
+		if self._track_extrema:
+			heappush(self._low, value)
+			heappush(self._high, -value)
+
+	def remove(self, value: float) -> None:
+		self.count -= 1
+		if self.count <= 0:
+			self.count = 0
+			self.mean = 0.0
+			self._m2 = 0.0
+		else:
+			delta = value - self.mean
+			self.mean -= delta / self.count
+			self._m2 = max(self._m2 - delta * (value - self.mean), 0.0)
+
+		if self._track_extrema:
+			if self.count == 0:
+				self._low.clear()
+				self._high.clear()
+				self._removed_low.clear()
+				self._removed_high.clear()
+			else:
+				self._removed_low[value] += 1
+				self._removed_high[value] += 1
+				self._prune()
+
+	def replace(self, old: float, new: float) -> None:
+		"""
+		Replaces one value by another, e.g. after an animal got hungrier
+
+		Args:
+			old (float): Value that was added before
+			new (float): Value taking its place
+		"""
+
+		delta = new - old
+		old_mean = self.mean
+		self.mean += delta / self.count
+		self._m2 = max(self._m2 + delta * (new - self.mean + old - old_mean), 0.0)
+
+		if self._track_extrema:
+			self._removed_low[old] += 1
+			self._removed_high[old] += 1
+			heappush(self._low, new)
+			heappush(self._high, -new)
+			self._prune()
+
+	@property
+	def variance(self) -> float:
+		"""Population variance, 0 when empty"""
+		return self._m2 / self.count if self.count else 0.0
+
+	@property
+	def std(self) -> float:
+		return sqrt(self.variance)
+
+	@property
+	def min(self) -> float:
+		"""Smallest value, 0 when empty"""
+		return self._peek(self._low, 1)
+
+	@property
+	def max(self) -> float:
+		"""Largest value, 0 when empty"""
+		return self._peek(self._high, -1)
+
+	def _peek(self, heap: [float], sign: int) -> float:
+		if not self._track_extrema:
+			raise ValueError("extrema are not tracked")
+		try:
+			return sign*heap[0]
+		except IndexError:
+			return 0.0
+
+	def _prune(self) -> None:
+		"""
+		Drops removed values from the top of both heaps
+		"""
+
+		for heap, removed, sign in ((self._low, self._removed_low, 1), (self._high, self._removed_high, -1)):
+			while heap and removed[sign*heap[0]] > 0:
+				removed[sign*heap[0]] -= 1
+				heappop(heap)
+
+class LinearDecayStat:
+	"""
+	Running count, mean and variance of values that each fall at their own constant rate
+
+	Keeps the sums of the values as of an origin step together with sums over
+	their rates, so the aggregates at any later step follow in O(1) without
+	touching the values. The writer moves the origin up to the current step
+	on every change, which keeps the sums small.
+	"""
+
+	def __init__(self, clock):
+		"""
+		Initializes the LinearDecayStat
+
+		Args:
+			clock (callable): Returns the current step
+		"""
+
+		self.count = 0
+		self._clock = clock
+		self._origin = 0
+		self._sum = 0.0
+		self._sum_sq = 0.0
+		self._sum_rate = 0.0
+		self._sum_rate_sq = 0.0
+		self._sum_cross = 0.0
+
+	def add(self, value: float, rate: float) -> None:
+		"""
+		Args:
+			value (float): Current value
+			rate (float): Decrease per step
+		"""
+
+		self._rebase()
+		self.count += 1
+		self._sum += value
+		self._sum_sq += value*value
+		self._sum_rate += rate
+		self._sum_rate_sq += rate*rate
+		self._sum_cross += value*rate
+
+	def remove(self, value: float, rate: float) -> None:
+		"""
+		Args:
+			value (float): Current value of the leaving member
+			rate (float): Its decrease per step
+		"""
+
+		self._rebase()
+		self.count -= 1
+		if self.count <= 0:
+			self.count = 0
+			self._sum = self._sum_sq = self._sum_rate = self._sum_rate_sq = self._sum_cross = 0.0
+			return
+		self._sum -= value
+		self._sum_sq -= value*value
+		self._sum_rate -= rate
+		self._sum_rate_sq -= rate*rate
+		self._sum_cross -= value*rate
+
+	def replace(self, old: float, new: float, rate: float) -> None:
+		"""
+		Replaces the current value of a member, e.g. after an animal ate
+
+		Args:
+			old (float): Its current value
+			new (float): Its value from now on
+			rate (float): Its decrease per step
+		"""
+
+		self._rebase()
+		self._sum += new - old
+		self._sum_sq += new*new - old*old
+		self._sum_cross += (new - old)*rate
+
+	@property
+	def mean(self) -> float:
+		"""Mean at the current step, 0 when empty"""
+		if not self.count:
+			return 0.0
+		return (self._sum - (self._clock() - self._origin)*self._sum_rate) / self.count
+
+	@property
+	def variance(self) -> float:
+		"""Population variance at the current step, 0 when empty"""
+		count = self.count
+		if not count:
+			return 0.0
+		elapsed = self._clock() - self._origin
+		mean = (self._sum - elapsed*self._sum_rate) / count
+		sum_sq = self._sum_sq - 2*elapsed*self._sum_cross + elapsed*elapsed*self._sum_rate_sq
+		return max(sum_sq / count - mean*mean, 0.0)
+
+	@property
+	def std(self) -> float:
+		return sqrt(self.variance)
+
+	def _rebase(self) -> None:
+		"""
+		Moves the origin to the current step
+		"""
+
+		now = self._clock()
+		elapsed = now - self._origin
+		if elapsed:
+			self._sum_sq += elapsed*(elapsed*self._sum_rate_sq - 2*self._sum_cross)
+			self._sum_cross -= elapsed*self._sum_rate_sq
+			self._sum -= elapsed*self._sum_rate
+			self._origin = now
+
+class PopulationStats:
+	"""Running aggregates over all animals of one species"""
+
+	def __init__(self, clock):
+		"""
+		Initializes the PopulationStats
+
+		Args:
+			clock (callable): Returns the current world step, hunger and thirst fall with it
+		"""
+
+		self.hunger = LinearDecayStat(clock)
+		self.thirst = LinearDecayStat(clock)
+		self.speed = RunningStat(track_extrema=True)
+		self.size = RunningStat(track_extrema=True)
+		self.male_count = 0
+		self.female_count = 0
+
+	@property
+	def count(self) -> int:
+		return self.speed.count
+
+	def add(self, animal) -> None:
+		"""
+		Accounts for an animal that was born or spawned
+
+		Args:
+			animal (Animal): The new animal
+		"""
+
+		self.hunger.add(animal.hunger, animal.hunger_rate())
+		self.thirst.add(animal.thirst, animal.thirst_rate())
+		self.speed.add(animal.speed)
+		self.size.add(animal.size)
+		if animal.sex == Sex.MALE:
+			self.male_count += 1
+		else:
+			self.female_count += 1
+
+	def remove(self, animal) -> None:
+		"""
+		Accounts for an animal that died
+
+		Args:
+			animal (Animal): The dead animal
+		"""
+
+		self.hunger.remove(animal.hunger, animal.hunger_rate())
+		self.thirst.remove(animal.thirst, animal.thirst_rate())
+		self.speed.remove(animal.speed)
+		self.size.remove(animal.size)
+		if animal.sex == Sex.MALE:
+			self.male_count -= 1
+		else:
+			self.female_count -= 1
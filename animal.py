@@ -1,11 +1,16 @@
 from worldtools import *
+from water import Water
 from enum import Enum
+from itertools import count
 from math import sin, cos, pi
 from random import uniform
 from random import choice
 from random import randint
 import time
 
+HUNGER_THRESHOLD = 50
+THIRST_THRESHOLD = 50
+
 class State(Enum):
 	ROAM = 0
 	REPRODUCE = 1
@@ -15,9 +20,86 @@ class Sex(Enum):
 	MALE = 0
 	FEMALE = 1
 
+class Intent(Enum):
+	MOVE = 0
+	EAT = 1
+	MATE = 2
+	DRINK = 3
+	GRAZE = 4
+
+class Action:
+	"""Decision of an animal for one step, applied by the world in the commit phase"""
+
+	__slots__ = ("animal", "intent", "pos", "movement_angle", "target", "other", "distance", "sighted")
+
+	def __init__(self, animal, pos: (float, float), target=None, intent: Intent = Intent.MOVE, other=None,
+			dist: float = 0.0, movement_angle: float = None, sighted: bool = None):
+		"""
+		Initializes the Action
+
+		Args:
+			animal (Animal): The deciding animal
+			pos ( (float, float) ): Position after the step
+			target (object): Target to keep chasing after the step
+			intent (Intent): What the animal does once there
+			other (object): Food, prey or partner the intent applies to
+			dist (float): Distance to other when deciding, used to settle conflicts
+			movement_angle (float): New roaming angle, None keeps the current one
+			sighted (bool): Whether anything was in sight, None if the animal did not look
+		"""
+
+		self.animal = animal
+		self.pos = pos
+		self.target = target
+		self.intent = intent
+		self.other = other
+		self.distance = dist
+		self.movement_angle = movement_angle
+		self.sighted = sighted
+
+# Ids only need to be unique within a process, see reserve_ids
+_ids = count()
+
+def reserve_ids(start: int, step: int = 1) -> None:
+	"""
+	Makes new animals take ids start, start + step, ...
+
+	Lets several processes create animals without id clashes.
+
+	Args:
+		start (int): First id
+		step (int): Distance between ids
+	"""
+
+	global _ids
+	_ids = count(start, step)
+
 class Animal:
 	"""Class representing Animal in the world"""
 
+	__slots__ = (
+		"id", "speed", "pos", "world", "sex", "size", "sight",
+		"target", "movement_angle",
+		"_hunger", "eat_count", "_food_checkpoint",
+		"_thirst", "drink_count", "_water_checkpoint",
+		"_meter_tick", "state", "stats", "pace",
+	)
+
+	# Attributes carried when an animal moves to another process, the rest is rebuilt there
+	_EXPORTED = (
+		"id", "speed", "pos", "sex", "size", "sight", "movement_angle",
+		"hunger", "eat_count", "_food_checkpoint",
+		"thirst", "drink_count", "_water_checkpoint",
+		"state",
+	)
+
+	# Hunger restored by a meal and meals needed before reproducing
+	FOOD_VALUE = 30
+	MEALS_TO_REPRODUCE = 2
+	# Thirst restored by a drink and drinks needed before reproducing
+	WATER_VALUE = 30
+	DRINKS_TO_REPRODUCE = 2
+
 	def __init__(self, world, pos: (float, float), speed: float):
 		"""
 		Initializes the Animal
@@ -26,10 +108,13 @@ class Animal:
 			world (World): The world
 			pos ( (float, float) ): Starting position
 			speed (float): Animal speed
-			sex(SEX): Sex 
+			sex(SEX): Sex
 		"""
 
+		self.id = next(_ids)
 		self.speed = speed
+		# Distance covered this step, speed slowed down by the terrain, see World.update_paces
+		self.pace = speed
 		self.pos = pos
 		self.world = world
 		self.sex = choice(list(Sex))
@@ -38,6 +123,9 @@ class Animal:
 		self.target = None
 		self.movement_angle = uniform(0, pi*2)
 
+		# Hunger and thirst only start falling once the world adds the animal
+		self._meter_tick = None
+
 		# Food variables
 		self.hunger = 100
 		self.eat_count = 0
@@ -49,98 +137,330 @@ class Animal:
 
 		# Set state
 		self.state = State.ROAM
-	
-	def move(self) -> Exception:
+		# Running aggregates of the species, set once the world adds the animal
+		self.stats = None
+
+	def export(self) -> tuple:
+		"""
+		Returns:
+			tuple: Picklable state of the animal without its world, see restore
+		"""
+
+		return tuple(getattr(self, name) for name in self._EXPORTED)
+
+	@classmethod
+	def restore(cls, world, state: tuple) -> "Animal":
+		"""
+		Rebuilds an exported animal, e.g. in another process
+
+		Args:
+			world (World): The world the animal lives in now
+			state (tuple): State returned by export
+
+		Returns:
+			Animal: The animal, without target and not yet added to the world
+		"""
+
+		animal = object.__new__(cls)
+		animal.world = world
+		animal._meter_tick = None
+		for name, value in zip(cls._EXPORTED, state):
+			setattr(animal, name, value)
+		animal.target = None
+		animal.stats = None
+		animal.pace = animal.speed
+		return animal
+
+	def decide(self, snapshot) -> Action:
+		"""
+		Decides the next step from a frozen snapshot without changing anything
+
+		Args:
+			snapshot (Snapshot): The world at the start of the step
+
+		Raises:
+			NotImplementedError: Should be overwritten in a derived class
+		"""
 
-		
 		raise NotImplementedError()
-		
+
 	def draw(self, screen) -> Exception:
 
 		raise NotImplementedError()
 
-	def sight_entities(self) -> (["Food"], ["Rabbit"], ["Fox"],["Water"]):
-		# Get foods around self
-		foodlist = []
-		for food in self.world.food:
-			if self != food and self._in_sight(food):	foodlist.append(food)
-
-		#get water around self 
-		waterlist=[]
-		for i in list(range(0,25)):
-			water=choice(self.world.shorecells)
-			water.pos=(water.x,water.y)
-			waterlist.append(water)
-
-		# Get rabbits around self
-		rabbitlist = []
-		for rabbit in self.world.rabbits:
-			if self != rabbit and self._in_sight(rabbit): rabbitlist.append(rabbit)
-
-		# Get foxes around self
-		foxlist = []
-		for fox in self.world.foxes:
-			if self != fox and self._in_sight(fox):	foxlist.append(fox)
-	
-	
-		foodlist.sort(key=lambda x: distance(self.pos, x.pos))
-		rabbitlist.sort(key=lambda x: distance(self.pos, x.pos))
-		foxlist.sort(key=lambda x: distance(self.pos, x.pos))
+	def decide_idle(self) -> Action:
+		"""
+		Cheap decision used while the animal is idle: roam without looking around
+		"""
+
+		pos, angle = self._roam()
+		return Action(self, pos, self.target, movement_angle=angle)
+
+	def apply(self, action: Action) -> None:
+		"""
+		Moves the animal as decided
+
+		Args:
+			action (Action): The animal's decision for this step
+		"""
+
+		self.pos = action.pos
+		self.target = action.target
+		if action.movement_angle is not None:
+			self.movement_angle = action.movement_angle
+
+	def consume(self) -> None:
+		"""
+		Eats the food or prey it reached
+		"""
+
+		self.eat(self.FOOD_VALUE)
+
+		# Change state to REPRODUCE after enough meals
+		if self.eat_count % self.MEALS_TO_REPRODUCE == 0 and self.eat_count != self._food_checkpoint:
+			self._food_checkpoint = self.eat_count
+			self.state = State.REPRODUCE
+
+	def quench(self) -> None:
+		"""
+		Drinks from the water it reached
+		"""
+
+		self.drink(self.WATER_VALUE)
+
+		# Change state to REPRODUCE after enough drinks
+		if self.drink_count % self.DRINKS_TO_REPRODUCE == 0 and self.drink_count != self._water_checkpoint:
+			self._water_checkpoint = self.drink_count
+			self.state = State.REPRODUCE
+
+	def mate(self, partner: "Animal") -> "Animal":
+		"""
+		Mates with a partner it reached
+
+		Args:
+			partner (Animal): Reproducing animal of the same species and other sex
+
+		Returns:
+			Animal: The offspring, with variance of the parents' speed
+		"""
+
+		child = type(self)(self.world, self.pos, variance(self.speed, partner.speed, 1.0))
+
+		# Reset state to ROAM
+		self.state = State.ROAM
+		partner.state = State.ROAM
+		return child
+
+	def hunger_rate(self) -> float:
+		return self.size
+
+	def thirst_rate(self) -> float:
+		return 0.1*self.speed
+
+	@property
+	def hunger(self) -> float:
+		if self._meter_tick is None:
+			return self._hunger
+		return self._hunger - self.hunger_rate()*(self.world.tick - self._meter_tick)
+
+	@hunger.setter
+	def hunger(self, value: float) -> None:
+		self._rebase()
+		self._hunger = value
+
+	@property
+	def thirst(self) -> float:
+		if self._meter_tick is None:
+			return self._thirst
+		return self._thirst - self.thirst_rate()*(self.world.tick - self._meter_tick)
+
+	@thirst.setter
+	def thirst(self, value: float) -> None:
+		self._rebase()
+		self._thirst = value
+
+	def meters_at(self, tick: int) -> (float, float):
+		"""
+		Hunger and thirst fall by their rates every step, so they are known for any step
+		until the next meal or drink
+
+		Args:
+			tick (int): World step
+
+		Returns:
+			(float, float): Hunger and thirst at that step
+		"""
+
+		if self._meter_tick is None:
+			return self._hunger, self._thirst
+		elapsed = tick - self._meter_tick
+		return self._hunger - self.hunger_rate()*elapsed, self._thirst - self.thirst_rate()*elapsed
+
+	def start_meters(self, tick: int) -> None:
+		"""
+		Lets hunger and thirst start falling from their current values
+
+		Args:
+			tick (int): Current world step
+		"""
+
+		self._meter_tick = tick
+
+	def _rebase(self) -> None:
+		"""
+		Stores hunger and thirst as of now, before one of them changes
+		"""
+
+		if self._meter_tick is not None:
+			self._hunger, self._thirst = self.meters_at(self.world.tick)
+			self._meter_tick = self.world.tick
+
+	def sight_entities(self, snapshot) -> (["Food"], ["Rabbit"], ["Fox"],["Water"]):
+		# Get foods, rabbits and foxes around self, closest first
+		foodlist = snapshot.food.near(self.pos, self.sight)
+		rabbitlist = snapshot.rabbits.near(self.pos, self.sight, self)
+		foxlist = snapshot.foxes.near(self.pos, self.sight, self)
+
+		#get water around self
+		waterlist=[Water(shore) for shore in self.world.sample_positions(self.world.shorecells, 25)]
 		waterlist.sort(key=lambda x: distance(self.pos, x.pos))
-		
-		return (foodlist, rabbitlist, foxlist,waterlist) 
-	
+
+		return (foodlist, rabbitlist, foxlist,waterlist)
+
 	def eat(self, inc: float) -> None:
 		# Increment eat count
 		self.eat_count += 1
+		hunger = self.hunger
 
 		# Limit to 100
-		if self.hunger + inc >= 100:
+		if hunger + inc >= 100:
 			self.hunger = 100
 		else:
-			self.hunger += inc
+			self.hunger = hunger + inc
+		if self.stats is not None:
+			self.stats.hunger.replace(hunger, self._hunger, self.hunger_rate())
+			self.world.meters.schedule(self)
 	def drink(self, inc: float) -> None:
 		# Increment eat count
 		self.drink_count += 1
-		#wait for half a sec
-		self.stopwatch(0.5)
+		thirst = self.thirst
+		#wait while drinking, half a sec by default
+		self.stopwatch(self.world.drink_delay)
 		# Limit to 100
-		if self.thirst + inc >= 100:
+		if thirst + inc >= 100:
 			self.thirst = 100
 		else:
-			self.thirst += inc
-	
-	def roam_move(self) -> None:
+			self.thirst = thirst + inc
+		if self.stats is not None:
+			self.stats.thirst.replace(thirst, self._thirst, self.thirst_rate())
+			self.world.meters.schedule(self)
+
+	def _decide_reproduce(self, partnerlist: ["Animal"], partners, waterlist: ["Water"], sighted: bool) -> Action:
+		"""
+		Decides the step of a reproducing animal
+		1) Move towards another reproducing animal of the other sex
+		2) If thirsty, move towards water
+		3) Otherwise move randomly
+
+		Args:
+			partnerlist ([Animal]): Animals of the same species in sight, closest first
+			partners (SpatialGrid): All animals of the same species
+			waterlist ([Water]): Water around self, closest first
+			sighted (bool): Whether anything was in sight
+
+		Returns:
+			Action: The decision
+		"""
+
+		# Find closest partner that is also REPRODUCE
+		target = self.target
+		for partner in partnerlist:
+			if partner.state == State.REPRODUCE and partner.sex != self.sex:
+				target = partner
+				break
+
+		# Check if target still exists
+		if (target is not None) and (target in partners):
+			dist_to_target = distance(self.pos, target.pos)
+
+			# Jump directly to partner if possible
+			if dist_to_target <= self.pace:
+				return Action(self, target.pos, None, Intent.MATE, target, dist_to_target, sighted=sighted)
+			# Take intermediate steps to partner
+			return Action(self, self._step_towards(target.pos, dist_to_target), target, sighted=sighted)
+
+		#drink
+		if self.thirst <= THIRST_THRESHOLD and waterlist:
+			# Find closest water
+			target = waterlist[0]
+			dist_to_target = distance(self.pos, target.pos)
+
+			# Jump directly to water if possible
+			if dist_to_target <= self.pace:
+				return Action(self, target.pos, None, Intent.DRINK, target, dist_to_target, sighted=sighted)
+			# Take intermediate steps to water
+			return Action(self, self._step_towards(target.pos, dist_to_target), target, sighted=sighted)
+
+		pos, angle = self._roam()
+		return Action(self, pos, target, movement_angle=angle, sighted=sighted)
+
+	def _step_towards(self, pos: (float, float), dist: float) -> (float, float):
+		"""
+		Takes one step towards a position further away than pace
+
+		Args:
+			pos ( (float, float) ): Destination
+			dist (float): Distance to the destination
+
+		Returns:
+			(float, float): New position
+		"""
+
+		ratio = self.pace / dist
+		return (
+			self.pos[0] + ((pos[0] - self.pos[0]) * ratio),
+			self.pos[1] + ((pos[1] - self.pos[1]) * ratio)
+			)
+
+	def _roam(self) -> ((float, float), float):
+		"""
+		Makes a random movement towards movement angle
+
+		Returns:
+			((float, float), float): New position and new movement angle
+		"""
+
+		angle = self.movement_angle
 		# Proposed move
-		new_x = self.pos[0] + (self.speed * cos(self.movement_angle))
-		new_y = self.pos[1] + (self.speed * sin(self.movement_angle))
-
-		# Check if valid move
-		while self.world.in_bounds((new_x, new_y))!=True and contains(self.world.watercells, lambda x: x.x == new_x and x.y ==new_y)!=True :  # list of all elements with .n==30
-			
-			# Reset move
-			self.movement_angle += pi/2
-			new_x = self.pos[0] + (self.speed * cos(self.movement_angle))
-			new_y = self.pos[1] + (self.speed * sin(self.movement_angle))
-			
-		# Confirm move
-		self.pos = (
-			new_x,
-			new_y
-		)
+		new_x = self.pos[0] + (self.pace * cos(angle))
+		new_y = self.pos[1] + (self.pace * sin(angle))
+
+		# Turn away from the edge and from water
+		for _ in range(4):
+			if self.world.in_bounds((new_x, new_y)) and not self.world.is_water((new_x, new_y)):
+				break
+			angle += pi/2
+			new_x = self.pos[0] + (self.pace * cos(angle))
+			new_y = self.pos[1] + (self.pace * sin(angle))
+		else:
+			# Water all around, wade on rather than get stuck
+			while not self.world.in_bounds((new_x, new_y)):
+				angle += pi/2
+				new_x = self.pos[0] + (self.pace * cos(angle))
+				new_y = self.pos[1] + (self.pace * sin(angle))
 
 		# Adjust movement angle
-		self.movement_angle += uniform(-pi*2 / 36, pi*2 / 36)
-		
+		angle += uniform(-pi*2 / 36, pi*2 / 36)
+		return (new_x, new_y), angle
+
 	def _in_sight(self, entity) -> bool:
 		return distance(self.pos, entity.pos) <= self.sight
 
 	def __repr__(self) -> str:
 		return "{}".format(self.pos)
-	
+
 	def stopwatch(self,seconds):
 		start = time.time()
 		elapsed = 0
 		while elapsed < seconds:
 			elapsed = time.time() - start
-
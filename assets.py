@@ -0,0 +1,60 @@
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def _image(path: str) -> "pygame.Surface":
+	import pygame
+	return pygame.image.load(path)
+
+@lru_cache(maxsize=None)
+def sprite(path: str, size: int) -> "pygame.Surface":
+	"""
+	Loads an image scaled to a square, on first use only
+
+	pygame is imported here rather than by the entities, so the simulation
+	runs headless without it.
+
+	Args:
+		path (str): Image file
+		size (int): Side length in pixels
+
+	Returns:
+		pygame.Surface: The scaled image, shared by every caller
+	"""
+
+	import pygame
+	return pygame.transform.scale(_image(path), (size, size))
+
+def terrain_surface(biomes: "np.ndarray") -> "pygame.Surface":
+	"""
+	Wraps the colored biome raster in a Surface without copying it or touching the disk
+
+	Args:
+		biomes (np.ndarray): (height, width) raster of NoiseMapBiome values
+
+	Returns:
+		pygame.Surface: Background sharing its pixels with the color raster
+	"""
+
+	import pygame
+	from terrain_gen import color_raster
+	pixels = color_raster(biomes)
+	# The Surface keeps a reference to the array it shares
+	return pygame.image.frombuffer(pixels, (pixels.shape[1], pixels.shape[0]), "RGB")
+
+def biomass_surface(field: "BiomassField", size: (int, int)) -> "pygame.Surface":
+	"""
+	Draws the density of a BiomassField as a translucent overlay
+
+	Args:
+		field (BiomassField): The food field
+		size ( (int, int) ): Width and height of the world in pixels
+
+	Returns:
+		pygame.Surface: Overlay of the world's size, one flat square per cell
+	"""
+
+	import pygame
+	pixels = field.overlay()
+	cells = pygame.image.frombuffer(pixels, (pixels.shape[1], pixels.shape[0]), "RGBA")
+	return pygame.transform.scale(cells, (pixels.shape[1]*field.cell_size, pixels.shape[0]*field.cell_size)).subsurface(
+		(0, 0) + tuple(size))
@@ -0,0 +1,166 @@
+import numpy as np
+from terrain_gen import NoiseMapBiome
+
+# Side of a coarse cell in pixels
+CELL_SIZE = 8
+
+# Food units a fully grown pixel of each biome holds, biomes left out grow nothing
+CAPACITY = {
+	NoiseMapBiome.FOREST.value: 20.0,
+	NoiseMapBiome.GRASSLAND.value: 12.0,
+}
+# Food units a pixel of each biome regrows per step
+REGROWTH = {
+	NoiseMapBiome.FOREST.value: 0.16,
+	NoiseMapBiome.GRASSLAND.value: 0.08,
+}
+
+# Food units taken by one meal, a full 8x8 px FOREST cell feeds 3 meals
+BITE = 400.0
+
+# RGBA of a full cell in the overlay, emptier cells are more transparent
+OVERLAY_COLOR = (230, 200, 40)
+OVERLAY_ALPHA = 160
+
+class BiomassField:
+	"""
+	Food as a biomass density on a coarse grid over the terrain
+
+	Every cell holds up to the summed capacity of its pixels and regrows
+	by the summed regrowth of its pixels each step, both set per biome. A
+	step of regrowth is one vectorized update over the grid, so its cost
+	depends on the map size only, not on the amount of food.
+	"""
+
+	def __init__(self, biomes: np.ndarray, cell_size: int = CELL_SIZE, capacity: dict = None,
+			regrowth: dict = None, bite: float = BITE):
+		"""
+		Initializes the BiomassField fully grown
+
+		Args:
+			biomes (np.ndarray): (height, width) raster of NoiseMapBiome values
+			cell_size (int): Side of a coarse cell in pixels
+			capacity (dict): NoiseMapBiome value -> food units per pixel, CAPACITY by default
+			regrowth (dict): NoiseMapBiome value -> food units per pixel and step, REGROWTH by default
+			bite (float): Food units taken by one meal
+		"""
+
+		self.cell_size = cell_size
+		self.bite = bite
+		self.height, self.width = biomes.shape
+		rows = -(-self.height // cell_size)
+		columns = -(-self.width // cell_size)
+
+		per_pixel_capacity = np.zeros(256, dtype=np.float32)
+		per_pixel_regrowth = np.zeros(256, dtype=np.float32)
+		for biome, units in (capacity or CAPACITY).items():
+			per_pixel_capacity[biome] = units
+		for biome, units in (regrowth or REGROWTH).items():
+			per_pixel_regrowth[biome] = units
+
+		# Pad to whole cells, the padding grows nothing
+		padded = np.zeros((rows*cell_size, columns*cell_size), dtype=np.uint8)
+		padded[:self.height, :self.width] = biomes
+		blocks = padded.reshape(rows, cell_size, columns, cell_size)
+		self.capacity = per_pixel_capacity[blocks].sum(axis=(1, 3))
+		self.regrowth = per_pixel_regrowth[blocks].sum(axis=(1, 3))
+		self.density = self.capacity.copy()
+
+	def grow(self) -> None:
+		"""
+		Regrows every cell by one step, up to its capacity
+		"""
+
+		np.minimum(self.density + self.regrowth, self.capacity, out=self.density)
+
+	def cell(self, pos: (float, float)) -> (int, int):
+		"""
+		Args:
+			pos ( (float, float) ): Position in the world
+
+		Returns:
+			(int, int): Row and column of the cell holding it
+		"""
+
+		row = min(max(int(pos[1]) // self.cell_size, 0), self.density.shape[0] - 1)
+		column = min(max(int(pos[0]) // self.cell_size, 0), self.density.shape[1] - 1)
+		return row, column
+
+	def available(self, pos: (float, float)) -> float:
+		"""
+		Args:
+			pos ( (float, float) ): Position in the world
+
+		Returns:
+			float: Food units in the cell at pos
+		"""
+
+		return float(self.density[self.cell(pos)])
+
+	def graze(self, pos: (float, float)) -> bool:
+		"""
+		Takes a bite from the cell at a position
+
+		Args:
+			pos ( (float, float) ): Position in the world
+
+		Returns:
+			bool: True if the cell held a whole bite, nothing is taken otherwise
+		"""
+
+		cell = self.cell(pos)
+		if self.density[cell] < self.bite:
+			return False
+		self.density[cell] -= self.bite
+		return True
+
+	def richest(self, pos: (float, float), radius: float) -> (float, float):
+		"""
+		Finds the cell with the most food around a position
+
+		Args:
+			pos ( (float, float) ): Position in the world
+			radius (float): Cells whose center is further away are not considered
+
+		Returns:
+			(float, float): Center of the richest cell, None if no cell holds a bite
+		"""
+
+		size = self.cell_size
+		row, column = self.cell(pos)
+		reach = int(radius // size) + 1
+		top, left = max(row - reach, 0), max(column - reach, 0)
+		window = self.density[top:row + reach + 1, left:column + reach + 1]
+
+		# Cell centers within the radius
+		center_y = (np.arange(top, top + window.shape[0]) + 0.5)*size
+		center_x = (np.arange(left, left + window.shape[1]) + 0.5)*size
+		within = (center_y[:, None] - pos[1])**2 + (center_x[None, :] - pos[0])**2 <= radius*radius
+		candidates = np.where(within & (window >= self.bite), window, -1.0)
+		best = np.unravel_index(np.argmax(candidates), candidates.shape)
+		if candidates[best] < 0:
+			return None
+		# Centers of partial cells at the edge can lie outside the world
+		return (min(float(center_x[best[1]]), self.width - 1), min(float(center_y[best[0]]), self.height - 1))
+
+	def total(self) -> float:
+		"""
+		Returns:
+			float: Food units on the whole map
+		"""
+
+		return float(self.density.sum(dtype=np.float64))
+
+	def overlay(self) -> np.ndarray:
+		"""
+		Returns:
+			np.ndarray: (rows, columns, 4) uint8 RGBA image of the density, one pixel per cell,
+				more opaque where a cell is closer to its capacity
+		"""
+
+		image = np.empty(self.density.shape + (4,), dtype=np.uint8)
+		image[..., :3] = OVERLAY_COLOR
+		with np.errstate(invalid="ignore", divide="ignore"):
+			fill = np.where(self.capacity > 0, self.density / self.capacity, 0)
+		image[..., 3] = (fill*OVERLAY_ALPHA).astype(np.uint8)
+		return image
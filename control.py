@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import struct
+from time import perf_counter
+import numpy as np
+
+DEFAULT_ADDRESS = "127.0.0.1:7777"
+
+# JSON length and payload length of every message
+_FRAME = struct.Struct("<II")
+
+# Parameters of the reset command and their defaults, as in main.py
+RESET_DEFAULTS = {
+	"width": 960, "height": 750,
+	"scale": 200.0, "octaves": 8, "persistence": 0.5, "lacunarity": 3.0,
+	"rabbits": 20, "foxes": 12, "food": 80, "foodcap": 80,
+	"endcondition": "default", "idlecheck": None, "seed": None,
+}
+_TERRAIN_PARAMS = ("width", "height", "scale", "octaves", "persistence", "lacunarity")
+
+# Per-animal fields of get_state, asked for as "rabbits.<field>" or "foxes.<field>"
+ANIMAL_FIELDS = {
+	"id": (np.int64, lambda a: a.id),
+	"x": (np.float64, lambda a: a.pos[0]),
+	"y": (np.float64, lambda a: a.pos[1]),
+	"hunger": (np.float64, lambda a: a.hunger),
+	"thirst": (np.float64, lambda a: a.thirst),
+	"speed": (np.float64, lambda a: a.speed),
+	"size": (np.float64, lambda a: a.size),
+	"sex": (np.uint8, lambda a: a.sex.value),
+	"state": (np.uint8, lambda a: a.state.value),
+}
+# Fields of get_state asked for as "food.<field>"
+FOOD_FIELDS = {
+	"id": (np.int64, lambda f: f.id),
+	"x": (np.float64, lambda f: f.pos[0]),
+	"y": (np.float64, lambda f: f.pos[1]),
+}
+
+class CommandError(Exception):
+	"""A command that can't be carried out, reported back to the client"""
+
+def parse_address(address: str) -> (str, object):
+	"""
+	Args:
+		address (str): "unix:PATH" or "HOST:PORT"
+
+	Returns:
+		(str, object): "unix" and the path, or "tcp" and (host, port)
+	"""
+
+	if address.startswith("unix:"):
+		return "unix", address[len("unix:"):]
+	host, _, port = address.rpartition(":")
+	return "tcp", (host or "127.0.0.1", int(port))
+
+def _pack(header: dict, arrays: [np.ndarray]) -> bytes:
+	"""
+	Args:
+		header (dict): JSON part of the message
+		arrays ([np.ndarray]): Arrays sent after it, described in header["arrays"]
+
+	Returns:
+		bytes: The framed message
+	"""
+
+	text = json.dumps(header).encode()
+	payload = b"".join(np.ascontiguousarray(array).tobytes() for array in arrays)
+	return _FRAME.pack(len(text), len(payload)) + text + payload
+
+def _describe(arrays: {str: np.ndarray}) -> [dict]:
+	return [{"name": name, "dtype": array.dtype.str, "shape": array.shape} for name, array in arrays.items()]
+
+def _unpack_arrays(descriptions: [dict], payload: memoryview, offset: int) -> ({str: np.ndarray}, int):
+	"""
+	Args:
+		descriptions ([dict]): Name, dtype and shape of each array
+		payload (memoryview): Payload of the message
+		offset (int): Where the first array starts
+
+	Returns:
+		({str: np.ndarray}, int): The arrays, read in place, and the offset after the last one
+	"""
+
+	arrays = {}
+	for description in descriptions:
+		dtype = np.dtype(description["dtype"])
+		count = int(np.prod(description["shape"]))
+		arrays[description["name"]] = np.frombuffer(payload, dtype, count, offset).reshape(description["shape"])
+		offset += count*dtype.itemsize
+	return arrays, offset
+
+class _Instance:
+	"""A World owned by the server together with its own random state"""
+
+	def __init__(self, world, random_state):
+		self.world = world
+		self.random_state = random_state
+
+class ControlServer:
+	"""
+	Serves headless Worlds to local clients over a Unix socket or TCP
+
+	Every message is a JSON header followed by a binary payload. A request
+	is a list of commands run in order, so a client can step and read the
+	state it needs in a single round trip; array results are sent as raw
+	bytes after the header. Worlds share the random module, so each one's
+	random state is swapped in while it steps and runs stay reproducible
+	per seed whatever else the server does.
+	"""
+
+	def __init__(self, address: str = DEFAULT_ADDRESS):
+		"""
+		Initializes the ControlServer
+
+		Args:
+			address (str): "unix:PATH" or "HOST:PORT" to listen on
+		"""
+
+		self.address = address
+		self.worlds = {}
+		self._terrains = {}
+		# One world runs at a time, the GIL would serialize them anyway
+		self._lock = asyncio.Lock()
+		self._commands = {
+			"reset": self._reset,
+			"step": self._step,
+			"get_state": self._get_state,
+			"drop": self._drop,
+			"worlds": self._list,
+		}
+
+	async def serve(self) -> None:
+		"""
+		Accepts clients until cancelled
+		"""
+
+		kind, where = parse_address(self.address)
+		if kind == "unix":
+			server = await asyncio.start_unix_server(self._client, where)
+		else:
+			server = await asyncio.start_server(self._client, *where)
+		async with server:
+			await server.serve_forever()
+
+	async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		"""
+		Answers the requests of one connection until it closes
+		"""
+
+		try:
+			while True:
+				try:
+					frame = await reader.readexactly(_FRAME.size)
+				except asyncio.IncompleteReadError:
+					break
+				text_length, payload_length = _FRAME.unpack(frame)
+				text = await reader.readexactly(text_length)
+				await reader.readexactly(payload_length)
+
+				results = []
+				arrays = []
+				header = {"results": results}
+				try:
+					request = json.loads(text)
+				except ValueError:
+					request = None
+				commands = request.get("commands", []) if isinstance(request, dict) else None
+				if not isinstance(commands, list) or not all(isinstance(command, dict) for command in commands):
+					header["error"] = "request: expected {\"commands\": [{\"cmd\": ...}, ...]}"
+					commands = []
+				for command in commands:
+					try:
+						result, produced = await self._run(command)
+					except (CommandError, KeyError, TypeError, ValueError) as error:
+						header["error"] = "{}: {}".format(command.get("cmd"), error)
+						break
+					except Exception as error:
+						# Bad input must never take the server down, report anything else too
+						header["error"] = "{}: {}: {}".format(command.get("cmd"), type(error).__name__, error)
+						break
+					result["arrays"] = _describe(produced)
+					results.append(result)
+					arrays += produced.values()
+				writer.write(_pack(header, arrays))
+				await writer.drain()
+		finally:
+			writer.close()
+
+	async def _run(self, command: dict) -> (dict, {str: np.ndarray}):
+		"""
+		Args:
+			command (dict): "cmd" and its arguments
+
+		Returns:
+			(dict, {str: np.ndarray}): JSON result and array results
+		"""
+
+		handler = self._commands.get(command.get("cmd"))
+		if handler is None:
+			raise CommandError("unknown command, expected one of {}".format(", ".join(self._commands)))
+		async with self._lock:
+			# Stepping holds the GIL for long stretches, keep it off the event loop thread
+			return await asyncio.to_thread(handler, command)
+
+	def _instance(self, command: dict) -> _Instance:
+		name = str(command.get("world", "0"))
+		if name not in self.worlds:
+			raise CommandError("no world {}, reset it first".format(name))
+		return self.worlds[name]
+
+	def _reset(self, command: dict) -> (dict, dict):
+		from terrain_gen import generate_biomes
+		from world import END_CONDITIONS, World
+
+		name = str(command.get("world", "0"))
+		params = dict(RESET_DEFAULTS)
+		unknown = set(command.get("params", {})) - set(params)
+		if unknown:
+			raise CommandError("unknown parameters {}".format(", ".join(sorted(unknown))))
+		params.update(command.get("params", {}))
+		if params["endcondition"] not in END_CONDITIONS:
+			raise CommandError("unknown end condition {}, expected one of {}".format(
+				params["endcondition"], ", ".join(END_CONDITIONS)))
+
+		terrain = tuple(params[key] for key in _TERRAIN_PARAMS)
+		if terrain not in self._terrains:
+			self._terrains[terrain] = generate_biomes(*terrain)
+		biomes = self._terrains[terrain]
+
+		state = random.getstate()
+		random.seed(params["seed"])
+		try:
+			extra = {} if params["idlecheck"] is None else {"idle_check_interval": params["idlecheck"]}
+			world = World((params["width"], params["height"]), None, None, biomes, rabbits=params["rabbits"],
+				foxes=params["foxes"], food=params["food"], food_cap=params["foodcap"],
+				end_condition=params["endcondition"], drink_delay=0.0, **extra)
+			self.worlds[name] = _Instance(world, random.getstate())
+		finally:
+			random.setstate(state)
+		return {"world": name, "tick": world.tick}, {}
+
+	def _step(self, command: dict) -> (dict, dict):
+		instance = self._instance(command)
+		world = instance.world
+		steps = int(command.get("n", 1))
+
+		state = random.getstate()
+		random.setstate(instance.random_state)
+		start = perf_counter()
+		try:
+			for _ in range(steps):
+				if not world.running:
+					break
+				world.step()
+		finally:
+			instance.random_state = random.getstate()
+			random.setstate(state)
+		seconds = perf_counter() - start
+
+		return {
+			"tick": world.tick, "running": world.running, "seconds": seconds,
+			"rabbits": len(world.rabbits), "foxes": len(world.foxes), "food": world.food_amount(),
+		}, {}
+
+	def _get_state(self, command: dict) -> (dict, dict):
+		world = self._instance(command).world
+		arrays = {}
+		for field in command.get("fields", []):
+			if field == "terrain":
+				arrays[field] = world.biomes
+				continue
+			group, _, attribute = field.partition(".")
+			if group in ("rabbits", "foxes") and attribute in ANIMAL_FIELDS:
+				dtype, read = ANIMAL_FIELDS[attribute]
+			elif group == "food" and attribute in FOOD_FIELDS:
+				dtype, read = FOOD_FIELDS[attribute]
+			else:
+				raise CommandError("unknown field {}".format(field))
+			entities = getattr(world, group)
+			arrays[field] = np.fromiter((read(entity) for entity in entities), dtype, len(entities))
+		return {"tick": world.tick, "running": world.running}, arrays
+
+	def _drop(self, command: dict) -> (dict, dict):
+		self._instance(command)
+		del self.worlds[str(command.get("world", "0"))]
+		return {}, {}
+
+	def _list(self, command: dict) -> (dict, dict):
+		return {"worlds": {name: instance.world.tick for name, instance in self.worlds.items()}}, {}
+
+class ControlClient:
+	"""Blocking client of a ControlServer, e.g. for notebooks and optimizers"""
+
+	def __init__(self, address: str = DEFAULT_ADDRESS):
+		"""
+		Initializes the ControlClient and connects
+
+		Args:
+			address (str): Address the server listens on
+		"""
+
+		kind, where = parse_address(address)
+		if kind == "unix":
+			self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		else:
+			self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		self._socket.connect(where)
+
+	def call(self, *commands: dict) -> [dict]:
+		"""
+		Runs commands in one round trip
+
+		Args:
+			*commands (dict): "cmd" and its arguments each
+
+		Returns:
+			[dict]: Result of each command, array results under "arrays" by name
+
+		Raises:
+			RuntimeError: A command failed, the ones after it were not run
+		"""
+
+		self._socket.sendall(_pack({"commands": list(commands)}, []))
+		text_length, payload_length = _FRAME.unpack(self._receive(_FRAME.size))
+		header = json.loads(self._receive(text_length))
+		payload = memoryview(self._receive(payload_length))
+		if "error" in header:
+			raise RuntimeError(header["error"])
+
+		offset = 0
+		for result in header["results"]:
+			result["arrays"], offset = _unpack_arrays(result["arrays"], payload, offset)
+		return header["results"]
+
+	def reset(self, world: str = "0", **params) -> dict:
+		return self.call({"cmd": "reset", "world": world, "params": params})[0]
+
+	def step(self, n: int = 1, world: str = "0") -> dict:
+		return self.call({"cmd": "step", "world": world, "n": n})[0]
+
+	def get_state(self, fields: [str], world: str = "0") -> {str: np.ndarray}:
+		"""
+		Args:
+			fields ([str]): e.g. "rabbits.x", "foxes.hunger", "food.id", "terrain"
+			world (str): Name of the world
+
+		Returns:
+			{str: np.ndarray}: One array per field
+		"""
+
+		return self.call({"cmd": "get_state", "world": world, "fields": fields})[0]["arrays"]
+
+	def close(self) -> None:
+		self._socket.close()
+
+	def __enter__(self) -> "ControlClient":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def _receive(self, size: int) -> bytearray:
+		data = bytearray(size)
+		view = memoryview(data)
+		received = 0
+		while received < size:
+			count = self._socket.recv_into(view[received:])
+			if not count:
+				raise ConnectionError("server closed the connection")
+			received += count
+		return data
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Serves headless worlds to local clients, see ControlClient")
+	parser.add_argument('--address', help="unix:PATH or HOST:PORT to listen on.", default=DEFAULT_ADDRESS)
+	args = parser.parse_args()
+
+	print("listening on {}".format(args.address))
+	try:
+		asyncio.run(ControlServer(args.address).serve())
+	except KeyboardInterrupt:
+		pass
@@ -0,0 +1,88 @@
+import numpy as np
+
+def lttb(x, y, points: int) -> (np.ndarray, np.ndarray):
+	"""
+	Largest-Triangle-Three-Buckets downsampling
+
+	Keeps the first and last sample and, from each of points - 2 equal
+	buckets in between, the sample forming the largest triangle with the
+	sample kept from the previous bucket and the mean of the next bucket.
+	Peaks and the overall shape survive far better than with striding.
+
+	Args:
+		x (array_like): Increasing sample times
+		y (array_like): Sample values
+		points (int): Samples to keep, at least 3
+
+	Returns:
+		(np.ndarray, np.ndarray): Kept times and values
+	"""
+
+	x = np.asarray(x, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	n = len(x)
+	if points >= n or points < 3:
+		return x, y
+
+	# Bucket i covers edges[i]:edges[i + 1], the first and last sample are buckets of their own
+	edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+	# Mean of every bucket, for the third corner of the triangles
+	sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+	sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+	sizes = np.diff(edges)
+	means_x = np.append(sums_x / sizes, x[-1])
+	means_y = np.append(sums_y / sizes, y[-1])
+
+	kept = np.empty(points, dtype=np.int64)
+	kept[0], kept[-1] = 0, n - 1
+	a = 0
+	for i in range(points - 2):
+		start, end = edges[i], edges[i + 1]
+		bx, by = x[start:end], y[start:end]
+		# Twice the triangle area, the constant factor doesn't change the argmax
+		area = np.abs((x[a] - means_x[i + 1])*(by - y[a]) - (x[a] - bx)*(means_y[i + 1] - y[a]))
+		a = start + int(np.argmax(area))
+		kept[i + 1] = a
+	return x[kept], y[kept]
+
+def minmax(x, y, buckets: int) -> (np.ndarray, np.ndarray):
+	"""
+	Min/max bucketing: keeps the lowest and highest sample of each of buckets
+	equal buckets, in time order, so every spike stays visible
+
+	Args:
+		x (array_like): Increasing sample times
+		y (array_like): Sample values
+		buckets (int): Number of buckets, up to 2*buckets samples are kept
+
+	Returns:
+		(np.ndarray, np.ndarray): Kept times and values
+	"""
+
+	x = np.asarray(x, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	n = len(x)
+	if 2*buckets >= n or buckets < 1:
+		return x, y
+
+	edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+	starts, sizes = edges[:-1], np.diff(edges)
+	kept = []
+	for reduce in (np.minimum, np.maximum):
+		extremes = np.repeat(reduce.reduceat(y, starts), sizes)
+		# First sample of each bucket that equals its extreme
+		hits = np.flatnonzero(y == extremes)
+		kept.append(hits[np.searchsorted(hits, starts)])
+	kept = np.unique(np.concatenate(kept))
+	return x[kept], y[kept]
+
+def pixel_budget(figure) -> int:
+	"""
+	Args:
+		figure (matplotlib.figure.Figure): Figure to plot into
+
+	Returns:
+		int: Width of the figure in pixels, more samples than that can't be told apart
+	"""
+
+	return int(figure.get_size_inches()[0] * figure.dpi)
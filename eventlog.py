@@ -0,0 +1,149 @@
+import argparse
+import sqlite3
+import threading
+from queue import SimpleQueue, Empty
+from rabbit import Rabbit
+from fox import Fox
+
+RABBIT = 0
+FOX = 1
+
+SPECIES = {Rabbit: RABBIT, Fox: FOX}
+
+# Event kinds
+BIRTH = "birth"
+STARVED = "starved"
+DEHYDRATED = "dehydrated"
+KILL = "kill"
+EAT = "eat"
+DRINK = "drink"
+
+# Rows written per transaction at most
+BATCH_SIZE = 5000
+
+_SCHEMA = (
+	# animal is the subject: the child, the dead, the killer, the eater or drinker;
+	# other the first parent, the prey or the food, NULL for grazing; partner the second parent;
+	# value the inherited speed, or hunger or thirst after eating or drinking
+	"""CREATE TABLE IF NOT EXISTS events (
+		step INTEGER NOT NULL,
+		kind TEXT NOT NULL,
+		animal INTEGER NOT NULL,
+		species INTEGER NOT NULL,
+		other INTEGER,
+		partner INTEGER,
+		value REAL
+	)""",
+	"CREATE INDEX IF NOT EXISTS events_kind_step ON events (kind, step)",
+	"CREATE INDEX IF NOT EXISTS events_animal ON events (animal)",
+	"CREATE INDEX IF NOT EXISTS events_other ON events (other)",
+)
+
+_INSERT = "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+class EventLog(threading.Thread):
+	"""
+	Writes births, deaths, kills, meals and drinks to a SQLite database
+
+	The simulation only puts rows on an unbounded queue, which never blocks;
+	this thread owns the connection and inserts whatever piled up in one
+	transaction of up to BATCH_SIZE rows.
+	"""
+
+	def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+		"""
+		Initializes the EventLog, events are appended to an existing database
+
+		Args:
+			path (str): Database file
+			batch_size (int): Rows per transaction at most
+		"""
+
+		threading.Thread.__init__(self, daemon=True)
+		self.path = path
+		self.batch_size = batch_size
+		self.written = 0
+		self._queue = SimpleQueue()
+		self._closed = False
+
+	def birth(self, step: int, child, parent, partner) -> None:
+		self._queue.put((step, BIRTH, child.id, SPECIES[type(child)], parent.id, partner.id, child.speed))
+
+	def death(self, step: int, animal, cause: str) -> None:
+		"""
+		Args:
+			step (int): World step
+			animal (Animal): The dead animal
+			cause (str): STARVED or DEHYDRATED
+		"""
+
+		self._queue.put((step, cause, animal.id, SPECIES[type(animal)], None, None, None))
+
+	def kill(self, step: int, fox, rabbit) -> None:
+		self._queue.put((step, KILL, fox.id, FOX, rabbit.id, None, None))
+
+	def eat(self, step: int, animal, food) -> None:
+		self._queue.put((step, EAT, animal.id, SPECIES[type(animal)], food.id, None, animal.hunger))
+
+	def graze(self, step: int, animal) -> None:
+		self._queue.put((step, EAT, animal.id, SPECIES[type(animal)], None, None, animal.hunger))
+
+	def drink(self, step: int, animal) -> None:
+		self._queue.put((step, DRINK, animal.id, SPECIES[type(animal)], None, None, animal.thirst))
+
+	def run(self) -> None:
+		"""
+		Inserts queued events until close is called
+		"""
+
+		connection = sqlite3.connect(self.path)
+		connection.execute("PRAGMA journal_mode=WAL")
+		connection.execute("PRAGMA synchronous=NORMAL")
+		for statement in _SCHEMA:
+			connection.execute(statement)
+		connection.commit()
+
+		done = False
+		while not done:
+			# Wait for the first row, then take what else is there
+			rows = [self._queue.get()]
+			while len(rows) < self.batch_size:
+				try:
+					rows.append(self._queue.get_nowait())
+				except Empty:
+					break
+			if rows[-1] is None:
+				rows.pop()
+				done = True
+			with connection:
+				connection.executemany(_INSERT, rows)
+			self.written += len(rows)
+		connection.close()
+
+	def close(self) -> None:
+		"""
+		Writes the remaining events and closes the database
+		"""
+
+		if self._closed:
+			return
+		self._closed = True
+		self._queue.put(None)
+		if self.is_alive():
+			self.join()
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Summarizes an event log")
+	parser.add_argument('path', help="Database written with main.py --events.")
+	args = parser.parse_args()
+
+	connection = sqlite3.connect(args.path)
+	names = {RABBIT: "rabbits", FOX: "foxes"}
+	print("{} events over {} steps".format(*connection.execute("SELECT COUNT(*), MAX(step) + 1 FROM events").fetchone()))
+	for kind, species, events in connection.execute(
+			"SELECT kind, species, COUNT(*) FROM events GROUP BY kind, species ORDER BY kind, species"):
+		print("{:<12} {:<8} {}".format(kind, names[species], events))
+	speed = connection.execute("SELECT species, AVG(value) FROM events WHERE kind = ? GROUP BY species", (BIRTH,))
+	for species, mean in speed:
+		print("mean inherited speed of {}: {:.3f}".format(names[species], mean))
+	connection.close()
@@ -0,0 +1,381 @@
+import argparse
+import hashlib
+import itertools
+import random
+import sqlite3
+from datetime import datetime
+from time import perf_counter
+import numpy as np
+from scheduler import IDLE_CHECK_INTERVAL
+
+# main.py arguments that change what a run simulates, stored as its parameters
+EXPERIMENT_PARAMS = (
+	"water", "shallowwater", "sand", "land", "mountain", "hugemountain",
+	"scale", "persistence", "lacunarity", "octaves",
+	"moistureo", "moistures", "moisturep", "moisturel",
+	"idlecheck", "rabbits", "foxes", "food", "foodcap", "foodmodel", "endcondition",
+)
+# Their main.py defaults, stored for sweep runs so filters match runs from either entry point
+EXPERIMENT_DEFAULTS = {
+	"water": 0.0, "shallowwater": 0.05, "sand": 0.1, "land": 0.6, "mountain": 0.5, "hugemountain": 0.6,
+	"scale": 200.0, "persistence": 0.5, "lacunarity": 3.0, "octaves": 8,
+	"moistureo": 8, "moistures": 200.0, "moisturep": 0.5, "moisturel": 3.0,
+	"idlecheck": IDLE_CHECK_INTERVAL, "rabbits": 20, "foxes": 12, "food": 80, "foodcap": 80,
+	"foodmodel": "objects", "endcondition": "default",
+}
+
+# Steps between two samples of a RunLog
+SAMPLE_EVERY = 10
+
+# Columns of the runs table that can be aggregated across runs
+RUN_COLUMNS = ("duration", "steps", "runtime", "rabbit_extinction", "fox_extinction", "peak_rabbits", "peak_foxes")
+AGGREGATES = ("avg", "min", "max", "sum", "count", "total")
+
+_SCHEMA = (
+	# Extinctions in simulated seconds (World.runtime), NULL if the species survived
+	"""CREATE TABLE IF NOT EXISTS runs (
+		id INTEGER PRIMARY KEY,
+		started TEXT NOT NULL,
+		seed INTEGER,
+		terrain TEXT NOT NULL,
+		duration REAL NOT NULL,
+		steps INTEGER NOT NULL,
+		runtime REAL NOT NULL,
+		outcome TEXT NOT NULL,
+		rabbit_extinction REAL,
+		fox_extinction REAL,
+		peak_rabbits INTEGER NOT NULL,
+		peak_foxes INTEGER NOT NULL
+	)""",
+	# One row per parameter of a run; values keep their type, so scale=200 matches 200.0
+	"""CREATE TABLE IF NOT EXISTS params (
+		name TEXT NOT NULL,
+		value,
+		run INTEGER NOT NULL REFERENCES runs (id),
+		PRIMARY KEY (name, value, run)
+	) WITHOUT ROWID""",
+	# One row per sampled column of a run, the whole column as raw array bytes
+	"""CREATE TABLE IF NOT EXISTS series (
+		run INTEGER NOT NULL REFERENCES runs (id),
+		name TEXT NOT NULL,
+		dtype TEXT NOT NULL,
+		data BLOB NOT NULL,
+		PRIMARY KEY (run, name)
+	) WITHOUT ROWID""",
+	"CREATE INDEX IF NOT EXISTS runs_terrain ON runs (terrain)",
+	"CREATE INDEX IF NOT EXISTS runs_outcome ON runs (outcome)",
+)
+
+def terrain_key(biomes: np.ndarray) -> str:
+	"""
+	Args:
+		biomes (np.ndarray): Biome raster of a run
+
+	Returns:
+		str: Digest identifying the terrain, equal for equal rasters
+	"""
+
+	digest = hashlib.sha1(np.ascontiguousarray(biomes, dtype=np.uint8).tobytes())
+	digest.update("{}x{}".format(*biomes.shape).encode())
+	return digest.hexdigest()
+
+class RunLog:
+	"""
+	Samples the populations of a world every few steps for an ExperimentStore
+
+	Also notes when each species died out and its peak count, which are
+	exact since they are checked every step.
+	"""
+
+	COLUMNS = {
+		"step": np.int64, "time": np.float64,
+		"rabbits": np.int64, "foxes": np.int64, "food": np.int64,
+		"rabbit_hunger": np.float64, "rabbit_thirst": np.float64, "rabbit_speed": np.float64,
+		"fox_hunger": np.float64, "fox_thirst": np.float64, "fox_speed": np.float64,
+	}
+
+	def __init__(self, world, every: int = SAMPLE_EVERY):
+		"""
+		Initializes the RunLog and takes the first sample
+
+		Args:
+			world (World): The logged world
+			every (int): Steps between samples
+		"""
+
+		self.world = world
+		self.every = every
+		self.columns = {name: [] for name in self.COLUMNS}
+		self.rabbit_extinction = None
+		self.fox_extinction = None
+		self.peak_rabbits = len(world.rabbits)
+		self.peak_foxes = len(world.foxes)
+		self._started = perf_counter()
+		self._take()
+
+	def sample(self) -> None:
+		"""
+		Call after every World.step
+		"""
+
+		world = self.world
+		rabbits, foxes = len(world.rabbits), len(world.foxes)
+		self.peak_rabbits = max(self.peak_rabbits, rabbits)
+		self.peak_foxes = max(self.peak_foxes, foxes)
+		if not rabbits and self.rabbit_extinction is None:
+			self.rabbit_extinction = world.runtime/1000
+		if not foxes and self.fox_extinction is None:
+			self.fox_extinction = world.runtime/1000
+		if world.tick % self.every == 0:
+			self._take()
+
+	@property
+	def duration(self) -> float:
+		"""Wall clock seconds since the log was created"""
+		return perf_counter() - self._started
+
+	def outcome(self) -> str:
+		"""
+		Returns:
+			str: Which species died out first, or how the run stopped otherwise
+		"""
+
+		world = self.world
+		if self.rabbit_extinction is not None and (self.fox_extinction is None
+				or self.rabbit_extinction <= self.fox_extinction):
+			return "rabbits extinct"
+		if self.fox_extinction is not None:
+			return "foxes extinct"
+		if world._end_condition():
+			return "end condition"
+		return "stopped"
+
+	def arrays(self) -> {str: np.ndarray}:
+		"""
+		Returns:
+			{str: np.ndarray}: Every sampled column, including the last step
+		"""
+
+		if self.columns["step"][-1] != self.world.tick:
+			self._take()
+		return {name: np.array(values, dtype=self.COLUMNS[name]) for name, values in self.columns.items()}
+
+	def _take(self) -> None:
+		world = self.world
+		columns = self.columns
+		columns["step"].append(world.tick)
+		columns["time"].append(world.runtime/1000)
+		columns["rabbits"].append(len(world.rabbits))
+		columns["foxes"].append(len(world.foxes))
+		columns["food"].append(world.food_amount())
+		for prefix, stats in (("rabbit", world.rabbit_stats), ("fox", world.fox_stats)):
+			columns[prefix + "_hunger"].append(stats.hunger.mean)
+			columns[prefix + "_thirst"].append(stats.thirst.mean)
+			columns[prefix + "_speed"].append(stats.speed.mean)
+
+class ExperimentStore:
+	"""
+	SQLite database with one row per run and its time series stored column-wise
+
+	Parameters are kept one row each in a table keyed by (name, value, run),
+	so selecting the runs with some parameter values is an index lookup per
+	parameter, whatever the number of runs.
+	"""
+
+	def __init__(self, path: str):
+		"""
+		Initializes the ExperimentStore, creating the database if needed
+
+		Args:
+			path (str): Database file
+		"""
+
+		self._connection = sqlite3.connect(path)
+		self._connection.execute("PRAGMA journal_mode=WAL")
+		with self._connection:
+			for statement in _SCHEMA:
+				self._connection.execute(statement)
+
+	def add_run(self, log: RunLog, params: dict, seed: int, terrain: str) -> int:
+		"""
+		Stores a finished run
+
+		Args:
+			log (RunLog): Log of the run
+			params (dict): Parameter name -> value, None values are left out
+			seed (int): Random seed of the run
+			terrain (str): terrain_key of its terrain
+
+		Returns:
+			int: Id of the run
+		"""
+
+		world = log.world
+		with self._connection:
+			cursor = self._connection.execute(
+				"INSERT INTO runs VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				(datetime.now().isoformat(timespec="seconds"), seed, terrain, log.duration, world.tick,
+					world.runtime/1000, log.outcome(), log.rabbit_extinction, log.fox_extinction,
+					log.peak_rabbits, log.peak_foxes))
+			run = cursor.lastrowid
+			self._connection.executemany("INSERT INTO params VALUES (?, ?, ?)",
+				[(name, value, run) for name, value in params.items() if value is not None])
+			self._connection.executemany("INSERT INTO series VALUES (?, ?, ?, ?)",
+				[(run, name, array.dtype.str, array.tobytes()) for name, array in log.arrays().items()])
+		return run
+
+	def runs(self, **params) -> [int]:
+		"""
+		Args:
+			**params: Parameter values the runs must have been made with
+
+		Returns:
+			[int]: Ids of the matching runs
+		"""
+
+		sql, args = self._select("id", params)
+		return [run for run, in self._connection.execute(sql, args)]
+
+	def aggregate(self, column: str, function: str = "avg", **params) -> float:
+		"""
+		Aggregates a column of the runs table over the matching runs, e.g.
+		store.aggregate("fox_extinction", "avg", scale=200)
+
+		Args:
+			column (str): One of RUN_COLUMNS
+			function (str): One of AGGREGATES, NULLs are skipped as in SQL
+			**params: Parameter values the runs must have been made with
+
+		Returns:
+			float: The aggregate, None if no run has a value
+		"""
+
+		if column not in RUN_COLUMNS:
+			raise ValueError("unknown column {}, expected one of {}".format(column, ", ".join(RUN_COLUMNS)))
+		if function.lower() not in AGGREGATES:
+			raise ValueError("unknown aggregate {}, expected one of {}".format(function, ", ".join(AGGREGATES)))
+		sql, args = self._select("{}({})".format(function, column), params)
+		return self._connection.execute(sql, args).fetchone()[0]
+
+	def params(self, run: int) -> dict:
+		"""
+		Args:
+			run (int): Run id
+
+		Returns:
+			dict: Parameters of the run
+		"""
+
+		return dict(self._connection.execute("SELECT name, value FROM params WHERE run = ?", (run,)))
+
+	def series(self, run: int, name: str) -> np.ndarray:
+		"""
+		Args:
+			run (int): Run id
+			name (str): Column of RunLog.COLUMNS
+
+		Returns:
+			np.ndarray: The sampled column
+
+		Raises:
+			KeyError: The run has no such series
+		"""
+
+		row = self._connection.execute("SELECT dtype, data FROM series WHERE run = ? AND name = ?",
+			(run, name)).fetchone()
+		if row is None:
+			raise KeyError("run {} has no series {}".format(run, name))
+		return np.frombuffer(row[1], dtype=np.dtype(row[0]))
+
+	def close(self) -> None:
+		self._connection.close()
+
+	def __enter__(self) -> "ExperimentStore":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	@staticmethod
+	def _select(what: str, params: dict) -> (str, list):
+		"""
+		Args:
+			what (str): Selected expression over the runs table
+			params (dict): Parameter values the runs must have
+
+		Returns:
+			(str, list): Query and its arguments
+		"""
+
+		sql = "SELECT {} FROM runs".format(what)
+		if not params:
+			return sql, []
+		matching = " INTERSECT ".join(["SELECT run FROM params WHERE name = ? AND value = ?"]*len(params))
+		args = [item for pair in params.items() for item in pair]
+		return "{} WHERE id IN ({})".format(sql, matching), args
+
+def _parse_value(text: str):
+	for kind in (int, float):
+		try:
+			return kind(text)
+		except ValueError:
+			pass
+	return text
+
+if __name__ == "__main__":
+	from terrain_gen import generate_biomes
+	from world import World
+
+	parser = argparse.ArgumentParser(description="Runs headless experiments into a store and queries it")
+	parser.add_argument('store', help="Experiment database, created if missing.")
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	sweep = commands.add_parser("run", help="Run every combination of the given values, --runs times each.")
+	sweep.add_argument('--runs', help="Runs per combination, seeded seed, seed+1, ...", type=int, default=1)
+	sweep.add_argument('--seed', help="Seed of the first run.", type=int, default=0)
+	sweep.add_argument('--steps', help="Most steps per run.", type=int, default=3000)
+	sweep.add_argument('--width', type=int, default=960)
+	sweep.add_argument('--height', type=int, default=750)
+	swept = {
+		"scale": float, "octaves": int, "persistence": float, "lacunarity": float, "idlecheck": int,
+		"rabbits": int, "foxes": int, "food": int, "foodcap": int, "foodmodel": str, "endcondition": str,
+	}
+	for name, kind in swept.items():
+		sweep.add_argument('--' + name, type=kind, nargs="+", default=[EXPERIMENT_DEFAULTS[name]])
+
+	query = commands.add_parser("query", help="Aggregate a run column, e.g. query fox_extinction scale=200")
+	query.add_argument('column', choices=RUN_COLUMNS)
+	query.add_argument('where', nargs="*", help="name=value parameter filters.")
+	query.add_argument('--aggregate', choices=AGGREGATES, default="avg")
+	args = parser.parse_args()
+
+	with ExperimentStore(args.store) as store:
+		if args.command == "query":
+			filters = dict(condition.split("=", 1) for condition in args.where)
+			filters = {name: _parse_value(value) for name, value in filters.items()}
+			start = perf_counter()
+			value = store.aggregate(args.column, args.aggregate, **filters)
+			print("{}({}) over {} runs: {} ({:.2f} ms)".format(args.aggregate, args.column,
+				len(store.runs(**filters)), value, (perf_counter() - start)*1000))
+		else:
+			terrains = {}
+			for values in itertools.product(*(getattr(args, name) for name in swept)):
+				# Parameters that aren't swept keep the main.py defaults the terrain and world use
+				params = dict(EXPERIMENT_DEFAULTS, **dict(zip(swept, values)))
+				terrain_params = (params["scale"], params["octaves"], params["persistence"], params["lacunarity"])
+				if terrain_params not in terrains:
+					biomes = generate_biomes(args.width, args.height, *terrain_params)
+					terrains[terrain_params] = (biomes, terrain_key(biomes))
+				biomes, key = terrains[terrain_params]
+
+				for seed in range(args.seed, args.seed + args.runs):
+					random.seed(seed)
+					world = World((args.width, args.height), None, None, biomes, params["idlecheck"],
+						params["rabbits"], params["foxes"], params["food"], params["foodcap"], params["endcondition"],
+						0.0, params["foodmodel"])
+					log = RunLog(world)
+					while world.running and world.tick < args.steps:
+						world.step()
+						log.sample()
+					run = store.add_run(log, dict(params, width=args.width, height=args.height), seed, key)
+					print("run {}: {} after {} steps".format(run, log.outcome(), world.tick))
@@ -1,20 +1,25 @@
-import pygame
-FOOD_IMAGE = pygame.image.load("clover.png")
+from itertools import count
+from assets import sprite
+FOOD_IMAGE = "clover.png"
 FOOD_SIZE = 20
-FOOD_IMAGE = pygame.transform.scale(FOOD_IMAGE, (FOOD_SIZE, FOOD_SIZE))
+
+# Ids only need to be unique within a process
+_ids = count()
 
 class Food():
 	"""Class representing Food in the world"""
 
-	def __init__(self, world, pos: (float, float)):
-		self.world = world
+	__slots__ = ("id", "pos")
+
+	def __init__(self, pos: (float, float), id: int = None):
+		self.id = next(_ids) if id is None else id
 		self.pos = pos
 
-	def draw(self, screen: pygame.Surface) -> None:
+	def draw(self, screen: "pygame.Surface") -> None:
 		"""
 		Draws Rabbit to the screen
 
 		Args:
 			screen (pygame.Surface): The pygame surface
 		"""
-		screen.blit(FOOD_IMAGE, (self.pos[0] - FOOD_SIZE/2, self.pos[1] - FOOD_SIZE/2))
+		screen.blit(sprite(FOOD_IMAGE, FOOD_SIZE), (self.pos[0] - FOOD_SIZE/2, self.pos[1] - FOOD_SIZE/2))
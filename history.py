@@ -0,0 +1,151 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+
+# Samples kept in memory per series and samples moved to disk at once when it is full
+MEMORY_CAPACITY = 4096
+SPILL_BLOCK = 1024
+
+class Series:
+	"""
+	Append-only sequence of numbers with constant memory use
+
+	The newest samples live in a fixed-capacity typed ring buffer. When the
+	buffer is full its oldest block is appended to a file on disk. Indexing,
+	slicing and numpy conversion read across both as if everything were in
+	one array.
+	"""
+
+	def __init__(self, path: str, dtype=np.float64, capacity: int = MEMORY_CAPACITY, block: int = SPILL_BLOCK):
+		"""
+		Initializes the Series
+
+		Args:
+			path (str): Spill file, created on the first spill
+			dtype (numpy.dtype): Type of the samples
+			capacity (int): Samples kept in memory
+			block (int): Samples spilled at once, at most capacity
+		"""
+
+		self.path = path
+		self.dtype = np.dtype(dtype)
+		self._ring = np.zeros(capacity, dtype=self.dtype)
+		self._block = min(block, capacity)
+		# Position of the oldest sample in memory and number of samples in memory
+		self._head = 0
+		self._count = 0
+		self._spilled = 0
+
+	def append(self, value) -> None:
+		if self._count == len(self._ring):
+			self._spill()
+		self._ring[(self._head + self._count) % len(self._ring)] = value
+		self._count += 1
+
+	def __len__(self) -> int:
+		return self._spilled + self._count
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return self._read(*index.indices(len(self)))
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("Series index out of range")
+		return self._read(index, index + 1, 1)[0].item()
+
+	def __iter__(self):
+		# One block at a time, so iterating never loads the whole history
+		for start in range(0, len(self), self._block):
+			yield from self._read(start, min(start + self._block, len(self)), 1).tolist()
+
+	def __array__(self, dtype=None, copy=None) -> np.ndarray:
+		array = self._read(0, len(self), 1)
+		return array if dtype is None else array.astype(dtype)
+
+	def _read(self, start: int, stop: int, step: int) -> np.ndarray:
+		"""
+		Args:
+			start (int): First index
+			stop (int): Index to stop before
+			step (int): Stride
+
+		Returns:
+			np.ndarray: The samples, a copy
+		"""
+
+		if step < 0:
+			# Read the covered range forwards, then walk it backwards
+			if start <= stop:
+				return np.zeros(0, dtype=self.dtype)
+			return self._read(stop + 1, start + 1, 1)[::-1][::-step]
+		if stop <= start:
+			return np.zeros(0, dtype=self.dtype)
+
+		parts = []
+		if start < self._spilled:
+			# Samples on disk, read through a memory map of the spill file
+			disk = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self._spilled,))
+			parts.append(np.array(disk[start:min(stop, self._spilled)]))
+			del disk
+		if stop > self._spilled:
+			first = max(start, self._spilled) - self._spilled
+			last = stop - self._spilled
+			positions = (self._head + np.arange(first, last)) % len(self._ring)
+			parts.append(self._ring[positions])
+		array = np.concatenate(parts) if len(parts) > 1 else parts[0]
+		return array[::step] if step > 1 else array
+
+	def _spill(self) -> None:
+		"""
+		Appends the oldest block in memory to the spill file
+		"""
+
+		positions = (self._head + np.arange(self._block)) % len(self._ring)
+		with open(self.path, "ab") as file:
+			self._ring[positions].tofile(file)
+		self._head = (self._head + self._block) % len(self._ring)
+		self._count -= self._block
+		self._spilled += self._block
+
+class History:
+	"""Spill directory shared by a group of Series, removed with the History"""
+
+	def __init__(self, directory: str = None, prefix: str = "history"):
+		"""
+		Initializes the History
+
+		Args:
+			directory (str): Parent of the spill directory, the system temp directory by default
+			prefix (str): Name prefix of the spill directory
+		"""
+
+		self.directory = tempfile.mkdtemp(prefix=prefix + "-", dir=directory)
+		self._finalizer = weakref.finalize(self, _remove_tree, self.directory)
+
+	def series(self, name: str, dtype=np.float64, capacity: int = MEMORY_CAPACITY, block: int = SPILL_BLOCK) -> Series:
+		"""
+		Args:
+			name (str): Name of the series, unique within the History
+			dtype (numpy.dtype): Type of the samples
+			capacity (int): Samples kept in memory
+			block (int): Samples spilled at once
+
+		Returns:
+			Series: An empty series spilling into this History's directory
+		"""
+
+		return Series(os.path.join(self.directory, name + ".bin"), dtype, capacity, block)
+
+	def close(self) -> None:
+		"""
+		Deletes the spill files
+		"""
+
+		self._finalizer()
+
+def _remove_tree(directory: str) -> None:
+	for name in os.listdir(directory):
+		os.remove(os.path.join(directory, name))
+	os.rmdir(directory)
@@ -1,17 +1,31 @@
 import sys
 import pygame
 from pygame import image
-from world import World
+import random
+from world import World, END_CONDITIONS, FOOD_MODELS
+from scheduler import IDLE_CHECK_INTERVAL
+from metrics import MetricsServer
+from sharedstate import StatePublisher
+from trajectory import TrajectoryRecorder
+from eventlog import EventLog
+from experiments import ExperimentStore, RunLog, EXPERIMENT_PARAMS, terrain_key
+from replay import Replay
+from memprofile import MemoryProfiler
+from sampler import SamplingProfiler, DEFAULT_INTERVAL
 from statistics import Stats
 import os
 import argparse
 from terrain_gen import NoiseWidth
 from terrain_gen import Map2D
+from terrain_gen import save_biome_image
+from assets import terrain_surface, biomass_surface
 import pygame_menu as pyMenu 
 
 import matplotlib.pyplot as plt
 
 DEFAULT_SCREEN_SIZE = (960, 750)
+# Frames between redraws of the biomass overlay into the background, blending it costs ~10 ms
+OVERLAY_REFRESH = 15
 
 '''def menu_show(world):
 	menu = pyMenu.Menu(600, 600, 'Simulation data analysis',
@@ -43,9 +57,63 @@ if __name__ == "__main__":
 	parser.add_argument('--moisturep', help="Moisture persistence.", type=float, default=0.5)
 	parser.add_argument('--moisturel', help="Moisture lacunarity.", type=float, default=3.0)
 	parser.add_argument('--octaves', help="Octaves used for generation.", type=int, default=8)
+	parser.add_argument('--idlecheck', help="Steps between neighbour checks of idle animals, 1 disables idling.",
+                        type=int, default=IDLE_CHECK_INTERVAL)
+
+	parser.add_argument('--rabbits', help="Initial number of rabbits.", type=int, default=20)
+	parser.add_argument('--foxes', help="Initial number of foxes.", type=int, default=12)
+	parser.add_argument('--food', help="Initial amount of food.", type=int, default=80)
+	parser.add_argument('--foodcap', help="Food stops respawning at this amount.", type=int, default=80)
+	parser.add_argument('--foodmodel', help="Food as respawning objects or as a biomass field grazed by rabbits.",
+                        choices=FOOD_MODELS, default="objects")
+	parser.add_argument('--endcondition', help="When the simulation stops.", choices=sorted(END_CONDITIONS),
+                        default="default")
+	parser.add_argument('--seed', help="Random seed of the simulation.", type=int, default=None)
+	parser.add_argument('--metricsport', help="Serve live metrics on http://127.0.0.1:PORT/metrics.", type=int,
+                        default=None)
+	parser.add_argument('--share', help="Publish the world state in shared memory blocks with this name prefix.",
+                        default=None)
+	parser.add_argument('--record', help="Record every step to this trajectory log.", default=None)
+	parser.add_argument('--events', help="Log births, deaths, kills, meals and drinks to this SQLite database.",
+                        default=None)
+	parser.add_argument('--store', help="Add the run to this experiment database, see experiments.py.", default=None)
+	parser.add_argument('--replay', help="Play back a trajectory log instead of simulating.", default=None)
+	parser.add_argument('--memprofile', help="Sample memory use every N steps, see --memreport.", type=int,
+                        default=None)
+	parser.add_argument('--memreport', help="Memory report file written at exit.", default="memory_report.txt")
+	parser.add_argument('--profile', help="Sample the call stack during the run, collapsed stacks written to this file.",
+                        default=None)
+	parser.add_argument('--profileinterval', help="Milliseconds of CPU time between stack samples.", type=float,
+                        default=DEFAULT_INTERVAL*1000)
+	parser.add_argument('--exportmap', help="Also save the terrain as an image to this file.", default=None)
 
 # parse the arguments
 	args = parser.parse_args()
+
+	# Replay mode: draw a recorded run, no terrain generation and no simulation
+	if args.replay is not None:
+		replay = Replay(args.replay)
+		pygame.init()
+		screen = pygame.display.set_mode(replay.size)
+		clock = pygame.time.Clock()
+		while 1:
+			replay.draw(screen)
+			pygame.display.set_caption(replay.caption())
+			pygame.display.flip()
+
+			done = False
+			for event in pygame.event.get():
+				if event.type == pygame.QUIT:
+					done = True
+				elif event.type == pygame.KEYDOWN:
+					replay.handle(event)
+			if done:
+				break
+
+			replay.advance()
+			clock.tick(30)
+		replay.close()
+		sys.exit(0)
 	
 	scale = args.scale
 	moisture_scale = args.moistures
@@ -58,6 +126,9 @@ if __name__ == "__main__":
 		NoiseWidth('shallowwater', args.shallowwater),
 		NoiseWidth('water', args.water),
 	]
+	# Memory instrumentation covers terrain generation too
+	profiler = MemoryProfiler(args.memreport, args.memprofile) if args.memprofile is not None else None
+
 	# generate terrain
 	noise_map = Map2D(DEFAULT_SCREEN_SIZE[0], DEFAULT_SCREEN_SIZE[1], noise_ranges)
 	noise_map.generate( scale, args.octaves, args.persistence, args.lacunarity)
@@ -68,18 +139,18 @@ if __name__ == "__main__":
 
 	noise_map.moisture_map = moisture_map
 
-	
-	tilesize=1
-	 # display map
-	noise_map.display_as_image(tilesize)
-      
-	
-	file_name = 'noise_map.png'
-	noise_map.save_image(file_name) # save the png too
-	
 	noise_map.ret_water_points()
+	biomes = noise_map.biome_raster()
+	# The world only needs the raster, let the Cell objects go
+	noise_map.cells = []
+	moisture_map.cells = []
+
+	# Export the map only when asked
+	if args.exportmap is not None:
+		save_biome_image(biomes, args.exportmap)
 	
-	BG_IMG = pygame.image.load(file_name)
+	# Background drawn straight from the raster
+	BG_IMG = terrain_surface(biomes)
 	
 	# Start pygame
 	pygame.init()
@@ -88,23 +159,64 @@ if __name__ == "__main__":
 	screen = pygame.display.set_mode(DEFAULT_SCREEN_SIZE)
 	clock = pygame.time.Clock()
 
-	# Create world
-	world = World(DEFAULT_SCREEN_SIZE, clock, screen,noise_map.cells)
+	# Create world, stored runs always get a seed so they can be repeated
+	if args.store is not None and args.seed is None:
+		args.seed = random.randrange(2**32)
+	random.seed(args.seed)
+	world = World(DEFAULT_SCREEN_SIZE, clock, screen, biomes, args.idlecheck, args.rabbits, args.foxes,
+			args.food, args.foodcap, args.endcondition, food_model=args.foodmodel)
 	#menu_show(world)
 	paused = False
 
+	# Live metrics endpoint
+	if args.metricsport is not None:
+		metrics_server = MetricsServer(world, args.metricsport)
+		metrics_server.start()
+
+	# Per-step trajectory log, see trajectory.py
+	if args.record is not None:
+		world.recorder = TrajectoryRecorder(args.record, world)
+
+	# Population samples kept for the experiment store
+	run_log = RunLog(world) if args.store is not None else None
+
+	# Event log written by a background thread, see eventlog.py
+	if args.events is not None:
+		world.events = EventLog(args.events)
+		world.events.start()
+
+	# Shared memory state for external readers, see sharedstate.py
+	publisher = StatePublisher(world, args.share) if args.share is not None else None
+
 	# Create Trackers 
 	sc = Stats(world)
 	sc.start_all()
 
+	# Stack sampling profiler, see sampler.py
+	sampler = SamplingProfiler(args.profileinterval/1000) if args.profile is not None else None
+	if sampler is not None:
+		sampler.start()
+
+	# Terrain, with the biomass overlay once it is drawn
+	background = BG_IMG
+
 	# Main pygame loop
 	while 1:
 		# Pause check
 		if not paused:
 			world.step()
+			if run_log is not None:
+				run_log.sample()
+			if publisher is not None:
+				publisher.publish()
+			if profiler is not None:
+				profiler.step()
 			pygame.display.flip()
 			screen.fill((0, 0, 0))
-			screen.blit(BG_IMG, [0, 0])
+			if world.biomass is not None and world.tick % OVERLAY_REFRESH == 1:
+				background = BG_IMG.copy()
+				background.blit(biomass_surface(world.biomass, DEFAULT_SCREEN_SIZE), [0, 0])
+			screen.blit(background, [0, 0])
 
 		# pygame event handler
 		for event in pygame.event.get():
@@ -124,6 +236,23 @@ if __name__ == "__main__":
 
 	
 	
+	if run_log is not None:
+		with ExperimentStore(args.store) as store:
+			store.add_run(run_log, {name: getattr(args, name) for name in EXPERIMENT_PARAMS}, args.seed,
+				terrain_key(biomes))
+	if publisher is not None:
+		publisher.close()
+	if world.recorder is not None:
+		world.recorder.close()
+	if world.events is not None:
+		world.events.close()
+	if profiler is not None:
+		profiler.close()
+	if sampler is not None:
+		sampler.stop()
+		sampler.write(args.profile)
+		print(sampler.summary())
+
 	# join all Trackers
 	sc.join_all()
 	sc.menu_show()
@@ -0,0 +1,170 @@
+import atexit
+import gc
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+# Types always listed in the report, next to the largest ones
+WATCHED_TYPES = ("Rabbit", "Fox", "Food", "Water", "Cell", "list", "dict", "tuple")
+TOP = 12
+
+def type_breakdown() -> {str: (int, int)}:
+	"""
+	Counts the live objects tracked by the garbage collector
+
+	Returns:
+		{str: (int, int)}: Type name -> number of objects and their shallow size in bytes
+	"""
+
+	counts = Counter()
+	sizes = Counter()
+	for obj in gc.get_objects():
+		name = type(obj).__name__
+		counts[name] += 1
+		sizes[name] += sys.getsizeof(obj)
+	return {name: (counts[name], sizes[name]) for name in counts}
+
+class MemoryProfiler:
+	"""
+	Opt-in memory instrumentation sampled every few steps
+
+	Each sample takes a tracemalloc snapshot, attributed to the module that
+	allocated the memory, and counts the live objects per type. The report
+	written on close lists live bytes per module and type and how fast they
+	grew between consecutive samples.
+	"""
+
+	def __init__(self, path: str, every: int = 100, frames: int = 1):
+		"""
+		Initializes the MemoryProfiler and starts tracing allocations
+
+		Args:
+			path (str): Report file, written on close or at exit
+			every (int): Steps between samples
+			frames (int): Traceback depth kept by tracemalloc
+		"""
+
+		self.path = path
+		self.every = every
+		self.steps = 0
+		self.samples = []
+		self._started = not tracemalloc.is_tracing()
+		if self._started:
+			tracemalloc.start(frames)
+		self._closed = False
+		atexit.register(self.close)
+		self.sample()
+
+	def step(self) -> None:
+		"""
+		Counts a step, sampling every `every` steps
+		"""
+
+		self.steps += 1
+		if self.steps % self.every == 0:
+			self.sample()
+
+	def sample(self) -> None:
+		"""
+		Records the live memory per module and per type
+		"""
+
+		snapshot = tracemalloc.take_snapshot().filter_traces((
+			tracemalloc.Filter(False, tracemalloc.__file__),
+			tracemalloc.Filter(False, __file__),
+		))
+		modules = Counter()
+		for stat in snapshot.statistics("filename"):
+			modules[_module_name(stat.traceback[0].filename)] += stat.size
+		traced, peak = tracemalloc.get_traced_memory()
+		self.samples.append({
+			"step": self.steps,
+			"traced": traced,
+			"peak": peak,
+			"modules": modules,
+			"types": type_breakdown(),
+		})
+
+	def report(self) -> str:
+		"""
+		Returns:
+			str: Live bytes and growth per module and type over all samples
+		"""
+
+		lines = ["Memory report, {} samples every {} steps".format(len(self.samples), self.every)]
+		if not self.samples:
+			return lines[0] + "\n"
+
+		lines.append("")
+		lines.append("{:>8} {:>12} {:>12} {:>14}".format("step", "traced KB", "peak KB", "growth B/step"))
+		previous = None
+		for sample in self.samples:
+			growth = _rate(sample["traced"] - previous["traced"], sample, previous) if previous else 0.0
+			lines.append("{:>8} {:>12.1f} {:>12.1f} {:>14.1f}".format(
+				sample["step"], sample["traced"]/1024, sample["peak"]/1024, growth))
+			previous = sample
+
+		first, last = self.samples[0], self.samples[-1]
+		lines.append("")
+		lines.append("Live bytes by module at step {}, growth since step {}".format(last["step"], first["step"]))
+		lines.append("{:<40} {:>12} {:>14}".format("module", "live KB", "growth B/step"))
+		for name, size in last["modules"].most_common(TOP):
+			lines.append("{:<40} {:>12.1f} {:>14.1f}".format(
+				name, size/1024, _rate(size - first["modules"].get(name, 0), last, first)))
+
+		lines.append("")
+		lines.append("Live objects by type at step {}, growth since step {}".format(last["step"], first["step"]))
+		lines.append("{:<28} {:>10} {:>12} {:>12} {:>14}".format("type", "count", "shallow KB", "count diff",
+			"growth B/step"))
+		largest = sorted(last["types"], key=lambda name: last["types"][name][1], reverse=True)[:TOP]
+		for name in largest + [name for name in WATCHED_TYPES if name not in largest]:
+			count, size = last["types"].get(name, (0, 0))
+			first_count, first_size = first["types"].get(name, (0, 0))
+			lines.append("{:<28} {:>10} {:>12.1f} {:>+12} {:>14.1f}".format(
+				name, count, size/1024, count - first_count, _rate(size - first_size, last, first)))
+
+		lines.append("")
+		lines.append("Largest module changes between consecutive samples")
+		for before, after in zip(self.samples, self.samples[1:]):
+			changes = Counter(after["modules"])
+			changes.subtract(before["modules"])
+			top = sorted(changes.items(), key=lambda item: abs(item[1]), reverse=True)[:3]
+			lines.append("{:>8} -> {:<8} {}".format(before["step"], after["step"],
+				", ".join("{} {:+.1f} KB".format(name, size/1024) for name, size in top if size)))
+		return "\n".join(lines) + "\n"
+
+	def close(self) -> None:
+		"""
+		Takes a last sample, writes the report and stops tracing
+		"""
+
+		if self._closed:
+			return
+		self._closed = True
+		if self.samples and self.samples[-1]["step"] != self.steps:
+			self.sample()
+		with open(self.path, 'w', encoding='utf8') as file:
+			file.write(self.report())
+		if self._started:
+			tracemalloc.stop()
+		atexit.unregister(self.close)
+
+def _module_name(filename: str) -> str:
+	"""
+	Args:
+		filename (str): Source file of an allocation
+
+	Returns:
+		str: Module file name, with its package for files outside this directory
+	"""
+
+	here = os.path.dirname(os.path.abspath(__file__))
+	if os.path.dirname(os.path.abspath(filename)) == here:
+		return os.path.basename(filename)
+	parent = os.path.basename(os.path.dirname(filename))
+	return "{}/{}".format(parent, os.path.basename(filename))
+
+def _rate(change: int, later: dict, earlier: dict) -> float:
+	steps = later["step"] - earlier["step"]
+	return change / steps if steps else 0.0
@@ -0,0 +1,133 @@
+import argparse
+import tracemalloc
+from rabbit import Rabbit
+from fox import Fox
+from food import Food
+from water import Water
+from terrain_gen import Cell, NoiseWidth, NoiseMapBiome
+
+SAMPLE_SIZE = 10000
+
+def slot_names(cls) -> [str]:
+	"""
+	Collects the slot names of a class and all of its bases
+
+	Args:
+		cls (type): Slotted class
+
+	Returns:
+		[str]: Attribute names stored in slots
+	"""
+
+	names = []
+	for klass in reversed(cls.__mro__):
+		names.extend(getattr(klass, "__slots__", ()))
+	return names
+
+def _dict_layout(cls) -> type:
+	"""
+	Builds a plain class storing the same attributes in a per-instance __dict__,
+	which is how the entity classes were laid out before they got __slots__
+
+	Args:
+		cls (type): Slotted class
+
+	Returns:
+		type: Equivalent dict-backed class
+	"""
+
+	return type(cls.__name__ + "Dict", (), {})
+
+def bytes_per_instance(cls, template, count: int = SAMPLE_SIZE) -> float:
+	"""
+	Measures the bytes one instance costs on top of its attribute values
+
+	Attribute values are shared with template, so only the object layout
+	itself (header, slots or __dict__) is measured.
+
+	Args:
+		cls (type): Class to instantiate
+		template (object): Instance whose attribute values are copied
+		count (int): Number of instances to average over
+
+	Returns:
+		float: Average allocated bytes per instance
+	"""
+
+	values = [(name, getattr(template, name)) for name in slot_names(type(template))]
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	instances = []
+	for _ in range(count):
+		instance = object.__new__(cls)
+		for name, value in values:
+			setattr(instance, name, value)
+		instances.append(instance)
+	used = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+	# The list holding the instances is not part of the entities
+	used -= 8*count
+	return used / count
+
+def report(counts: dict) -> [(str, float, float, int)]:
+	"""
+	Measures bytes per entity before and after slotting for every entity type
+
+	Args:
+		counts (dict): Entity type name -> number of entities in the sized run
+
+	Returns:
+		[(str, float, float, int)]: (type, bytes before, bytes after, entity count) rows
+	"""
+
+	cell = Cell(0, 0, 0.0)
+	cell.biome = NoiseMapBiome.GRASSLAND
+	templates = [
+		Rabbit(None, (0.0, 0.0), 2.0),
+		Fox(None, (0.0, 0.0), 2.0),
+		Food((0.0, 0.0)),
+		Water((0.0, 0.0)),
+		cell,
+		NoiseWidth("water", 0.0),
+	]
+
+	rows = []
+	for template in templates:
+		cls = type(template)
+		before = bytes_per_instance(_dict_layout(cls), template)
+		# Food used to carry a back-reference to the world
+		if cls is Food:
+			before += 8
+		after = bytes_per_instance(cls, template)
+		rows.append((cls.__name__, before, after, counts.get(cls.__name__, 0)))
+	return rows
+
+def print_report(rows: [(str, float, float, int)]) -> None:
+	"""
+	Prints the memory report as a table
+
+	Args:
+		rows ([(str, float, float, int)]): Rows returned by report
+	"""
+
+	print("{:<12}{:>10}{:>10}{:>10}{:>12}{:>14}{:>14}".format(
+		"type", "before B", "after B", "saved %", "count", "before MB", "after MB"))
+	for name, before, after, count in rows:
+		print("{:<12}{:>10.1f}{:>10.1f}{:>10.1f}{:>12}{:>14.2f}{:>14.2f}".format(
+			name, before, after, 100*(before - after)/before, count,
+			before*count/2**20, after*count/2**20))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Bytes per entity before and after slotting")
+	parser.add_argument('--cells', help="Terrain cells in the sized run", type=int, default=960*750)
+	parser.add_argument('--rabbits', help="Rabbits in the sized run", type=int, default=20)
+	parser.add_argument('--foxes', help="Foxes in the sized run", type=int, default=12)
+	parser.add_argument('--food', help="Food in the sized run", type=int, default=80)
+	args = parser.parse_args()
+
+	print_report(report({
+		"Rabbit": args.rabbits,
+		"Fox": args.foxes,
+		"Food": args.food,
+		"Cell": args.cells,
+	}))
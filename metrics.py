@@ -0,0 +1,184 @@
+import os
+import resource
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+# Number of recent steps the latency percentiles and step rate are computed over
+LATENCY_WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class StepMetrics:
+	"""Counters updated by World.step, cheap enough to stay always on"""
+
+	def __init__(self, window: int = LATENCY_WINDOW):
+		"""
+		Initializes the StepMetrics
+
+		Args:
+			window (int): Number of recent steps kept for percentiles and step rate
+		"""
+
+		self.steps = 0
+		self.seconds = 0.0
+		self.latencies = deque(maxlen=window)
+		self.finished = deque(maxlen=window)
+
+	def record(self, start: float, end: float) -> None:
+		"""
+		Records one step
+
+		Args:
+			start (float): perf_counter() when the step started
+			end (float): perf_counter() when the step ended
+		"""
+
+		self.steps += 1
+		self.seconds += end - start
+		self.latencies.append(end - start)
+		self.finished.append(end)
+
+	def step_rate(self) -> float:
+		"""
+		Returns:
+			float: Steps per second over the recent window, 0 before two steps ran
+		"""
+
+		# list() of a deque runs in C while holding the GIL, so the stepping thread can't interleave
+		finished = list(self.finished)
+		if len(finished) < 2 or finished[-1] <= finished[0]:
+			return 0.0
+		return (len(finished) - 1) / (finished[-1] - finished[0])
+
+	def quantiles(self, quantiles: (float) = QUANTILES) -> [(float, float)]:
+		"""
+		Args:
+			quantiles ((float)): Quantiles to compute
+
+		Returns:
+			[(float, float)]: (quantile, step latency in seconds) pairs over the recent window
+		"""
+
+		latencies = sorted(self.latencies)
+		if not latencies:
+			return [(q, 0.0) for q in quantiles]
+		return [(q, latencies[min(int(q*len(latencies)), len(latencies) - 1)]) for q in quantiles]
+
+def resident_memory() -> int:
+	"""
+	Returns:
+		int: Current resident set size in bytes, the peak RSS where /proc is missing
+	"""
+
+	try:
+		with open("/proc/self/statm") as file:
+			return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+	except OSError:
+		return peak_memory()
+
+def peak_memory() -> int:
+	"""
+	Returns:
+		int: Peak resident set size in bytes
+	"""
+
+	# ru_maxrss is in KB on Linux
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def render(world) -> str:
+	"""
+	Renders the live metrics of a world in the Prometheus text format
+
+	Args:
+		world (World): The running world
+
+	Returns:
+		str: Exposition text
+	"""
+
+	metrics = world.metrics
+	lines = [
+		"# HELP sim_steps_total Steps simulated since the world was created.",
+		"# TYPE sim_steps_total counter",
+		"sim_steps_total {}".format(metrics.steps),
+		"# HELP sim_step_rate Steps per second over the last {} steps.".format(metrics.latencies.maxlen),
+		"# TYPE sim_step_rate gauge",
+		"sim_step_rate {:.6g}".format(metrics.step_rate()),
+		"# HELP sim_step_latency_seconds Time spent in World.step.",
+		"# TYPE sim_step_latency_seconds summary",
+	]
+	for quantile, latency in metrics.quantiles():
+		lines.append('sim_step_latency_seconds{{quantile="{}"}} {:.6g}'.format(quantile, latency))
+	lines += [
+		"sim_step_latency_seconds_sum {:.6g}".format(metrics.seconds),
+		"sim_step_latency_seconds_count {}".format(metrics.steps),
+		"# HELP sim_population Living animals per species.",
+		"# TYPE sim_population gauge",
+		'sim_population{{species="rabbit"}} {}'.format(world.rabbit_stats.count),
+		'sim_population{{species="fox"}} {}'.format(world.fox_stats.count),
+		"# HELP sim_idle_animals Animals on the cheap idle path.",
+		"# TYPE sim_idle_animals gauge",
+		"sim_idle_animals {}".format(world.scheduler.idle_count()),
+		"# HELP sim_food Food in the world.",
+		"# TYPE sim_food gauge",
+		"sim_food {}".format(world.food_amount()),
+		"# HELP sim_runtime_seconds Simulated time.",
+		"# TYPE sim_runtime_seconds gauge",
+		"sim_runtime_seconds {:.6g}".format(world.runtime / 1000),
+		"# HELP process_resident_memory_bytes Resident memory size in bytes.",
+		"# TYPE process_resident_memory_bytes gauge",
+		"process_resident_memory_bytes {}".format(resident_memory()),
+		"# HELP process_peak_resident_memory_bytes Peak resident memory size in bytes.",
+		"# TYPE process_peak_resident_memory_bytes gauge",
+		"process_peak_resident_memory_bytes {}".format(peak_memory()),
+	]
+	return "\n".join(lines) + "\n"
+
+class MetricsServer(Thread):
+	"""Serves the live metrics of a world over HTTP from a daemon thread"""
+
+	def __init__(self, world, port: int, host: str = "127.0.0.1"):
+		"""
+		Initializes the MetricsServer
+
+		Args:
+			world (World): The world to report on
+			port (int): Port to listen on, 0 picks a free one
+			host (str): Address to bind, local only by default
+		"""
+
+		Thread.__init__(self, daemon=True)
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(handler):
+				if handler.path not in ("/", "/metrics"):
+					handler.send_error(404)
+					return
+				body = render(world).encode()
+				handler.send_response(200)
+				handler.send_header("Content-Type", CONTENT_TYPE)
+				handler.send_header("Content-Length", str(len(body)))
+				handler.end_headers()
+				handler.wfile.write(body)
+
+			def log_message(handler, format, *args):
+				pass
+
+		self._server = ThreadingHTTPServer((host, port), Handler)
+		self.port = self._server.server_address[1]
+
+	def run(self) -> None:
+		"""
+		Serves requests until shutdown is called
+		"""
+
+		self._server.serve_forever()
+
+	def shutdown(self) -> None:
+		"""
+		Stops serving and closes the socket
+		"""
+
+		self._server.shutdown()
+		self._server.server_close()
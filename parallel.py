@@ -0,0 +1,527 @@
+import argparse
+import multiprocessing
+import random
+from time import perf_counter
+from types import SimpleNamespace
+import numpy as np
+from animal import State, Intent, reserve_ids
+from rabbit import Rabbit
+from fox import Fox
+from food import Food
+from spatial import Snapshot
+from scheduler import IDLE_CHECK_INTERVAL
+from world import World, END_CONDITIONS, HEADLESS_FRAME_TIME, resolve_claims
+
+# Largest sight in the world (Fox): anything closer to a tile border can be seen from the next tile.
+# Halos only reach the adjacent strips, so no strip may be narrower than this
+HALO_WIDTH = 200
+
+SPECIES = {"rabbit": Rabbit, "fox": Fox}
+
+def _kind(entity) -> str:
+	if isinstance(entity, Food):
+		return "food"
+	return "rabbit" if isinstance(entity, Rabbit) else "fox"
+
+class _Claim:
+	"""Claim on an entity that may be owned by another tile, settled by the ParallelEngine"""
+
+	__slots__ = ("intent", "actor", "rank", "kind", "target", "target_rank", "distance")
+
+	def __init__(self, intent: int, actor: int, rank: int, kind: str, target: int, target_rank: int,
+			distance: float):
+		self.intent = intent
+		self.actor = actor
+		self.rank = rank
+		self.kind = kind
+		self.target = target
+		self.target_rank = target_rank
+		self.distance = distance
+
+	def __reduce__(self):
+		return (_Claim, (self.intent, self.actor, self.rank, self.kind, self.target, self.target_rank, self.distance))
+
+class _Tile:
+	"""Vertical strip of the world owned by one worker process"""
+
+	def __init__(self, rank: int, workers: int, bounds: (float, float), biomes: np.ndarray, options: dict):
+		"""
+		Initializes the _Tile
+
+		Args:
+			rank (int): Index of the strip, left to right
+			workers (int): Number of strips
+			bounds ( (float, float) ): [x0, x1) range of the strip
+			biomes (np.ndarray): Biome raster of the whole world
+			options (dict): idle_check_interval and drink_delay for the tile's World
+		"""
+
+		self.rank = rank
+		self.x0, self.x1 = bounds
+		self.left = rank - 1 if rank > 0 else None
+		self.right = rank + 1 if rank < workers - 1 else None
+		# Food and initial animals come from the engine, so the local world starts empty
+		self.world = World((biomes.shape[1], biomes.shape[0]), None, None, biomes,
+			options["idle_check_interval"], 0, 0, 0, 0, "never", options["drink_delay"])
+		self._ghost_owner = {}
+		self._pending = None
+
+	def insert(self, animals: [(str, tuple)], food: [(int, (float, float))]) -> None:
+		"""
+		Adds animals that migrated into the strip and food that spawned in it
+
+		Args:
+			animals ([(str, tuple)]): (species, exported state) pairs
+			food ([(int, (float, float))]): (id, position) pairs
+		"""
+
+		for kind, state in animals:
+			self.world.add_animal(SPECIES[kind].restore(self.world, state))
+		for food_id, pos in food:
+			self.world.food.append(Food(pos, food_id))
+			self.world.scheduler.wake_near(pos)
+
+	def halo(self) -> {int: ([tuple], [tuple], [tuple])}:
+		"""
+		Exports everything the neighbouring strips can see
+
+		Returns:
+			{int: ([tuple], [tuple], [tuple])}: Neighbour rank -> exported food, Rabbits and Foxes
+		"""
+
+		halos = {}
+		for rank, inside in ((self.left, lambda x: x < self.x0 + HALO_WIDTH),
+				(self.right, lambda x: x >= self.x1 - HALO_WIDTH)):
+			if rank is None:
+				continue
+			halos[rank] = (
+				[(food.id, food.pos) for food in self.world.food if inside(food.pos[0])],
+				[rabbit.export() for rabbit in self.world.rabbits if inside(rabbit.pos[0])],
+				[fox.export() for fox in self.world.foxes if inside(fox.pos[0])],
+			)
+		return halos
+
+	def decide(self, ghosts: [(int, [tuple], [tuple], [tuple])]) -> [_Claim]:
+		"""
+		Runs the sense phase of the owned animals
+
+		Claims on entities near a border are returned to be settled by the engine,
+		claims on entities deeper inside the strip are settled locally on commit.
+
+		Args:
+			ghosts ([(int, [tuple], [tuple], [tuple])]): Owner rank and exported food,
+				Rabbits and Foxes of the neighbours' halos
+
+		Returns:
+			[_Claim]: Claims on entities that other strips may claim too
+		"""
+
+		world = self.world
+		snapshot = self.snapshot(ghosts)
+		actions = [world.scheduler.decide(animal, snapshot) for animal in world.rabbits + world.foxes]
+
+		claims = [action for action in actions if action.intent in (Intent.EAT, Intent.MATE)]
+		local = [action for action in claims if not self._shared(action.other)]
+		shared = [action for action in claims if self._shared(action.other)]
+
+		# Prey deep inside the strip can only be caught by local Foxes
+		kills = resolve_claims([a for a in local if a.intent == Intent.EAT and isinstance(a.other, Rabbit)])
+		killed = {action.other for action in kills}
+		shared = [action for action in shared if action.animal not in killed]
+
+		self._pending = (actions, local, kills, killed, {action.animal.id: action for action in shared})
+		return [
+			_Claim(action.intent.value, action.animal.id, self.rank, _kind(action.other), action.other.id,
+				self._ghost_owner.get(action.other, self.rank), action.distance)
+			for action in shared
+		]
+
+	def snapshot(self, ghosts: [(int, [tuple], [tuple], [tuple])]) -> Snapshot:
+		"""
+		Rebuilds the neighbours' halos as ghosts and freezes the strip with them
+
+		Args:
+			ghosts ([(int, [tuple], [tuple], [tuple])]): Owner rank and exported food,
+				Rabbits and Foxes of the neighbours' halos
+
+		Returns:
+			Snapshot: What the owned animals see this step
+		"""
+
+		world = self.world
+		self._ghost_owner = {}
+		ghost_lists = ([], [], [])
+		for rank, food, rabbits, foxes in ghosts:
+			entities = (
+				[Food(pos, food_id) for food_id, pos in food],
+				[Rabbit.restore(world, state) for state in rabbits],
+				[Fox.restore(world, state) for state in foxes],
+			)
+			for ghost_list, group in zip(ghost_lists, entities):
+				ghost_list.extend(group)
+				for entity in group:
+					self._ghost_owner[entity] = rank
+
+		world.update_paces()
+		return Snapshot(world, ghost_lists)
+
+	def commit(self, results: SimpleNamespace) -> ([(str, tuple)], (int, int, int)):
+		"""
+		Runs the commit phase with the settled border claims, mirroring World._commit
+
+		Args:
+			results (SimpleNamespace): granted actor ids and ids of owned entities that were
+				killed, eaten or mated by border claims
+
+		Returns:
+			([(str, tuple)], (int, int, int)): Emigrating animals and the Rabbit, Fox and Food counts left
+		"""
+
+		world = self.world
+		actions, local, kills, killed, shared = self._pending
+		self._pending = None
+		granted = [shared[actor] for actor in results.granted]
+
+		killed |= {rabbit for rabbit in world.rabbits if rabbit.id in results.killed}
+		actions = [action for action in actions if action.animal not in killed]
+		for action in actions:
+			action.animal.apply(action)
+
+		for action in kills + [a for a in granted if a.intent == Intent.EAT and isinstance(a.other, Rabbit)]:
+			action.animal.consume()
+		world.remove_animals(killed)
+
+		meals = resolve_claims([a for a in local
+			if a.intent == Intent.EAT and isinstance(a.other, Food) and a.animal not in killed])
+		meals += [a for a in granted if a.intent == Intent.EAT and isinstance(a.other, Food)]
+		for action in meals:
+			action.animal.consume()
+		eaten = {action.other for action in meals}
+		if eaten or results.eaten:
+			world.food = [food for food in world.food if food not in eaten and food.id not in results.eaten]
+
+		for action in actions:
+			if action.intent == Intent.DRINK:
+				action.animal.quench()
+
+		births = []
+		mated = set()
+		for action in granted:
+			if action.intent == Intent.MATE:
+				mated.add(action.animal)
+				births.append(action.animal.mate(action.other))
+		for animal in world.rabbits + world.foxes:
+			if animal.id in results.mated:
+				# Partner of an animal from the next strip
+				animal.state = State.ROAM
+				mated.add(animal)
+		for action in resolve_claims([a for a in local
+				if a.intent == Intent.MATE and a.animal not in killed and a.other not in killed]):
+			if action.animal not in mated and action.other not in mated:
+				mated.update((action.animal, action.other))
+				births.append(action.animal.mate(action.other))
+
+		world.remove_animals(world._metabolize())
+		for child in births:
+			world.add_animal(child)
+		for action in actions:
+			if action.animal.stats is not None:
+				world.scheduler.settle(action)
+
+		leaving = [animal for animal in world.rabbits + world.foxes if not self.x0 <= animal.pos[0] < self.x1]
+		migrants = [(_kind(animal), animal.export()) for animal in leaving]
+		world.remove_animals(set(leaving))
+		return migrants, (len(world.rabbits), len(world.foxes), world.food_amount())
+
+	def _shared(self, entity) -> bool:
+		"""
+		Determines if other strips can claim an entity too
+
+		Args:
+			entity (object): Food or animal
+
+		Returns:
+			bool: True for ghosts and owned entities within HALO_WIDTH of a neighbour
+		"""
+
+		if entity in self._ghost_owner:
+			return True
+		x = entity.pos[0]
+		return (
+			(self.left is not None and x < self.x0 + HALO_WIDTH) or
+			(self.right is not None and x >= self.x1 - HALO_WIDTH)
+			)
+
+def _worker(conn, rank: int, workers: int, bounds: (float, float), biomes: np.ndarray, seed: int,
+		first_id: int, options: dict) -> None:
+	"""
+	Main loop of a worker process, serving one _Tile
+
+	Args:
+		conn (multiprocessing.connection.Connection): Pipe to the engine
+		rank (int): Index of the strip
+		workers (int): Number of strips
+		bounds ( (float, float) ): [x0, x1) range of the strip
+		biomes (np.ndarray): Biome raster of the whole world
+		seed (int): Random seed of the run
+		first_id (int): Smallest id free for new animals
+		options (dict): Options of the tile's World
+	"""
+
+	random.seed(seed * workers + rank)
+	reserve_ids(first_id + rank, workers)
+	tile = _Tile(rank, workers, bounds, biomes, options)
+
+	while True:
+		command, payload = conn.recv()
+		if command == "insert":
+			tile.insert(*payload)
+			conn.send(tile.halo())
+		elif command == "decide":
+			conn.send(tile.decide(payload))
+		elif command == "commit":
+			conn.send(tile.commit(payload))
+		else:
+			break
+	conn.close()
+
+def settle_claims(claims: [_Claim]) -> {int: SimpleNamespace}:
+	"""
+	Settles border claims from all tiles with the rules of World._commit
+
+	Args:
+		claims ([_Claim]): Claims returned by every tile's decide
+
+	Returns:
+		{int: SimpleNamespace}: Tile rank -> granted actor ids and ids of owned entities
+			that were killed, eaten or mated
+	"""
+
+	results = {}
+	def result(rank: int) -> SimpleNamespace:
+		if rank not in results:
+			results[rank] = SimpleNamespace(granted=set(), killed=set(), eaten=set(), mated=set())
+		return results[rank]
+
+	# Closest claim first, ties to the lowest id, as in resolve_claims
+	claims = sorted(claims, key=lambda claim: (claim.distance, claim.actor))
+
+	killed = set()
+	for claim in claims:
+		if claim.intent == Intent.EAT.value and claim.kind == "rabbit" and claim.target not in killed:
+			killed.add(claim.target)
+			result(claim.rank).granted.add(claim.actor)
+			result(claim.target_rank).killed.add(claim.target)
+	claims = [claim for claim in claims if claim.actor not in killed]
+
+	eaten = set()
+	for claim in claims:
+		if claim.intent == Intent.EAT.value and claim.kind == "food" and claim.target not in eaten:
+			eaten.add(claim.target)
+			result(claim.rank).granted.add(claim.actor)
+			result(claim.target_rank).eaten.add(claim.target)
+
+	courted = set()
+	mated = set()
+	for claim in claims:
+		# A partner eaten this step can't mate any more
+		if claim.intent != Intent.MATE.value or claim.target in courted or claim.target in killed:
+			continue
+		courted.add(claim.target)
+		if claim.actor not in mated and claim.target not in mated:
+			mated.update((claim.actor, claim.target))
+			result(claim.rank).granted.add(claim.actor)
+			result(claim.target_rank).mated.add(claim.target)
+	return results
+
+def max_workers(width: int) -> int:
+	"""
+	Args:
+		width (int): World width
+
+	Returns:
+		int: Most strips a world this wide can be split into, each at least HALO_WIDTH wide
+	"""
+
+	return max(width // HALO_WIDTH, 1)
+
+class ParallelEngine:
+	"""
+	Runs a headless world split into vertical strips, one worker process per strip
+
+	Every strip owns the Rabbits, Foxes and Food inside it. Each step the
+	strips exchange everything within HALO_WIDTH of their borders, decide
+	independently, have the claims on border entities settled here with
+	the same rules as World._commit, commit, and hand over the animals
+	that crossed a border.
+	"""
+
+	def __init__(self, biomes: np.ndarray, workers: int, rabbits: int = 20, foxes: int = 12, food: int = 80,
+			food_cap: int = 80, end_condition: str = "default", seed: int = 0,
+			idle_check_interval: int = IDLE_CHECK_INTERVAL, drink_delay: float = 0.0):
+		"""
+		Initializes the ParallelEngine and starts the workers
+
+		Args:
+			biomes (np.ndarray): Biome raster of the world
+			workers (int): Number of strips and worker processes
+			rabbits (int): Initial Rabbit count
+			foxes (int): Initial Fox count
+			food (int): Initial Food count
+			food_cap (int): No Food is added while this much Food is in the world
+			end_condition (str): Key of END_CONDITIONS deciding when the simulation is complete
+			seed (int): Random seed of the run
+			idle_check_interval (int): Steps between neighbour checks of idle animals
+			drink_delay (float): Seconds an animal blocks its worker while drinking
+
+		Raises:
+			ValueError: A strip would be narrower than HALO_WIDTH
+		"""
+
+		if workers < 1 or biomes.shape[1] // workers < HALO_WIDTH:
+			raise ValueError("{} workers give strips narrower than HALO_WIDTH ({} px), use 1 to {} for width {}".format(
+				workers, HALO_WIDTH, max_workers(biomes.shape[1]), biomes.shape[1]))
+
+		random.seed(seed)
+		# Spawns the initial populations and later samples food positions
+		self._world = World((biomes.shape[1], biomes.shape[0]), None, None, biomes, idle_check_interval,
+			rabbits, foxes, food, food_cap, end_condition, drink_delay)
+		self.size = self._world.size
+		self.food_cap = food_cap
+		self.end_condition = end_condition
+		self.running = True
+		self.runtime = 0
+		self.runtime_checkpoint = 0
+		self.steps = 0
+
+		self.workers = workers
+		self._strip = self.size[0] / workers
+		first_id = max([a.id for a in self._world.rabbits + self._world.foxes], default=0) + 1
+		options = {"idle_check_interval": idle_check_interval, "drink_delay": drink_delay}
+
+		self._conns = []
+		self._processes = []
+		for rank in range(workers):
+			parent, child = multiprocessing.Pipe()
+			bounds = (rank*self._strip, (rank + 1)*self._strip if rank < workers - 1 else float("inf"))
+			if rank == 0:
+				bounds = (float("-inf"), bounds[1])
+			process = multiprocessing.Process(target=_worker, daemon=True,
+				args=(child, rank, workers, bounds, biomes, seed, first_id, options))
+			process.start()
+			self._conns.append(parent)
+			self._processes.append(process)
+
+		self._arriving = [[] for _ in range(workers)]
+		self._spawned = [[] for _ in range(workers)]
+		for animal in self._world.rabbits + self._world.foxes:
+			self._arriving[self._owner(animal.pos)].append((_kind(animal), animal.export()))
+		for item in self._world.food:
+			self._spawned[self._owner(item.pos)].append((item.id, item.pos))
+		self.rabbit_count = len(self._world.rabbits)
+		self.fox_count = len(self._world.foxes)
+		self.food_count = self._world.food_amount()
+		self._world.rabbits, self._world.foxes, self._world.food = [], [], []
+
+	def step(self) -> None:
+		"""
+		Advances the whole world by one frame
+		"""
+
+		# Add food every second, the owning strip receives it
+		self.runtime += HEADLESS_FRAME_TIME
+		if (self.runtime - self.runtime_checkpoint) / 1000 >= 1 and self.food_count < self.food_cap:
+			self.runtime_checkpoint = self.runtime
+			pos = self._world.sample_positions(self._world.landcells, 1)[0]
+			self._spawned[self._owner(pos)].append((Food(pos).id, pos))
+
+		# Hand over arrivals and collect the halos
+		for rank, conn in enumerate(self._conns):
+			conn.send(("insert", (self._arriving[rank], self._spawned[rank])))
+		halos = [conn.recv() for conn in self._conns]
+		self._arriving = [[] for _ in range(self.workers)]
+		self._spawned = [[] for _ in range(self.workers)]
+
+		# Sense in every strip, with the neighbours' halos as ghosts
+		for rank, conn in enumerate(self._conns):
+			ghosts = [(source, *halos[source][rank]) for source in (rank - 1, rank + 1) if 0 <= source < self.workers]
+			conn.send(("decide", ghosts))
+		claims = [claim for conn in self._conns for claim in conn.recv()]
+
+		# Settle border claims, then commit everywhere
+		results = settle_claims(claims)
+		for rank, conn in enumerate(self._conns):
+			empty = SimpleNamespace(granted=set(), killed=set(), eaten=set(), mated=set())
+			conn.send(("commit", results.get(rank, empty)))
+
+		self.rabbit_count = self.fox_count = self.food_count = 0
+		for conn in self._conns:
+			migrants, (rabbits, foxes, food) = conn.recv()
+			for kind, state in migrants:
+				self._arriving[self._owner(state[2])].append((kind, state))
+				if kind == "rabbit":
+					rabbits += 1
+				else:
+					foxes += 1
+			self.rabbit_count += rabbits
+			self.fox_count += foxes
+			self.food_count += food
+		self.steps += 1
+
+		# Stop condition
+		counts = SimpleNamespace(rabbits=range(self.rabbit_count), foxes=range(self.fox_count))
+		if END_CONDITIONS[self.end_condition](counts):
+			self.running = False
+
+	def close(self) -> None:
+		"""
+		Stops the worker processes
+		"""
+
+		for conn in self._conns:
+			conn.send(("close", None))
+			conn.close()
+		for process in self._processes:
+			process.join()
+
+	def _owner(self, pos: (float, float)) -> int:
+		"""
+		Args:
+			pos ( (float, float) ): Position
+
+		Returns:
+			int: Rank of the strip containing pos
+		"""
+
+		return min(max(int(pos[0] // self._strip), 0), self.workers - 1)
+
+	def __repr__(self) -> str:
+		return "size={}, workers={}, rabbits={}, foxes={}, food={}".format(
+			self.size, self.workers, self.rabbit_count, self.fox_count, self.food_count)
+
+if __name__ == "__main__":
+	from terrain_gen import generate_biomes
+
+	parser = argparse.ArgumentParser(description="Runs a headless world split across worker processes")
+	parser.add_argument('--workers', help="Number of strips and worker processes, by default one per CPU "
+		"as long as strips stay HALO_WIDTH wide.", type=int, default=None)
+	parser.add_argument('--rabbits', help="Initial number of rabbits.", type=int, default=20)
+	parser.add_argument('--foxes', help="Initial number of foxes.", type=int, default=12)
+	parser.add_argument('--food', help="Initial amount of food.", type=int, default=80)
+	parser.add_argument('--foodcap', help="Food stops respawning at this amount.", type=int, default=80)
+	parser.add_argument('--steps', help="Steps to run.", type=int, default=300)
+	parser.add_argument('--seed', help="Random seed of the run.", type=int, default=0)
+	parser.add_argument('--width', help="World width.", type=int, default=960)
+	parser.add_argument('--height', help="World height.", type=int, default=750)
+	args = parser.parse_args()
+	workers = args.workers if args.workers is not None else min(multiprocessing.cpu_count(), max_workers(args.width))
+
+	engine = ParallelEngine(generate_biomes(args.width, args.height), workers, args.rabbits, args.foxes,
+		args.food, args.foodcap, "never", args.seed)
+	start = perf_counter()
+	for _ in range(args.steps):
+		engine.step()
+	elapsed = perf_counter() - start
+	engine.close()
+	print(engine)
+	print("{:.1f} steps/s".format(args.steps / elapsed))
@@ -0,0 +1,188 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from scaling import run_scenario
+
+BASELINE_FILE = "perf_baseline.json"
+
+# Seeded scenarios, all headless
+SCENARIOS = {
+	"default": {"width": 960, "height": 750, "rabbits": 20, "foxes": 12, "food": 80, "steps": 300},
+	"dense-1k": {"width": 960, "height": 750, "rabbits": 625, "foxes": 375, "food": 500, "steps": 100},
+	# Largest map the default terrain thresholds generate without hitting unmapped mountain biomes
+	"large-map": {"width": 1600, "height": 1250, "rabbits": 80, "foxes": 48, "food": 320, "steps": 300},
+}
+
+# Largest accepted relative change in the bad direction
+DEFAULT_TOLERANCES = {
+	"steps_per_second": 0.15,
+	"terrain_seconds": 0.25,
+	"peak_rss_mb": 0.15,
+}
+
+# Metrics where a higher value is better
+HIGHER_IS_BETTER = {"steps_per_second"}
+
+def generate_terrain(name: str) -> (object, float):
+	"""
+	Generates the terrain of a scenario, meant for a fresh process
+
+	Args:
+		name (str): Key of SCENARIOS
+
+	Returns:
+		(np.ndarray, float): Biome raster and generation seconds
+	"""
+
+	from terrain_gen import generate_biomes
+
+	scenario = SCENARIOS[name]
+	start = perf_counter()
+	biomes = generate_biomes(scenario["width"], scenario["height"])
+	return biomes, perf_counter() - start
+
+def measure(name: str, seed: int) -> dict:
+	"""
+	Generates the terrain of a scenario and runs it, each in its own process
+
+	The Cell-based terrain generation peaks far above the simulation, so the
+	simulation only gets the finished raster and its peak RSS is its own.
+
+	Args:
+		name (str): Key of SCENARIOS
+		seed (int): Random seed
+
+	Returns:
+		dict: Steps per second, terrain generation seconds and peak RSS of the simulation in MB
+	"""
+
+	scenario = SCENARIOS[name]
+	with ProcessPoolExecutor(max_workers=1) as pool:
+		biomes, terrain_seconds = pool.submit(generate_terrain, name).result()
+	with ProcessPoolExecutor(max_workers=1) as pool:
+		result = pool.submit(run_scenario, biomes, scenario["rabbits"], scenario["foxes"], scenario["food"],
+			scenario["steps"], seed, 5).result()
+	return {
+		"steps_per_second": 1000 / result["mean_step_ms"],
+		"terrain_seconds": terrain_seconds,
+		"peak_rss_mb": result["peak_rss_mb"],
+	}
+
+def run(names: [str], seed: int, repeat: int) -> {str: dict}:
+	"""
+	Measures scenarios, keeping the best of repeat runs per metric
+
+	Args:
+		names ([str]): Keys of SCENARIOS
+		seed (int): Random seed
+		repeat (int): Runs per scenario
+
+	Returns:
+		{str: dict}: Scenario -> metrics
+	"""
+
+	results = {}
+	for name in names:
+		runs = []
+		for _ in range(repeat):
+			runs.append(measure(name, seed))
+		results[name] = {
+			metric: (max if metric in HIGHER_IS_BETTER else min)(run[metric] for run in runs)
+			for metric in runs[0]
+		}
+	return results
+
+def compare(results: {str: dict}, baseline: dict) -> ([str], bool):
+	"""
+	Compares measurements with a baseline
+
+	Args:
+		results ({str: dict}): Output of run
+		baseline (dict): Contents of the baseline file
+
+	Returns:
+		([str], bool): Report lines and whether anything regressed
+	"""
+
+	tolerances = dict(DEFAULT_TOLERANCES, **baseline.get("tolerances", {}))
+	lines = []
+	regressed = False
+	for name, metrics in results.items():
+		expected = baseline["scenarios"].get(name)
+		lines.append(name)
+		if expected is None:
+			lines.append("  no baseline, skipped")
+			continue
+		for metric, value in metrics.items():
+			base = expected[metric]
+			change = (value - base) / base if base else 0.0
+			worse = -change if metric in HIGHER_IS_BETTER else change
+			status = "ok"
+			if worse > tolerances[metric]:
+				status = "REGRESSED"
+				regressed = True
+			lines.append("  {:<18} {:>10.3f} -> {:>10.3f}  {:>+7.1%}  (tolerance {:.0%})  {}".format(
+				metric, base, value, change, tolerances[metric], status))
+	return lines, regressed
+
+def baseline_seed(baseline: dict, name: str) -> int:
+	"""
+	Args:
+		baseline (dict): Contents of the baseline file
+		name (str): Key of SCENARIOS in it
+
+	Returns:
+		int: Seed the scenario's baseline was measured with, older files keep one for all scenarios
+	"""
+
+	return baseline["scenarios"][name].get("seed", baseline.get("seed", 0))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Fails when throughput, terrain time or memory regress "
+		"against the committed baseline")
+	parser.add_argument('--baseline', help="Baseline file.", default=BASELINE_FILE)
+	parser.add_argument('--scenarios', help="Scenarios to run.", nargs='+', choices=list(SCENARIOS),
+		default=list(SCENARIOS))
+	parser.add_argument('--seed', help="Random seed of every scenario.", type=int, default=0)
+	parser.add_argument('--repeat', help="Runs per scenario, the best is compared.", type=int, default=1)
+	parser.add_argument('--update', help="Write the measurements as the new baseline instead of comparing.",
+		action='store_true')
+	args = parser.parse_args()
+
+	if not args.update:
+		with open(args.baseline, encoding='utf8') as file:
+			baseline = json.load(file)
+		# Other seeds run other worlds, their numbers can't be held against this baseline
+		mismatched = [(name, baseline_seed(baseline, name)) for name in args.scenarios
+			if name in baseline["scenarios"] and baseline_seed(baseline, name) != args.seed]
+		if mismatched:
+			for name, seed in mismatched:
+				print("baseline of {} in {} was measured with --seed {}, not {}".format(
+					name, args.baseline, seed, args.seed))
+			print("rerun with the baseline seed or --update")
+			sys.exit(2)
+
+	results = run(args.scenarios, args.seed, args.repeat)
+
+	if args.update:
+		try:
+			with open(args.baseline, encoding='utf8') as file:
+				baseline = json.load(file)
+		except FileNotFoundError:
+			baseline = {"tolerances": DEFAULT_TOLERANCES, "scenarios": {}}
+		# Every scenario keeps the seed it was measured with, a partial update may use another one
+		for name in baseline["scenarios"]:
+			baseline["scenarios"][name]["seed"] = baseline_seed(baseline, name)
+		baseline.pop("seed", None)
+		for name, metrics in results.items():
+			baseline["scenarios"][name] = dict(metrics, seed=args.seed)
+		with open(args.baseline, 'w', encoding='utf8') as file:
+			json.dump(baseline, file, indent=4)
+		print("baseline written to {}".format(args.baseline))
+		sys.exit(0)
+
+	lines, regressed = compare(results, baseline)
+	print("\n".join(lines))
+	sys.exit(1 if regressed else 0)
@@ -0,0 +1,113 @@
+from assets import sprite, terrain_surface
+from trajectory import TrajectoryReader, RABBIT, FOX, FOOD
+from rabbit import RABBIT_IMAGE, RABBIT_SIZE
+from fox import WOLF_IMAGE, WOLF_SIZE
+from food import FOOD_IMAGE, FOOD_SIZE
+
+# Recorded steps skipped by a seek
+SEEK_STEPS = 150
+MAX_SPEED = 64
+
+# Sprite file and size per species; sizes are not recorded, every animal is drawn at full size
+SPRITES = {
+	RABBIT: (RABBIT_IMAGE, RABBIT_SIZE),
+	FOX: (WOLF_IMAGE, WOLF_SIZE),
+	FOOD: (FOOD_IMAGE, FOOD_SIZE),
+}
+
+class Replay:
+	"""
+	Plays a trajectory log back on a pygame screen
+
+	Frames are drawn straight from the log's arrays; no entities are
+	rebuilt and nothing is simulated.
+
+	Keys: SPACE pauses, LEFT/RIGHT seek, UP/DOWN change the speed,
+	R reverses and HOME goes back to the start.
+	"""
+
+	def __init__(self, path: str):
+		"""
+		Initializes the Replay
+
+		Args:
+			path (str): Trajectory log written with --record
+		"""
+
+		self.reader = TrajectoryReader(path)
+		self.size = (self.reader.width, self.reader.height)
+		self.background = terrain_surface(self.reader.biomes)
+		# Fractional steps, so speeds below one step per frame work too
+		self.position = 0.0
+		self.speed = 1.0
+		self.direction = 1
+		self.paused = False
+
+	@property
+	def step(self) -> int:
+		return int(self.position)
+
+	def advance(self) -> None:
+		"""
+		Moves the playback position by one frame's worth of steps
+		"""
+
+		if not self.paused:
+			self.seek(self.position + self.direction*self.speed)
+
+	def seek(self, position: float) -> None:
+		"""
+		Args:
+			position (float): Step to show, clamped to the recording
+		"""
+
+		self.position = min(max(position, 0.0), max(self.reader.steps - 1, 0))
+
+	def handle(self, event) -> None:
+		"""
+		Applies a key press
+
+		Args:
+			event (pygame.event.Event): KEYDOWN event
+		"""
+
+		import pygame
+		if event.key == pygame.K_SPACE:
+			self.paused = not self.paused
+		elif event.key == pygame.K_RIGHT:
+			self.seek(self.position + SEEK_STEPS)
+		elif event.key == pygame.K_LEFT:
+			self.seek(self.position - SEEK_STEPS)
+		elif event.key == pygame.K_UP:
+			self.speed = min(self.speed*2, MAX_SPEED)
+		elif event.key == pygame.K_DOWN:
+			self.speed = max(self.speed/2, 1/MAX_SPEED)
+		elif event.key == pygame.K_r:
+			self.direction = -self.direction
+		elif event.key == pygame.K_HOME:
+			self.seek(0)
+
+	def draw(self, screen: "pygame.Surface") -> None:
+		"""
+		Draws the current step
+
+		Args:
+			screen (pygame.Surface): The pygame surface
+		"""
+
+		screen.blit(self.background, (0, 0))
+		if not self.reader.steps:
+			return
+		frame = self.reader.frame(self.step)
+		for species, (image, size) in SPRITES.items():
+			mask = frame.species == species
+			surface = sprite(image, size)
+			screen.blits([(surface, (x - size/2, y - size/2))
+				for x, y in zip(frame.x[mask].tolist(), frame.y[mask].tolist())], False)
+
+	def caption(self) -> str:
+		return "Replay step {}/{}  {}x{:g}{}".format(self.step, self.reader.steps, "-" if self.direction < 0 else "",
+			self.speed, "  paused" if self.paused else "")
+
+	def close(self) -> None:
+		self.reader.close()
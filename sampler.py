@@ -0,0 +1,219 @@
+import argparse
+import os
+import signal
+import threading
+from collections import Counter, deque
+
+DEFAULT_INTERVAL = 0.005
+# Stack frames deeper than this are cut off at the root
+MAX_DEPTH = 128
+# Seconds between aggregations of the taken samples
+AGGREGATE_INTERVAL = 0.5
+
+class SamplingProfiler(threading.Thread):
+	"""
+	Samples the call stack of the main thread and aggregates the samples in a background thread
+
+	A CPU time timer interrupts the main thread every interval; the signal
+	handler only notes the code objects on the stack and a label, formatting
+	and counting happen in this thread. Sampling from another thread through
+	sys._current_frames instead only sees the main thread when it hands over
+	the GIL, which it mostly does in numpy calls, so those would soak up most
+	samples.
+
+	Every sample is labelled with what the simulation was busy with: the
+	state of the animal whose code is on the stack (ROAM, REPRODUCE),
+	fleeing for a Rabbit deciding with Foxes in sight, drinking for an
+	animal heading to or drinking water, or world for everything else. Samples are counted per
+	collapsed stack, the format flamegraph.pl, speedscope and inferno read.
+	"""
+
+	def __init__(self, interval: float = DEFAULT_INTERVAL):
+		"""
+		Initializes the SamplingProfiler, start has to be called from the main thread
+
+		Args:
+			interval (float): Seconds of CPU time between samples
+		"""
+
+		threading.Thread.__init__(self, daemon=True)
+		self.interval = interval
+		self.stacks = Counter()
+		self.samples = 0
+		self._pending = deque()
+		self._names = {}
+		self._stopped = threading.Event()
+		self._previous_handler = None
+
+	def start(self) -> None:
+		"""
+		Starts the aggregating thread and the timer
+		"""
+
+		# Imported here so profiling doesn't change what the sampled program imports first
+		from animal import Animal
+		from rabbit import Rabbit
+		from water import Water
+		self._animal_type = Animal
+		self._rabbit_type = Rabbit
+		self._water_type = Water
+		threading.Thread.start(self)
+		self._previous_handler = signal.signal(signal.SIGPROF, self._take)
+		signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+	def run(self) -> None:
+		"""
+		Aggregates the taken samples until stop is called
+		"""
+
+		while not self._stopped.wait(AGGREGATE_INTERVAL):
+			self._aggregate()
+		self._aggregate()
+
+	def stop(self) -> None:
+		"""
+		Stops the timer and waits for the last samples to be aggregated
+		"""
+
+		if self._previous_handler is not None:
+			signal.setitimer(signal.ITIMER_PROF, 0)
+			signal.signal(signal.SIGPROF, self._previous_handler)
+			self._previous_handler = None
+		self._stopped.set()
+		if self.is_alive():
+			self.join()
+
+	def collapsed(self) -> [str]:
+		"""
+		Returns:
+			[str]: "label;root;...;leaf count" lines
+		"""
+
+		return ["{} {}".format(stack, count) for stack, count in self.stacks.most_common()]
+
+	def write(self, path: str) -> None:
+		"""
+		Writes the collapsed stacks to a file
+
+		Args:
+			path (str): Output file
+		"""
+
+		with open(path, 'w', encoding='utf8') as file:
+			file.write("\n".join(self.collapsed()) + "\n")
+
+	def summary(self, top: int = 15) -> str:
+		"""
+		Args:
+			top (int): Number of functions listed
+
+		Returns:
+			str: Share of samples per label and the functions with the most own and total samples
+		"""
+
+		labels = Counter()
+		own = Counter()
+		total = Counter()
+		for stack, count in self.stacks.items():
+			frames = stack.split(";")
+			labels[frames[0]] += count
+			own[frames[-1]] += count
+			for name in set(frames[1:]):
+				total[name] += count
+
+		samples = max(self.samples, 1)
+		lines = ["{} samples every {:g} ms".format(self.samples, self.interval*1000), "", "by state"]
+		lines += ["  {:<24} {:>6.1%}".format(label, count/samples) for label, count in labels.most_common()]
+		lines += ["", "own time"]
+		lines += ["  {:<60} {:>6.1%}".format(name, count/samples) for name, count in own.most_common(top)]
+		lines += ["", "total time"]
+		lines += ["  {:<60} {:>6.1%}".format(name, count/samples) for name, count in total.most_common(top)]
+		return "\n".join(lines)
+
+	def _take(self, signum, frame) -> None:
+		"""
+		Signal handler, notes the stack the main thread was interrupted in
+
+		Args:
+			signum (int): SIGPROF
+			frame (frame): Innermost frame of the main thread
+		"""
+
+		codes = []
+		label = None
+		while frame is not None and len(codes) < MAX_DEPTH:
+			codes.append(frame.f_code)
+			if label is None:
+				label = self._label(frame)
+			frame = frame.f_back
+		# deque.append is atomic, no lock with the aggregating thread needed
+		self._pending.append((label or "world", tuple(codes)))
+
+	def _aggregate(self) -> None:
+		"""
+		Counts the samples taken since the last call
+		"""
+
+		names = self._names
+		while self._pending:
+			label, codes = self._pending.popleft()
+			for code in codes:
+				if code not in names:
+					names[code] = "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+			self.stacks[";".join([label] + [names[code] for code in reversed(codes)])] += 1
+			self.samples += 1
+
+	def _label(self, frame) -> str:
+		"""
+		Args:
+			frame (frame): A frame of the sampled stack
+
+		Returns:
+			str: What the animal running the frame is doing, None if it isn't an animal's code
+		"""
+
+		name = frame.f_code.co_name
+		if name in ("drink", "quench"):
+			return "drinking"
+		if "self" not in frame.f_code.co_varnames:
+			return None
+		animal = frame.f_locals.get("self")
+		if not isinstance(animal, self._animal_type):
+			return None
+		if name == "decide" and isinstance(animal, self._rabbit_type) and frame.f_locals.get("foxlist"):
+			return "fleeing"
+		if isinstance(animal.target, self._water_type):
+			return "drinking"
+		return animal.state.name
+
+if __name__ == "__main__":
+	import random
+	from terrain_gen import generate_biomes
+	from world import World
+
+	parser = argparse.ArgumentParser(description="Profiles a headless run and writes collapsed stacks")
+	parser.add_argument('--output', help="Collapsed stack file.", default="profile.folded")
+	parser.add_argument('--interval', help="Milliseconds between samples.", type=float, default=DEFAULT_INTERVAL*1000)
+	parser.add_argument('--steps', help="Steps to run.", type=int, default=1000)
+	parser.add_argument('--rabbits', help="Initial number of rabbits.", type=int, default=20)
+	parser.add_argument('--foxes', help="Initial number of foxes.", type=int, default=12)
+	parser.add_argument('--food', help="Initial amount of food.", type=int, default=80)
+	parser.add_argument('--seed', help="Random seed of the run.", type=int, default=0)
+	parser.add_argument('--width', help="World width.", type=int, default=960)
+	parser.add_argument('--height', help="World height.", type=int, default=750)
+	args = parser.parse_args()
+
+	biomes = generate_biomes(args.width, args.height)
+	random.seed(args.seed)
+	world = World((args.width, args.height), None, None, biomes, rabbits=args.rabbits, foxes=args.foxes,
+		food=args.food, food_cap=args.food, end_condition="never", drink_delay=0.0)
+
+	profiler = SamplingProfiler(args.interval/1000)
+	profiler.start()
+	for _ in range(args.steps):
+		world.step()
+	profiler.stop()
+
+	profiler.write(args.output)
+	print(profiler.summary())
+	print("\ncollapsed stacks written to {}".format(args.output))
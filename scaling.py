@@ -0,0 +1,131 @@
+import argparse
+import json
+import random
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import numpy as np
+from terrain_gen import generate_biomes
+from world import World
+
+# Initial populations are multiples of the default 20 rabbits, 12 foxes and 80 food
+BASE_POPULATION = (20, 12, 80)
+DEFAULT_MULTIPLIERS = (1, 2, 4, 8, 16, 32)
+
+def run_scenario(biomes: np.ndarray, rabbits: int, foxes: int, food: int, steps: int, seed: int,
+		idle_check_interval: int) -> dict:
+	"""
+	Runs a seeded headless world and times every step
+
+	Meant to run in its own process so that the peak RSS belongs to this scenario.
+
+	Args:
+		biomes (np.ndarray): Biome raster of the world
+		rabbits (int): Initial Rabbit count
+		foxes (int): Initial Fox count
+		food (int): Initial Food count, also used as the food cap
+		steps (int): Number of steps to run
+		seed (int): Random seed
+		idle_check_interval (int): Steps between neighbour checks of idle animals
+
+	Returns:
+		dict: Populations, mean and p99 step time in ms and peak RSS in MB
+	"""
+
+	random.seed(seed)
+	world = World((biomes.shape[1], biomes.shape[0]), None, None, biomes, idle_check_interval,
+		rabbits, foxes, food, food, "never", 0.0)
+
+	times = np.empty(steps)
+	for i in range(steps):
+		start = perf_counter()
+		world.step()
+		times[i] = perf_counter() - start
+
+	return {
+		"rabbits": rabbits,
+		"foxes": foxes,
+		"food": food,
+		"population": rabbits + foxes,
+		"steps": steps,
+		"mean_step_ms": 1000*times.mean(),
+		"p99_step_ms": 1000*np.percentile(times, 99),
+		# ru_maxrss is in KB on Linux
+		"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+		"final_rabbits": len(world.rabbits),
+		"final_foxes": len(world.foxes),
+	}
+
+def run_harness(biomes: np.ndarray, multipliers: [int], steps: int, seed: int, idle_check_interval: int) -> [dict]:
+	"""
+	Runs one scenario per population multiplier, each in a fresh process
+
+	Args:
+		biomes (np.ndarray): Biome raster shared by all scenarios
+		multipliers ([int]): Multiples of BASE_POPULATION to run
+		steps (int): Steps per scenario
+		seed (int): Random seed of every scenario
+		idle_check_interval (int): Steps between neighbour checks of idle animals
+
+	Returns:
+		[dict]: Results of run_scenario in multiplier order
+	"""
+
+	results = []
+	for multiplier in multipliers:
+		rabbits, foxes, food = (multiplier*count for count in BASE_POPULATION)
+		with ProcessPoolExecutor(max_workers=1) as pool:
+			result = pool.submit(run_scenario, biomes, rabbits, foxes, food, steps, seed,
+				idle_check_interval).result()
+		print("{:>8} animals  mean {:8.2f} ms  p99 {:8.2f} ms  peak {:8.1f} MB".format(
+			result["population"], result["mean_step_ms"], result["p99_step_ms"], result["peak_rss_mb"]))
+		results.append(result)
+	return results
+
+def plot_results(results: [dict], file_name: str) -> None:
+	"""
+	Plots mean and p99 step time against the initial population
+
+	Args:
+		results ([dict]): Results of run_harness
+		file_name (str): Image file to write
+	"""
+
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	population = [result["population"] for result in results]
+	plt.loglog(population, [result["mean_step_ms"] for result in results], "-ob", label='mean')
+	plt.loglog(population, [result["p99_step_ms"] for result in results], "-or", label='p99')
+	plt.xlabel('initial animals')
+	plt.ylabel('step time (ms)')
+	plt.title('Step time against population')
+	plt.legend()
+	plt.savefig(file_name)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Measures how step time scales with the population")
+	parser.add_argument('--multipliers', help="Multiples of 20 rabbits, 12 foxes and 80 food to run.",
+		type=int, nargs='+', default=list(DEFAULT_MULTIPLIERS))
+	parser.add_argument('--steps', help="Steps per scenario.", type=int, default=300)
+	parser.add_argument('--seed', help="Random seed of every scenario.", type=int, default=0)
+	parser.add_argument('--idlecheck', help="Steps between neighbour checks of idle animals.", type=int, default=5)
+	parser.add_argument('--width', help="World width.", type=int, default=960)
+	parser.add_argument('--height', help="World height.", type=int, default=750)
+	parser.add_argument('--scale', help="Terrain scale.", type=float, default=200)
+	parser.add_argument('--output', help="Write the results as JSON to this file.", default=None)
+	parser.add_argument('--plot', help="Plot step time against population to this image file.", default=None)
+	args = parser.parse_args()
+
+	start = perf_counter()
+	biomes = generate_biomes(args.width, args.height, args.scale)
+	print("terrain generated in {:.2f} s".format(perf_counter() - start))
+
+	results = run_harness(biomes, args.multipliers, args.steps, args.seed, args.idlecheck)
+
+	if args.output is not None:
+		with open(args.output, 'w', encoding='utf8') as file:
+			json.dump(results, file, indent=4)
+	if args.plot is not None:
+		plot_results(results, args.plot)
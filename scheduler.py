@@ -0,0 +1,228 @@
+from heapq import heappush, heappop
+from itertools import count
+from math import ceil
+from worldtools import *
+from animal import State, Action, HUNGER_THRESHOLD, THIRST_THRESHOLD
+
+IDLE_CHECK_INTERVAL = 5
+
+class ActivityScheduler:
+	"""
+	Puts idle animals on a cheap movement path
+
+	An animal is idle when it is roaming and saw nothing during its last
+	full move. Idle animals only dead-reckon along their roaming angle and
+	run their full move (and sight check) every check_interval steps, or
+	earlier when something spawns within their sight or they get hungry or
+	thirsty (see MeterEvents).
+	"""
+
+	def __init__(self, check_interval: int = IDLE_CHECK_INTERVAL):
+		"""
+		Initializes the ActivityScheduler
+
+		Args:
+			check_interval (int): Steps between neighbour checks of an idle animal, 1 disables idling
+		"""
+
+		self.check_interval = check_interval
+		# Idle animal -> remaining cheap steps before the next full move
+		self._idle = {}
+
+	def decide(self, animal, snapshot) -> Action:
+		"""
+		Decides an animal's step, using the cheap path while it is idle
+
+		Args:
+			animal (Animal): The deciding animal
+			snapshot (Snapshot): The world at the start of the step
+
+		Returns:
+			Action: The decision
+		"""
+
+		ticks = self._idle.pop(animal, 0)
+		if ticks:
+			self._idle[animal] = ticks - 1
+			return animal.decide_idle()
+		return animal.decide(snapshot)
+
+	def settle(self, action: Action) -> None:
+		"""
+		Puts an animal to sleep after its committed full move if it can idle
+
+		Args:
+			action (Action): The animal's committed decision
+		"""
+
+		animal = action.animal
+		if action.sighted is not None and self._can_idle(animal, action):
+			# Anything it was chasing is out of sight by now
+			animal.target = None
+			self._idle[animal] = self.check_interval - 1
+
+	def wake(self, animal) -> None:
+		"""
+		Makes an animal run its full move on its next step
+
+		Args:
+			animal (Animal): The animal to wake
+		"""
+
+		self._idle.pop(animal, None)
+
+	def wake_near(self, pos: (float, float)) -> None:
+		"""
+		Wakes every idle animal that has pos within its sight
+
+		Args:
+			pos ( (float, float) ): Position of the spatial event
+		"""
+
+		for animal in [a for a in self._idle if distance(a.pos, pos) <= a.sight]:
+			del self._idle[animal]
+
+	def forget(self, animal) -> None:
+		"""
+		Drops an animal that left the world
+
+		Args:
+			animal (Animal): The removed animal
+		"""
+
+		self._idle.pop(animal, None)
+
+	def is_idle(self, animal) -> bool:
+		return animal in self._idle
+
+	def idle_count(self) -> int:
+		return len(self._idle)
+
+	def _can_idle(self, animal, action: Action) -> bool:
+		"""
+		Determines if an animal can skip its neighbour checks for a while
+
+		Args:
+			animal (Animal): The animal that just ran its full move
+			action (Action): Its committed decision
+
+		Returns:
+			bool: True if the animal can be put on the cheap path, False otherwise
+		"""
+
+		return (
+			self.check_interval > 1 and
+			animal.state == State.ROAM and
+			not action.sighted
+			)
+
+# Kinds of MeterEvents
+DEATH = 0
+HUNGRY = 1
+THIRSTY = 2
+
+class MeterEvents:
+	"""
+	Priority queue of the steps at which animals starve, dehydrate, get hungry or get thirsty
+
+	Hunger and thirst fall linearly between meals and drinks, so these steps
+	are known in advance. The world only touches the animals whose events are
+	due instead of metabolizing the whole population every step. An animal's
+	events are rescheduled when it eats or drinks; the outdated ones are
+	skipped when they come up.
+	"""
+
+	def __init__(self):
+		self._heap = []
+		# Animal -> version of its current events
+		self._versions = {}
+		# Tie breaker, animals don't compare
+		self._order = count()
+
+	def schedule(self, animal) -> None:
+		"""
+		(Re)computes the events of an animal from its current hunger and thirst
+
+		Args:
+			animal (Animal): Animal in the world
+		"""
+
+		version = self._versions.get(animal, 0) + 1
+		self._versions[animal] = version
+		now = animal.world.tick
+		hunger, thirst = animal.meters_at(now)
+
+		death = min(self._crossing(animal, 0, 0, now), self._crossing(animal, 1, 0, now))
+		self._push(death, animal, version, DEATH)
+		if hunger > HUNGER_THRESHOLD:
+			self._push(self._crossing(animal, 0, HUNGER_THRESHOLD, now), animal, version, HUNGRY)
+		if thirst > THIRST_THRESHOLD:
+			self._push(self._crossing(animal, 1, THIRST_THRESHOLD, now), animal, version, THIRSTY)
+
+	def forget(self, animal) -> None:
+		"""
+		Drops the events of an animal that left the world
+
+		Args:
+			animal (Animal): The removed animal
+		"""
+
+		self._versions.pop(animal, None)
+
+	def due(self, tick: int) -> (set, list):
+		"""
+		Pops the events up to a step
+
+		Args:
+			tick (int): Current step
+
+		Returns:
+			(set, list): Animals that starved or dehydrated, animals that got hungry or thirsty
+		"""
+
+		dead = set()
+		crossed = []
+		heap = self._heap
+		while heap and heap[0][0] <= tick:
+			_, _, version, animal, kind = heappop(heap)
+			if self._versions.get(animal) != version:
+				continue
+			if kind == DEATH:
+				dead.add(animal)
+			else:
+				crossed.append(animal)
+		return dead, crossed
+
+	def __len__(self) -> int:
+		return len(self._heap)
+
+	def _push(self, tick: float, animal, version: int, kind: int) -> None:
+		if tick != float("inf"):
+			heappush(self._heap, (tick, next(self._order), version, animal, kind))
+
+	@staticmethod
+	def _crossing(animal, meter: int, level: float, now: int) -> float:
+		"""
+		Finds the first step after now at which a meter is at or below a level
+
+		Args:
+			animal (Animal): The animal
+			meter (int): 0 for hunger, 1 for thirst
+			level (float): The level
+			now (int): Current step
+
+		Returns:
+			float: The step, inf if the meter never falls
+		"""
+
+		rate = animal.hunger_rate() if meter == 0 else animal.thirst_rate()
+		if rate <= 0:
+			return float("inf")
+		value = animal.meters_at(now)[meter]
+		tick = now + max(ceil((value - level) / rate), 1)
+		# Settle rounding with the same formula the animal uses
+		while tick - 1 > now and animal.meters_at(tick - 1)[meter] <= level:
+			tick -= 1
+		while animal.meters_at(tick)[meter] > level:
+			tick += 1
+		return tick
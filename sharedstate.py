@@ -0,0 +1,234 @@
+import argparse
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from animal import State
+
+RABBIT = 0
+FOX = 1
+FOOD = 2
+
+# One row per entity, Food has NaN hunger and thirst
+ENTITY_DTYPE = np.dtype([
+	("id", "<i8"),
+	("x", "<f4"),
+	("y", "<f4"),
+	("hunger", "<f4"),
+	("thirst", "<f4"),
+	("species", "u1"),
+	("state", "u1"),
+])
+
+# NoiseMapBiome values, as in Map2D.biome_raster
+TERRAIN_DTYPE = np.uint8
+
+# Header of the state block, int64 fields
+_GENERATION, _CAPACITY, _HEIGHT, _WIDTH, _SEQ, _COUNT, _TOTAL = 0, 1, 2, 3, 4, 6, 8
+_HEADER_FIELDS = 10
+_HEADER_SIZE = _HEADER_FIELDS * 8
+
+DEFAULT_CAPACITY = 4096
+
+def _block_names(name: str) -> (str, str):
+	return name + "_state", name + "_terrain"
+
+def _layout(buffer, capacity: int) -> (np.ndarray, [np.ndarray]):
+	"""
+	Args:
+		buffer (memoryview): Buffer of the state block
+		capacity (int): Rows per population buffer
+
+	Returns:
+		(np.ndarray, [np.ndarray]): Header and the two population buffers, all views of buffer
+	"""
+
+	header = np.ndarray((_HEADER_FIELDS,), np.int64, buffer)
+	rows = [
+		np.ndarray((capacity,), ENTITY_DTYPE, buffer, _HEADER_SIZE + i*capacity*ENTITY_DTYPE.itemsize)
+		for i in range(2)
+	]
+	return header, rows
+
+class StatePublisher:
+	"""
+	Publishes the populations and terrain of a world in shared memory
+
+	The populations are double buffered, each buffer guarded by a seqlock:
+	the writer makes the sequence number of the buffer it fills odd, writes,
+	makes it even again and then bumps the generation, which points readers
+	at that buffer. Readers never block the simulation and only copy if they
+	want to.
+	"""
+
+	def __init__(self, world, name: str, capacity: int = None):
+		"""
+		Initializes the StatePublisher and publishes the current state
+
+		Args:
+			world (World): The world to publish
+			name (str): Prefix of the shared memory block names
+			capacity (int): Most entities published, the rest are left out but counted
+		"""
+
+		self.world = world
+		self.name = name
+		if capacity is None:
+			capacity = max(DEFAULT_CAPACITY, 4*(len(world.rabbits) + len(world.foxes) + world.food_cap))
+		self.capacity = capacity
+
+		state_name, terrain_name = _block_names(name)
+		self._state = SharedMemory(state_name, create=True, size=_HEADER_SIZE + 2*capacity*ENTITY_DTYPE.itemsize)
+		self._terrain = SharedMemory(terrain_name, create=True, size=world.biomes.nbytes)
+		self._header, self._rows = _layout(self._state.buf, capacity)
+		self._header[:] = 0
+		self._header[_CAPACITY] = capacity
+		self._header[_HEIGHT], self._header[_WIDTH] = world.biomes.shape
+		terrain = np.ndarray(world.biomes.shape, TERRAIN_DTYPE, self._terrain.buf)
+		terrain[:] = world.biomes
+		self.publish()
+
+	def publish(self) -> None:
+		"""
+		Writes the current populations into the buffer readers are not pointed at
+		"""
+
+		world = self.world
+		header = self._header
+		slot = (int(header[_GENERATION]) + 1) % 2
+
+		entities = [(a.id, a.pos[0], a.pos[1], a.hunger, a.thirst, RABBIT, a.state.value) for a in world.rabbits]
+		entities += [(a.id, a.pos[0], a.pos[1], a.hunger, a.thirst, FOX, a.state.value) for a in world.foxes]
+		entities += [(f.id, f.pos[0], f.pos[1], np.nan, np.nan, FOOD, 0) for f in world.food]
+		count = min(len(entities), self.capacity)
+
+		header[_SEQ + slot] += 1
+		if count:
+			self._rows[slot][:count] = np.array(entities[:count], ENTITY_DTYPE)
+		header[_COUNT + slot] = count
+		header[_TOTAL + slot] = len(entities)
+		header[_SEQ + slot] += 1
+		header[_GENERATION] += 1
+
+	def close(self) -> None:
+		"""
+		Releases and removes the shared memory blocks
+		"""
+
+		del self._header, self._rows
+		for block in (self._state, self._terrain):
+			block.close()
+			block.unlink()
+
+class SharedSnapshot:
+	"""Populations published by one StatePublisher.publish, read in place"""
+
+	def __init__(self, header: np.ndarray, slot: int, seq: int, entities: np.ndarray, generation: int, total: int):
+		self._header = header
+		self._slot = slot
+		self._seq = seq
+		self.entities = entities
+		self.generation = generation
+		# Entities in the world, more than len(entities) if the publisher ran out of capacity
+		self.total = total
+
+	def consistent(self) -> bool:
+		"""
+		Returns:
+			bool: True while the publisher has not started overwriting the entities,
+				check after using them
+		"""
+
+		return int(self._header[_SEQ + self._slot]) == self._seq
+
+class StateReader:
+	"""Attaches to the blocks of a StatePublisher, possibly from another process"""
+
+	def __init__(self, name: str):
+		"""
+		Initializes the StateReader
+
+		Args:
+			name (str): Prefix the publisher was created with
+		"""
+
+		state_name, terrain_name = _block_names(name)
+		self._state = SharedMemory(state_name)
+		self._terrain = SharedMemory(terrain_name)
+		# The publisher owns the blocks, don't let this process' tracker unlink them on exit
+		for block in (self._state, self._terrain):
+			resource_tracker.unregister(block._name, "shared_memory")
+
+		capacity = int(np.ndarray((_HEADER_FIELDS,), np.int64, self._state.buf)[_CAPACITY])
+		self._header, self._rows = _layout(self._state.buf, capacity)
+		shape = (int(self._header[_HEIGHT]), int(self._header[_WIDTH]))
+		self.terrain = np.ndarray(shape, TERRAIN_DTYPE, self._terrain.buf)
+		self.terrain.flags.writeable = False
+
+	def read(self, copy: bool = False) -> SharedSnapshot:
+		"""
+		Gets the latest published populations
+
+		Args:
+			copy (bool): Copy the entities out of shared memory so they stay valid
+				after the publisher moves on
+
+		Returns:
+			SharedSnapshot: Latest complete publish
+		"""
+
+		header = self._header
+		while True:
+			generation = int(header[_GENERATION])
+			slot = generation % 2
+			seq = int(header[_SEQ + slot])
+			if seq % 2:
+				# The publisher moved on and is refilling this buffer, look again
+				continue
+			count, total = int(header[_COUNT + slot]), int(header[_TOTAL + slot])
+			entities = self._rows[slot][:count]
+			if copy:
+				entities = entities.copy()
+			if int(header[_SEQ + slot]) != seq:
+				continue
+			if not copy:
+				entities.flags.writeable = False
+			return SharedSnapshot(header, slot, seq, entities, generation, total)
+
+	def close(self) -> None:
+		"""
+		Detaches from the shared memory blocks
+		"""
+
+		del self._header, self._rows, self.terrain
+		self._state.close()
+		self._terrain.close()
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Prints population statistics of a running simulation")
+	parser.add_argument('name', help="Name passed to main.py --share.")
+	parser.add_argument('--interval', help="Seconds between reports.", type=float, default=1.0)
+	args = parser.parse_args()
+
+	reader = StateReader(args.name)
+	try:
+		while True:
+			snapshot = reader.read()
+			entities = snapshot.entities
+			lines = ["generation {}".format(snapshot.generation)]
+			for label, species in (("rabbits", RABBIT), ("foxes", FOX)):
+				group = entities[entities["species"] == species]
+				if len(group):
+					lines.append("{} {} hunger {:.1f} thirst {:.1f} reproducing {}".format(
+						label, len(group), group["hunger"].mean(), group["thirst"].mean(),
+						int((group["state"] == State.REPRODUCE.value).sum())))
+				else:
+					lines.append("{} 0".format(label))
+			lines.append("food {}".format(int((entities["species"] == FOOD).sum())))
+			if snapshot.consistent():
+				print(", ".join(lines))
+			time.sleep(args.interval)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		reader.close()
@@ -135,16 +135,16 @@ class FoodCountTracker(_Tracker):
 		"""
 
 		self.x.append(self.world.runtime / 1000)
-		self.y.append(len(self.world.food))
-		last_count = len(self.world.food)
+		self.y.append(self.world.food_amount())
+		last_count = self.world.food_amount()
 
 		while self.world.running:
-			if len(self.world.food) != last_count or self._timeout():
+			if self.world.food_amount() != last_count or self._timeout():
 				self._last_time = time()
-				last_count = len(self.world.food)
+				last_count = self.world.food_amount()
 
 				self.x.append(self.world.runtime/1000)
-				self.y.append(len(self.world.food))
+				self.y.append(self.world.food_amount())
 			sleep(1)
 
 class FoxCountTracker(_Tracker):
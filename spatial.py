@@ -0,0 +1,85 @@
+from worldtools import *
+
+# Largest sight in the world (Fox), so a sight query touches at most 3x3 grid cells
+GRID_CELL_SIZE = 200
+
+class SpatialGrid:
+	"""Uniform grid over entity positions for range queries"""
+
+	def __init__(self, entities: list, cell_size: float = GRID_CELL_SIZE):
+		"""
+		Initializes the SpatialGrid
+
+		Args:
+			entities (list): Entities with a pos, indexed at their current position
+			cell_size (float): Side length of a grid cell
+		"""
+
+		self.cell_size = cell_size
+		self.members = set(entities)
+		self._cells = {}
+		for entity in entities:
+			key = (int(entity.pos[0] // cell_size), int(entity.pos[1] // cell_size))
+			bucket = self._cells.get(key)
+			if bucket is None:
+				self._cells[key] = [entity]
+			else:
+				bucket.append(entity)
+
+	def __contains__(self, entity) -> bool:
+		return entity in self.members
+
+	def __len__(self) -> int:
+		return len(self.members)
+
+	def near(self, pos: (float, float), radius: float, exclude=None) -> list:
+		"""
+		Finds the entities within a radius, closest first
+
+		Args:
+			pos ( (float, float) ): Center of the query
+			radius (float): Query radius
+			exclude (object): Entity left out of the result, e.g. the one asking
+
+		Returns:
+			list: Entities within radius of pos sorted by distance
+		"""
+
+		size = self.cell_size
+		x0, x1 = int((pos[0] - radius) // size), int((pos[0] + radius) // size)
+		y0, y1 = int((pos[1] - radius) // size), int((pos[1] + radius) // size)
+
+		found = []
+		for cx in range(x0, x1 + 1):
+			for cy in range(y0, y1 + 1):
+				for entity in self._cells.get((cx, cy), ()):
+					dist = distance(pos, entity.pos)
+					if dist <= radius and entity is not exclude:
+						found.append((dist, entity))
+		found.sort(key=lambda pair: pair[0])
+		return [entity for _, entity in found]
+
+class Snapshot:
+	"""
+	Frozen view of the world at the start of a step
+
+	Animals only read the world through a Snapshot while deciding, nothing
+	is changed until every animal has decided, so the outcome does not
+	depend on the order the animals are visited in.
+	"""
+
+	def __init__(self, world, ghosts: (list, list, list) = None):
+		"""
+		Initializes the Snapshot
+
+		Args:
+			world (World): The world at the start of the step
+			ghosts ( (list, list, list) ): Food, Rabbits and Foxes owned by neighbouring
+				processes that can be seen but not changed
+		"""
+
+		food, rabbits, foxes = ghosts if ghosts is not None else ((), (), ())
+		self.world = world
+		self.food = SpatialGrid(world.food + list(food))
+		self.rabbits = SpatialGrid(world.rabbits + list(rabbits))
+		self.foxes = SpatialGrid(world.foxes + list(foxes))
@@ -0,0 +1,69 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# Modules a headless worker should never load
+HEAVY_MODULES = ("pygame", "pygame_menu", "matplotlib", "xlwt")
+
+# Runs in a fresh interpreter, prints its measurements as JSON
+_PROBE = """
+import json, resource, sys
+from time import perf_counter
+start = perf_counter()
+{imports}
+import random
+from world import World
+from terrain_gen import generate_biomes
+imported = perf_counter()
+random.seed(0)
+world = World(({width}, {height}), None, None, generate_biomes({width}, {height}), drink_delay=0)
+world.step()
+stepped = perf_counter()
+print(json.dumps({{
+	"import_s": imported - start,
+	"first_step_s": stepped - start,
+	"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+	"heavy_modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+PROFILES = {
+	# What a sweep or parallel.py worker imports
+	"headless": "",
+	# What main.py imports on top of the simulation core
+	"interactive": "import pygame, pygame_menu, matplotlib.pyplot, statistics",
+}
+
+def measure(profile: str, width: int, height: int) -> dict:
+	"""
+	Starts a fresh interpreter that imports the simulation core and runs one step
+
+	Args:
+		profile (str): Key of PROFILES
+		width (int): World width
+		height (int): World height
+
+	Returns:
+		dict: Import time, time to the first step, peak RSS and the heavy modules loaded
+	"""
+
+	code = _PROBE.format(imports=PROFILES[profile], width=width, height=height, heavy=HEAVY_MODULES)
+	output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+	return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Measures startup time and memory of a simulation process")
+	parser.add_argument('--profiles', help="Profiles to measure.", nargs="+", choices=sorted(PROFILES),
+		default=list(PROFILES))
+	parser.add_argument('--repeat', help="Runs per profile, the fastest is reported.", type=int, default=3)
+	parser.add_argument('--width', help="World width.", type=int, default=200)
+	parser.add_argument('--height', help="World height.", type=int, default=150)
+	args = parser.parse_args()
+
+	for profile in args.profiles:
+		runs = [measure(profile, args.width, args.height) for _ in range(args.repeat)]
+		best = min(runs, key=lambda run: run["first_step_s"])
+		print("{:<12} import {:.3f}s  first step {:.3f}s  peak RSS {:.1f} MB  heavy modules: {}".format(
+			profile, best["import_s"], best["first_step_s"], best["peak_rss_mb"],
+			", ".join(best["heavy_modules"]) or "none"))
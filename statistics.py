@@ -1,16 +1,27 @@
 from threading import Thread
 from time import time, sleep
-from animal import Sex
 import pygame_menu as pyMenu 
 import pygame
 import sys
 import xlwt
 import matplotlib.pyplot as plt
 from datetime import datetime
+from downsample import lttb, pixel_budget
+from history import History
+import numpy as np
 
 
 TRACKER_TIMEOUT = 3
 
+# Tracker list plotted for each feature of the menu
+GRAPH_SERIES = {
+	'speed': 'speed_avg',
+	'hunger': 'hunger_avg',
+	'thirst': 'thirst_avg',
+	'size': 'size_avg',
+	'count': 'y',
+}
+
 class Stats:
 	"""Top level class holding multiple Trackers"""
 
@@ -66,31 +77,25 @@ class Stats:
 		print("value is: ")
 		print(value)
 	def draw_graph(self):
+		feature = self.element['val'][0][0]
+		series = GRAPH_SERIES[feature]
+		figure = plt.figure()
+		# More points than pixels only slow the drawing down
+		budget = pixel_budget(figure)
+
+		for tracker, style, label in ((self.trackers[0], "-b", 'rabbit'), (self.trackers[1], "-r", 'fox')):
+			values = getattr(tracker, series)
+			samples = min(len(tracker.x), len(values))
+			plt.plot(*lttb(tracker.x[:samples], values[:samples], budget), style, label=label)
 
-		if self.element['val'][0][0]=='speed':
-			plt.plot(self.trackers[0].speed_avg,self.trackers[0].x, "-b", label='rabbit')
-			plt.plot(self.trackers[1].speed_avg,self.trackers[1].x, "-r", label='fox')
-		elif self.element['val'][0][0]=='hunger':
-			plt.plot(self.trackers[0].hunger_avg,self.trackers[0].x , "-b",label='rabbit')
-			plt.plot(self.trackers[1].hunger_avg,self.trackers[1].x, "-r", label='fox')
-		elif self.element['val'][0][0]=='thirst':
-			plt.plot(self.trackers[0].thirst_avg,self.trackers[0].x, "-b", label='rabbit')
-			plt.plot(self.trackers[1].thirst_avg,self.trackers[1].x, "-r", label='fox')
-		elif self.element['val'][0][0]=='size':
-			plt.plot(self.trackers[0].size_avg,self.trackers[0].x, "-b", label='rabbit')
-			plt.plot(self.trackers[1].size_avg,self.trackers[1].x, "-r", label='fox')
-		elif self.element['val'][0][0]=='count':
-			plt.plot(self.trackers[0].y,self.trackers[0].x, "-b", label='rabbit')
-			plt.plot(self.trackers[1].y,self.trackers[1].x, "-r", label='fox')
-
-			 
 		# naming the x axis
 		plt.xlabel('time')
 		# naming the y axis
-		plt.ylabel(self.element['val'][0][0])
+		plt.ylabel(feature)
+		plt.legend()
 		
 		# giving a title to my graph
-		plt.title(self.element['val'][0][0]+' time')
+		plt.title(feature+' time')
 		
 		# function to show the plot
 		plt.show()		
@@ -170,17 +175,28 @@ class _Tracker(Thread):
 		self.world = world
 		self.title = title
 		self.ylabel = ylabel
-		self.hunger_avg=[]
-		self.thirst_avg=[]
-		self.speed_avg=[]
-		self.size_avg=[]
-		self.female_count=[]
-		self.male_count=[]
+		# Constant memory however long the run, older samples spill to disk
+		self.history = History(prefix="tracker")
+		series = self.history.series
+		self.hunger_avg=series("hunger_avg")
+		self.thirst_avg=series("thirst_avg")
+		self.speed_avg=series("speed_avg")
+		self.size_avg=series("size_avg")
+		self.female_count=series("female_count", np.int64)
+		self.male_count=series("male_count", np.int64)
+		self.hunger_var=series("hunger_var")
+		self.thirst_var=series("thirst_var")
+		self.speed_var=series("speed_var")
+		self.size_var=series("size_var")
+		self.speed_min=series("speed_min")
+		self.speed_max=series("speed_max")
+		self.size_min=series("size_min")
+		self.size_max=series("size_max")
 		
 		self._last_time = time()
 		#time
-		self.x = []
-		self.y = []
+		self.x = series("x")
+		self.y = series("y", np.int64)
 
 	def run(self) -> Exception:
 	
@@ -191,69 +207,72 @@ class _Tracker(Thread):
 		return time() - self._last_time > TRACKER_TIMEOUT
 
 	
-class RabbitAvgTracker(_Tracker):
-	"""Tracker for Rabbit count"""
+class _PopulationTracker(_Tracker):
+	"""Parent Tracker for the averages of one species"""
 
-	def __init__(self, world):
-	
-		_Tracker.__init__(self, world, "Rabbit Count", "Rabbits")
+	def __init__(self, world, title: str, ylabel: str, stats_name: str):
+		"""
+		Initializes the _PopulationTracker
+
+		Args:
+			world (World): The world
+			title (str): Graph title
+			ylabel (str): y axis label
+			stats_name (str): Name of the World attribute holding the species PopulationStats
+		"""
+
+		_Tracker.__init__(self, world, title, ylabel)
+		self.stats_name = stats_name
 
 	def run(self) -> None:
 		"""
-		Collects the Rabbit count at the runtime
+		Collects the count and averages of the species at the runtime
 		"""
-		
-		self.x.append(self.world.runtime/1000)
-		self.y.append(len(self.world.rabbits))
-		last_count = len(self.world.rabbits)
-		
-		self.male_count.append(0)
-		self.female_count.append(0)
-		sum_hunger=0
-		sum_thirst=0
-		sum_speed=0
-		sum_size=0
-		male_count=0
-		female_count=0 
-		self.hunger_avg.append(sum_hunger/last_count)
-		self.thirst_avg.append(sum_thirst/last_count)
-		self.speed_avg.append(sum_speed/last_count)
-		self.size_avg.append(sum_size/last_count)
+
+		stats = getattr(self.world, self.stats_name)
+		last_count = stats.count
+		self._sample(stats)
 
 		while self.world.running:
-			if len(self.world.rabbits) != last_count or self._timeout():
+			if stats.count != last_count or self._timeout():
 				self._last_time = time()
-				last_count = len(self.world.rabbits)
-
-				self.x.append(self.world.runtime/1000)
-				self.y.append(last_count)
-				sum_hunger=0
-				sum_thirst=0
-				sum_speed=0
-				sum_size=0
-				male_count=0
-				female_count=0
-				for  rabbit in self.world.rabbits:
-					sum_hunger+=rabbit.hunger
-					sum_thirst+=rabbit.thirst
-					sum_speed+=rabbit.speed
-					sum_size+=rabbit.size
-					
-					if rabbit.sex==Sex.MALE:
-						male_count+=1
-					else:
-						female_count+=1
-				self.male_count.append(male_count)
-				self.female_count.append(female_count)
-				self.hunger_avg.append(sum_hunger/last_count)
-				self.thirst_avg.append(sum_thirst/last_count)
-				self.speed_avg.append(sum_speed/last_count)
-				self.size_avg.append(sum_size/last_count)
+				last_count = stats.count
+				self._sample(stats)
 			sleep(1)
 
-		
+	def _sample(self, stats) -> None:
+		"""
+		Appends one data point read from the running aggregates, O(1) in the population
+
+		Args:
+			stats (PopulationStats): Aggregates of the species
+		"""
+
+		self.x.append(self.world.runtime/1000)
+		self.y.append(stats.count)
+		self.male_count.append(stats.male_count)
+		self.female_count.append(stats.female_count)
+		self.hunger_avg.append(stats.hunger.mean)
+		self.thirst_avg.append(stats.thirst.mean)
+		self.speed_avg.append(stats.speed.mean)
+		self.size_avg.append(stats.size.mean)
+		self.hunger_var.append(stats.hunger.variance)
+		self.thirst_var.append(stats.thirst.variance)
+		self.speed_var.append(stats.speed.variance)
+		self.size_var.append(stats.size.variance)
+		self.speed_min.append(stats.speed.min)
+		self.speed_max.append(stats.speed.max)
+		self.size_min.append(stats.size.min)
+		self.size_max.append(stats.size.max)
+
+class RabbitAvgTracker(_PopulationTracker):
+	"""Tracker for Rabbit count"""
+
+	def __init__(self, world):
 	
-		
+		_PopulationTracker.__init__(self, world, "Rabbit Count", "Rabbits", "rabbit_stats")
+
+
 class FoodAvgTracker(_Tracker):
 	"""Tracker for Food count"""
 
@@ -264,77 +283,22 @@ class FoodAvgTracker(_Tracker):
 	def run(self) -> None:
 		
 		self.x.append(self.world.runtime / 1000)
-		self.y.append(len(self.world.food))
-		last_count = len(self.world.food)
+		self.y.append(self.world.food_amount())
+		last_count = self.world.food_amount()
 
 		while self.world.running:
-			if len(self.world.food) != last_count or self._timeout():
+			if self.world.food_amount() != last_count or self._timeout():
 				self._last_time = time()
-				last_count = len(self.world.food)
+				last_count = self.world.food_amount()
 
 				self.x.append(self.world.runtime/1000)
-				self.y.append(len(self.world.food))
+				self.y.append(last_count)
 			
 			sleep(1)
 
-class FoxAvgTracker(_Tracker):
+class FoxAvgTracker(_PopulationTracker):
 	"""Tracker for Fox count"""
 
 	def __init__(self, world):
 	
-		_Tracker.__init__(self, world, "Fox Count", "Foxes")
-
-	def run(self) -> None:
-		last_count = len(self.world.foxes)
-
-		self.x.append(self.world.runtime / 1000)
-		self.y.append(last_count)
-	
-		self.male_count.append(0)
-		self.female_count.append(0)
-		sum_hunger=0
-		sum_thirst=0
-		sum_speed=0
-		sum_size=0
-		male_count=0
-		female_count=0 
-		self.hunger_avg.append(sum_hunger/last_count)
-		self.thirst_avg.append(sum_thirst/last_count)
-		self.speed_avg.append(sum_speed/last_count)
-		self.size_avg.append(sum_size/last_count)
-
-
-		last_count = len(self.world.foxes)
-
-		while self.world.running:
-			if len(self.world.foxes) != last_count or self._timeout():
-				self._last_time = time()
-				last_count = len(self.world.foxes)
-
-				self.x.append(self.world.runtime/1000)
-				self.y.append(len(self.world.foxes))
-				sum_hunger=0
-				sum_thirst=0
-				sum_speed=0
-				sum_size=0
-				male_count=0
-				female_count=0 
-				for  fox in self.world.foxes:
-					sum_hunger+=fox.hunger
-					sum_thirst+=fox.thirst
-					sum_speed+=fox.speed
-					sum_size+=fox.size
-					if fox.sex==Sex.MALE:
-						male_count+=1
-					else:
-						female_count+=1
-				self.male_count.append(male_count)
-				self.female_count.append(female_count)
-				self.hunger_avg.append(sum_hunger/last_count)
-				self.thirst_avg.append(sum_thirst/last_count)
-				self.speed_avg.append(sum_speed/last_count)
-				self.size_avg.append(sum_size/last_count)
-			sleep(1)
-
-	
-	
+		_PopulationTracker.__init__(self, world, "Fox Count", "Foxes", "fox_stats")
@@ -2,6 +2,7 @@ from random import random,randint,choice
 import sys
 from noise import pnoise2
 import json
+import numpy as np
 from PIL import ImageDraw
 from PIL import Image
 
@@ -18,7 +19,47 @@ class NoiseMapBiome(Enum):
     SWAMP = 17
 
 
+BIOME_COLORS = {
+    NoiseMapBiome.OCEAN: (54, 62, 150), # dark blue
+    NoiseMapBiome.SHALLOWS: (88, 205, 237), # cyan
+    NoiseMapBiome.BEACH: (247, 247, 119), # yellow
+    NoiseMapBiome.TUNDRA: (132, 173, 158), # grey green
+    NoiseMapBiome.GRASSLAND: (55, 181, 43), # green
+    NoiseMapBiome.FOREST: (1,50,32), # green black
+    NoiseMapBiome.SNOW: (255, 255, 255), # white
+    NoiseMapBiome.TAIGA: (62, 87, 71), # dark olive
+    NoiseMapBiome.SWAMP: (92, 112, 104), # grey green
+}
+UNKNOWN_BIOME_COLOR = (0, 0, 0) # black
+
+# Movement cost of each biome, an animal covers speed / cost per step
+MOVEMENT_COSTS = {
+    NoiseMapBiome.GRASSLAND: 1.0,
+    NoiseMapBiome.BEACH: 1.25,
+    NoiseMapBiome.TUNDRA: 1.25,
+    NoiseMapBiome.FOREST: 1.5,
+    NoiseMapBiome.TAIGA: 1.5,
+    NoiseMapBiome.SNOW: 2.0,
+    NoiseMapBiome.SHALLOWS: 2.0,
+    NoiseMapBiome.SWAMP: 2.5,
+    NoiseMapBiome.OCEAN: 4.0,
+}
+UNKNOWN_BIOME_COST = 1.0
+
+# RGB color of every possible raster value, indexed by NoiseMapBiome value
+BIOME_PALETTE = np.zeros((256, 3), dtype=np.uint8)
+for _biome, _color in BIOME_COLORS.items():
+    BIOME_PALETTE[_biome.value] = _color
+
+# Speed multiplier (1 / cost) of every possible raster value, indexed by NoiseMapBiome value
+PACE_PALETTE = np.full(256, 1 / UNKNOWN_BIOME_COST, dtype=np.float32)
+for _biome, _cost in MOVEMENT_COSTS.items():
+    PACE_PALETTE[_biome.value] = 1 / _cost
+
+
 class Cell:
+
+    __slots__ = ('x', 'y', 'noise_value', 'biome')
  
     def __init__(self, x, y, noise_value):
         self.x = x
@@ -38,6 +79,9 @@ class NoiseWidth:
 
     Also contains a helpful name tag eg. water, mountain, etc.
     """
+
+    __slots__ = ('name', 'threshold')
+
     def __init__(self, name, threshold):
         self.name = name
         self.threshold = threshold
@@ -172,26 +216,7 @@ class Map2D:
             yield target_list[i:i + chunk_size]
 
     def get_biome_color(self,value):
-        if value == NoiseMapBiome.OCEAN:
-            return (54, 62, 150) # dark blue
-        elif value == NoiseMapBiome.SHALLOWS:
-            return (88, 205, 237) # cyan
-        elif value == NoiseMapBiome.BEACH:
-            return (247, 247, 119) # yellow
-        elif value == NoiseMapBiome.TUNDRA:
-            return (132, 173, 158) # grey green
-        elif value == NoiseMapBiome.GRASSLAND:
-            return (55, 181, 43) # green
-        elif value == NoiseMapBiome.FOREST:
-             return (1,50,32) # green black
-        elif value == NoiseMapBiome.SNOW:
-            return (255, 255, 255) # white
-        elif value == NoiseMapBiome.TAIGA:
-            return (62, 87, 71) # dark olive
-        elif value == NoiseMapBiome.SWAMP:
-            return (92, 112, 104) # grey green
-        else:
-            return (0, 0, 0) # black
+        return BIOME_COLORS.get(value, UNKNOWN_BIOME_COLOR)
 
     def ret_water_points(self):
          for cell_index in range(len(self.cells)):
@@ -200,6 +225,14 @@ class Map2D:
             moisture_cell = self.moisture_map.cells[cell_index]
             cell.biome=self.biome(cell.noise_value, moisture_cell.noise_value)
           
+    def biome_raster(self):
+        """
+        Packs the cell biomes into a (height, width) array of NoiseMapBiome values.
+        Biomes must have been assigned (see ret_water_points).
+        """
+        raster = np.fromiter((cell.biome.value for cell in self.cells), dtype=np.uint8, count=len(self.cells))
+        return raster.reshape(self.height, self.width)
+
     def save(self, file_name):
         """ Save the map as JSON to a file. """
         with open(file_name, 'w', encoding='utf8') as file:
@@ -232,3 +265,53 @@ class Map2D:
                 moisture_map = Map2D.load(data['moisture_map'])
 
             return cls(width, height, noise_ranges, cells, moisture_map)
+
+
+DEFAULT_NOISE_RANGES = (
+    ('hugemountain', 0.6),
+    ('mountain', 0.5),
+    ('land', 0.6),
+    ('sand', 0.1),
+    ('shallowwater', 0.05),
+    ('water', 0.0),
+)
+
+
+def generate_biomes(width, height, scale=200, octaves=8, persistence=0.5, lacunarity=3.0,
+                    moisture_scale=200, moisture_octaves=8, moisture_persistence=0.5, moisture_lacunarity=3.0,
+                    noise_ranges=None):
+    """
+    Generates a terrain and returns only its biome raster, without drawing it.
+    Uses the default thresholds of main.py unless noise_ranges is given.
+    """
+    if noise_ranges is None:
+        noise_ranges = [NoiseWidth(name, threshold) for name, threshold in DEFAULT_NOISE_RANGES]
+
+    noise_map = Map2D(width, height, noise_ranges)
+    noise_map.generate(scale, octaves, persistence, lacunarity)
+    moisture_map = Map2D(width, height)
+    moisture_map.generate(moisture_scale, moisture_octaves, moisture_persistence, moisture_lacunarity)
+    noise_map.moisture_map = moisture_map
+    noise_map.ret_water_points()
+    return noise_map.biome_raster()
+
+
+def color_raster(biomes):
+    """
+    Colors a biome raster like Map2D.display_as_image, without the legend padding.
+    Returns a C-contiguous (height, width, 3) uint8 RGB array.
+    """
+    return BIOME_PALETTE[biomes]
+
+
+def pace_raster(biomes):
+    """
+    Looks up the speed multiplier of every cell of a biome raster once, see MOVEMENT_COSTS.
+    Returns a (height, width) float32 array.
+    """
+    return PACE_PALETTE[biomes]
+
+
+def save_biome_image(biomes, file_name):
+    """ Save a biome raster as an image file. """
+    Image.fromarray(color_raster(biomes), 'RGB').save(file_name)
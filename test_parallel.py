@@ -0,0 +1,60 @@
+import random
+import numpy as np
+import pytest
+from parallel import HALO_WIDTH, ParallelEngine, _Tile, _kind
+from spatial import Snapshot
+from terrain_gen import generate_biomes
+from world import World
+
+WIDTH, HEIGHT = 600, 400
+
+@pytest.fixture(scope="module")
+def biomes():
+	return generate_biomes(WIDTH, HEIGHT)
+
+def _decision(animal, snapshot) -> tuple:
+	# Roaming and water sampling draw random numbers, give every animal the same ones in both engines
+	random.seed(animal.id)
+	animal.world.rng = np.random.default_rng(animal.id)
+	action = animal.decide(snapshot)
+	other = getattr(action.other, "id", None)
+	return (round(action.pos[0], 9), round(action.pos[1], 9), action.intent, other)
+
+def test_narrowest_strips_decide_like_the_serial_world(biomes):
+	random.seed(3)
+	world = World((WIDTH, HEIGHT), None, None, biomes, 1, 120, 80, 80, 80, "never", 0.0)
+	world.update_paces()
+	snapshot = Snapshot(world)
+	serial = {animal.id: _decision(animal, snapshot) for animal in world.rabbits + world.foxes}
+
+	# Strips exactly HALO_WIDTH wide, as ParallelEngine splits them
+	workers = WIDTH // HALO_WIDTH
+	options = {"idle_check_interval": 1, "drink_delay": 0.0}
+	tiles = []
+	for rank in range(workers):
+		x0 = rank*HALO_WIDTH if rank > 0 else float("-inf")
+		x1 = (rank + 1)*HALO_WIDTH if rank < workers - 1 else float("inf")
+		tiles.append(_Tile(rank, workers, (x0, x1), biomes, options))
+
+	def owner(pos):
+		return min(max(int(pos[0] // HALO_WIDTH), 0), workers - 1)
+
+	for tile in tiles:
+		tile.insert(
+			[(_kind(a), a.export()) for a in world.rabbits + world.foxes if owner(a.pos) == tile.rank],
+			[(food.id, food.pos) for food in world.food if owner(food.pos) == tile.rank])
+	halos = [tile.halo() for tile in tiles]
+
+	parallel = {}
+	for tile in tiles:
+		ghosts = [(source, *halos[source][tile.rank]) for source in (tile.rank - 1, tile.rank + 1)
+			if 0 <= source < workers]
+		snapshot = tile.snapshot(ghosts)
+		for animal in tile.world.rabbits + tile.world.foxes:
+			parallel[animal.id] = _decision(animal, snapshot)
+
+	assert parallel == serial
+
+def test_strips_narrower_than_the_halo_are_rejected(biomes):
+	with pytest.raises(ValueError):
+		ParallelEngine(biomes, WIDTH // HALO_WIDTH + 1)
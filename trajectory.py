@@ -0,0 +1,335 @@
+import argparse
+import mmap
+import struct
+import zlib
+from bisect import bisect_right
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b"TRAJ"
+VERSION = 1
+
+RABBIT = 0
+FOX = 1
+FOOD = 2
+
+# Fixed point units: positions in 1/100 px, hunger and thirst in 1/100
+POSITION_SCALE = 100
+VALUE_SCALE = 100
+
+# Steps per compressed chunk, the first step of a chunk is stored in full
+CHUNK_STEPS = 256
+COMPRESSION_LEVEL = 3
+
+# magic, version, width, height, compressed terrain length
+_HEADER = struct.Struct("<4sHIII")
+# compressed length, first step, steps, rows
+_CHUNK = struct.Struct("<IQII")
+# offset, first step, steps of every chunk, then the index offset and the magic
+_INDEX_ENTRY = struct.Struct("<QQI")
+_FOOTER = struct.Struct("<Q4s")
+
+Frame = namedtuple("Frame", "step id species state x y hunger thirst")
+
+class TrajectoryRecorder:
+	"""
+	Appends every entity's position, hunger, thirst and state to a log each step
+
+	Rows are kept per entity across steps: the first step of a chunk is
+	stored in fixed point, later steps as the change since the previous
+	step, which is mostly tiny. CHUNK_STEPS steps are compressed and
+	written at once, and an index of the chunks is added on close.
+	"""
+
+	def __init__(self, path: str, world, chunk_steps: int = CHUNK_STEPS, level: int = COMPRESSION_LEVEL):
+		"""
+		Initializes the TrajectoryRecorder and writes the header with the terrain
+
+		Args:
+			path (str): Log file, overwritten
+			world (World): The recorded world
+			chunk_steps (int): Steps per compressed chunk
+			level (int): zlib compression level
+		"""
+
+		self.chunk_steps = chunk_steps
+		self.level = level
+		self.steps = 0
+		self._file = open(path, "wb")
+		terrain = zlib.compress(np.ascontiguousarray(world.biomes, dtype=np.uint8).tobytes(), level)
+		self._file.write(_HEADER.pack(MAGIC, VERSION, world.size[0], world.size[1], len(terrain)))
+		self._file.write(terrain)
+		self._index = []
+		self._chunk = []
+		self._chunk_start = 0
+		self._previous = None
+
+	def record(self, world) -> None:
+		"""
+		Records the current state of the world as the next step
+
+		Args:
+			world (World): The recorded world
+		"""
+
+		rows = [(a.id, RABBIT, a.state.value, a.pos[0], a.pos[1], a.hunger, a.thirst) for a in world.rabbits]
+		rows += [(a.id, FOX, a.state.value, a.pos[0], a.pos[1], a.hunger, a.thirst) for a in world.foxes]
+		rows += [(f.id, FOOD, 0, f.pos[0], f.pos[1], 0, 0) for f in world.food]
+		table = np.array(rows, dtype=np.float64).reshape(-1, 7)
+
+		# Rabbits, Foxes and Food count ids separately, key on both
+		keys = table[:, 0].astype(np.int64) * 4 + table[:, 1].astype(np.int64)
+		order = np.argsort(keys, kind="stable")
+		keys = keys[order]
+		table = table[order]
+		values = np.empty((len(keys), 4), dtype=np.int32)
+		values[:, :2] = np.rint(table[:, 3:5] * POSITION_SCALE)
+		values[:, 2:] = np.rint(table[:, 5:7] * VALUE_SCALE)
+		flags = (table[:, 1].astype(np.uint8) | (table[:, 2].astype(np.uint8) << 2))
+
+		deltas = values.copy()
+		if self._previous is not None:
+			previous_keys, previous_values = self._previous
+			at = np.searchsorted(previous_keys, keys)
+			at[at == len(previous_keys)] = 0
+			known = previous_keys[at] == keys if len(previous_keys) else np.zeros(len(keys), dtype=bool)
+			deltas[known] -= previous_values[at[known]]
+		self._previous = (keys, values)
+
+		key_deltas = np.diff(keys, prepend=0)
+		self._chunk.append((key_deltas, flags, deltas))
+		self.steps += 1
+		if len(self._chunk) >= self.chunk_steps:
+			self._flush()
+
+	def close(self) -> None:
+		"""
+		Writes the last chunk and the index
+		"""
+
+		if self._file.closed:
+			return
+		self._flush()
+		offset = self._file.tell()
+		for entry in self._index:
+			self._file.write(_INDEX_ENTRY.pack(*entry))
+		self._file.write(_FOOTER.pack(offset, MAGIC))
+		self._file.close()
+
+	def __enter__(self) -> "TrajectoryRecorder":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def _flush(self) -> None:
+		"""
+		Compresses and writes the buffered steps as one chunk
+		"""
+
+		if not self._chunk:
+			return
+		counts = np.array([len(flags) for _, flags, _ in self._chunk], dtype=np.uint32)
+		payload = b"".join((
+			counts.tobytes(),
+			np.concatenate([keys for keys, _, _ in self._chunk]).tobytes(),
+			np.concatenate([flags for _, flags, _ in self._chunk]).tobytes(),
+			# Column-major, so each column's small deltas sit together
+			np.concatenate([deltas for _, _, deltas in self._chunk]).T.tobytes(),
+		))
+		data = zlib.compress(payload, self.level)
+
+		self._index.append((self._file.tell(), self._chunk_start, len(self._chunk)))
+		self._file.write(_CHUNK.pack(len(data), self._chunk_start, len(self._chunk), int(counts.sum())))
+		self._file.write(data)
+		self._chunk_start += len(self._chunk)
+		self._chunk = []
+		# Every chunk starts from full values so it can be decoded on its own
+		self._previous = None
+
+class TrajectoryReader:
+	"""
+	Streams a log written by TrajectoryRecorder back as arrays
+
+	The file is memory mapped and only the chunks that are asked for are
+	decoded; the last decoded chunk is kept, so stepping back and forth
+	within it is cheap.
+	"""
+
+	def __init__(self, path: str):
+		"""
+		Initializes the TrajectoryReader and reads the header and the chunk index
+
+		Args:
+			path (str): Log file
+
+		Raises:
+			ValueError: The file is not a trajectory log
+		"""
+
+		with open(path, "rb") as file:
+			self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		if len(self._map) < _HEADER.size:
+			raise ValueError("{} is not a version {} trajectory log".format(path, VERSION))
+		magic, version, self.width, self.height, terrain_length = _HEADER.unpack_from(self._map)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError("{} is not a version {} trajectory log".format(path, VERSION))
+		self._data_start = _HEADER.size + terrain_length
+		terrain = zlib.decompress(self._map[_HEADER.size:self._data_start])
+		self.biomes = np.frombuffer(terrain, dtype=np.uint8).reshape(self.height, self.width)
+		self.index = self._read_index()
+		self._cached = (None, [])
+
+	@property
+	def steps(self) -> int:
+		if not self.index:
+			return 0
+		return self.index[-1][1] + self.index[-1][2]
+
+	def frames(self, start: int = 0, stop: int = None):
+		"""
+		Iterates over the recorded steps
+
+		Args:
+			start (int): First step
+			stop (int): Step to stop before, None for the end
+
+		Yields:
+			Frame: Arrays of one step, sorted by id
+		"""
+
+		stop = self.steps if stop is None else min(stop, self.steps)
+		for offset, first, count in self.index:
+			if first + count <= start or first >= stop:
+				continue
+			for frame in self._chunk(offset):
+				if start <= frame.step < stop:
+					yield frame
+
+	def __iter__(self):
+		return self.frames()
+
+	def frame(self, step: int) -> Frame:
+		"""
+		Args:
+			step (int): Recorded step
+
+		Returns:
+			Frame: Arrays of that step
+		"""
+
+		if 0 <= step < self.steps:
+			# Chunks are in step order
+			chunk = bisect_right(self.index, step, key=lambda entry: entry[1]) - 1
+			offset, first, _ = self.index[chunk]
+			return self._chunk(offset)[step - first]
+		raise IndexError("step {} was not recorded".format(step))
+
+	def close(self) -> None:
+		self._cached = (None, [])
+		self._map.close()
+
+	def __enter__(self) -> "TrajectoryReader":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def _read_index(self) -> [(int, int, int)]:
+		"""
+		Reads the index footer, or rebuilds it by walking the chunks if the
+		recorder was not closed
+
+		Returns:
+			[(int, int, int)]: Offset, first step and step count of every chunk
+		"""
+
+		end = len(self._map)
+		if end - self._data_start >= _FOOTER.size:
+			offset, magic = _FOOTER.unpack_from(self._map, end - _FOOTER.size)
+			if magic == MAGIC and self._data_start <= offset <= end - _FOOTER.size:
+				return list(_INDEX_ENTRY.iter_unpack(self._map[offset:end - _FOOTER.size]))
+
+		index = []
+		offset = self._data_start
+		while offset + _CHUNK.size <= end:
+			length, first, count, _ = _CHUNK.unpack_from(self._map, offset)
+			if offset + _CHUNK.size + length > end:
+				# Cut off in the middle of a write
+				break
+			index.append((offset, first, count))
+			offset += _CHUNK.size + length
+		return index
+
+	def _chunk(self, offset: int) -> [Frame]:
+		"""
+		Args:
+			offset (int): Position of the chunk in the file
+
+		Returns:
+			[Frame]: Decoded steps of the chunk
+		"""
+
+		if self._cached[0] != offset:
+			self._cached = (offset, list(self._decode(offset)))
+		return self._cached[1]
+
+	def _decode(self, offset: int):
+		"""
+		Decodes one chunk
+
+		Args:
+			offset (int): Position of the chunk in the file
+
+		Yields:
+			Frame: Arrays of each step in the chunk
+		"""
+
+		length, first, count, rows = _CHUNK.unpack_from(self._map, offset)
+		start = offset + _CHUNK.size
+		payload = zlib.decompress(self._map[start:start + length])
+
+		counts = np.frombuffer(payload, np.uint32, count)
+		at = counts.nbytes
+		key_deltas = np.frombuffer(payload, np.int64, rows, at)
+		at += key_deltas.nbytes
+		flags = np.frombuffer(payload, np.uint8, rows, at)
+		at += flags.nbytes
+		deltas = np.frombuffer(payload, np.int32, rows*4, at).reshape(4, rows).T
+
+		previous_keys = previous_values = None
+		end = 0
+		for step, size in enumerate(counts):
+			begin, end = end, end + int(size)
+			keys = np.cumsum(key_deltas[begin:end])
+			values = deltas[begin:end].copy()
+			if previous_keys is not None and len(previous_keys):
+				at = np.searchsorted(previous_keys, keys)
+				at[at == len(previous_keys)] = 0
+				known = previous_keys[at] == keys
+				values[known] += previous_values[at[known]]
+			previous_keys, previous_values = keys, values
+
+			step_flags = flags[begin:end]
+			yield Frame(
+				first + step,
+				keys // 4,
+				step_flags & 3,
+				step_flags >> 2,
+				values[:, 0] / POSITION_SCALE,
+				values[:, 1] / POSITION_SCALE,
+				values[:, 2] / VALUE_SCALE,
+				values[:, 3] / VALUE_SCALE,
+			)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Summarizes a trajectory log")
+	parser.add_argument('path', help="Log written with main.py --record.")
+	args = parser.parse_args()
+
+	with TrajectoryReader(args.path) as reader:
+		print("{}x{} world, {} steps in {} chunks".format(reader.width, reader.height, reader.steps, len(reader.index)))
+		for frame in reader:
+			if frame.step % 100 == 0 or frame.step == reader.steps - 1:
+				print("step {}: {} rabbits, {} foxes, {} food".format(frame.step,
+					*(int((frame.species == species).sum()) for species in (RABBIT, FOX, FOOD))))
@@ -0,0 +1,708 @@
+import argparse
+from collections import namedtuple
+from math import pi
+from time import perf_counter
+import numpy as np
+from animal import State, HUNGER_THRESHOLD, THIRST_THRESHOLD
+from terrain_gen import NoiseMapBiome, pace_raster
+from world import END_CONDITIONS, HEADLESS_FRAME_TIME, LAND_BIOMES
+
+RABBIT = 0
+FOX = 1
+
+# Intents of a decision, as animal.Intent
+MOVE, EAT, MATE, DRINK = 0, 1, 2, 3
+# What a remembered target is
+NO_TARGET, FOOD_TARGET, ANIMAL_TARGET = 0, 1, 2
+
+# Per species constants of Rabbit and Fox, indexed by RABBIT and FOX
+SIGHT = np.array([150.0, 200.0])
+FOOD_VALUE = np.array([30.0, 30.0])
+MEALS_TO_REPRODUCE = np.array([2, 3])
+WATER_VALUE = np.array([30.0, 25.0])
+DRINKS_TO_REPRODUCE = np.array([2, 2])
+# Shore cells an animal looks at when it wants to drink, as Animal.sight_entities
+WATER_SAMPLES = 25
+
+ROAM = State.ROAM.value
+REPRODUCE = State.REPRODUCE.value
+
+StepResult = namedtuple("StepResult", "observation counts done lengths")
+
+def _resolve(key: np.ndarray, distance: np.ndarray, ids: np.ndarray) -> np.ndarray:
+	"""
+	Settles claims on the same entity like world.resolve_claims: the closest
+	claimant wins, ties going to the lowest id
+
+	Args:
+		key (np.ndarray): Claimed entity of each claim, unique across worlds
+		distance (np.ndarray): Distance of each claimant
+		ids (np.ndarray): Id of each claimant
+
+	Returns:
+		np.ndarray: Indices of the winning claims, by precedence
+	"""
+
+	order = np.lexsort((ids, distance, key))
+	first = np.ones(len(order), dtype=bool)
+	first[1:] = key[order][1:] != key[order][:-1]
+	winners = order[first]
+	return winners[np.lexsort((ids[winners], distance[winners]))]
+
+class VectorWorlds:
+	"""
+	Steps K independent worlds with the rules of World at once
+
+	Animals and Food of all worlds live in padded (K, capacity) arrays and
+	every rule of Rabbit.decide, Fox.decide and World._commit is applied
+	to all of them with numpy, distances being brute force per world, which
+	suits many small worlds. Worlds whose end condition triggers are reset
+	within step, so callers never see a finished world.
+
+	The random streams differ from World's, so runs are not step for step
+	identical to the object model, only statistically alike. Births beyond
+	the capacity of a world are dropped and the idle scheduling of World
+	is not used.
+	"""
+
+	def __init__(self, count: int, terrains: [np.ndarray], terrain_index: [int] = None, rabbits: int = 20,
+			foxes: int = 12, food: int = 80, food_cap: int = 80, capacity: int = None,
+			end_condition: str = "default", seed: int = None):
+		"""
+		Initializes the VectorWorlds and spawns every world
+
+		Args:
+			count (int): Number of worlds
+			terrains ([np.ndarray]): Biome rasters of equal shape, see Map2D.biome_raster
+			terrain_index ([int]): Raster of each world, world k uses terrains[k % len(terrains)] by default
+			rabbits (int): Initial Rabbit count of each world
+			foxes (int): Initial Fox count of each world
+			food (int): Initial Food count of each world
+			food_cap (int): No Food is added while a world has this much Food
+			capacity (int): Most animals per world, 4 times the initial animals by default
+			end_condition (str): Key of END_CONDITIONS deciding when a world is reset
+			seed (int): Seed of the random generator
+		"""
+
+		self.count = count
+		self.terrains = np.stack([np.asarray(terrain, dtype=np.uint8) for terrain in terrains])
+		self.height, self.width = self.terrains.shape[1:]
+		if terrain_index is None:
+			terrain_index = np.arange(count) % len(terrains)
+		self.terrain_index = np.asarray(terrain_index, dtype=np.int64)
+		flat = self.terrains.reshape(len(terrains), -1)
+		self._landcells = [np.flatnonzero(np.isin(cells, LAND_BIOMES)) for cells in flat]
+		self._shorecells = [np.flatnonzero(cells == NoiseMapBiome.SHALLOWS.value) for cells in flat]
+		# Speed multiplier of every cell of every terrain, see World.update_paces
+		self.paces = pace_raster(self.terrains)
+
+		self.initial = (rabbits, foxes, food)
+		self.food_cap = food_cap
+		self.capacity = capacity if capacity is not None else 4*(rabbits + foxes)
+		if self.capacity < rabbits + foxes:
+			raise ValueError("capacity {} is below the {} initial animals".format(self.capacity, rabbits + foxes))
+		self.food_capacity = max(food, food_cap)
+		self.end_condition = END_CONDITIONS[end_condition]
+		self.rng = np.random.default_rng(seed)
+		self._next_id = 0
+
+		shape = (count, self.capacity)
+		self.alive = np.zeros(shape, dtype=bool)
+		self.species = np.zeros(shape, dtype=np.int8)
+		self.ids = np.zeros(shape, dtype=np.int64)
+		self.x = np.zeros(shape)
+		self.y = np.zeros(shape)
+		self.angle = np.zeros(shape)
+		self.speed = np.zeros(shape)
+		self.size = np.zeros(shape)
+		self.sex = np.zeros(shape, dtype=np.int8)
+		self.hunger = np.zeros(shape)
+		self.thirst = np.zeros(shape)
+		self.state = np.zeros(shape, dtype=np.int8)
+		self.eat_count = np.zeros(shape, dtype=np.int64)
+		self.drink_count = np.zeros(shape, dtype=np.int64)
+		self.target_kind = np.zeros(shape, dtype=np.int8)
+		self.target_slot = np.zeros(shape, dtype=np.int64)
+		self.target_id = np.zeros(shape, dtype=np.int64)
+
+		food_shape = (count, self.food_capacity)
+		self.food_alive = np.zeros(food_shape, dtype=bool)
+		self.food_ids = np.zeros(food_shape, dtype=np.int64)
+		self.food_x = np.zeros(food_shape)
+		self.food_y = np.zeros(food_shape)
+
+		self.steps = np.zeros(count, dtype=np.int64)
+		self.runtime = np.zeros(count)
+		self.runtime_checkpoint = np.zeros(count)
+		self.reset(np.ones(count, dtype=bool))
+
+	def reset(self, worlds: np.ndarray) -> None:
+		"""
+		Respawns some worlds from scratch
+
+		Args:
+			worlds (np.ndarray): Boolean mask of the worlds to reset
+		"""
+
+		rabbits, foxes, food = self.initial
+		for k in np.flatnonzero(worlds):
+			self.alive[k] = False
+			self.food_alive[k] = False
+			self.target_kind[k] = NO_TARGET
+			slots = np.arange(rabbits + foxes)
+			self._spawn(np.full(len(slots), k), slots, np.repeat([RABBIT, FOX], [rabbits, foxes]),
+				*self._sample(self._landcells, k, rabbits + foxes), self.rng.uniform(0, 4.0, len(slots)))
+			self.food_x[k, :food], self.food_y[k, :food] = self._sample(self._landcells, k, food)
+			self.food_alive[k, :food] = True
+			self.food_ids[k, :food] = self._ids(food)
+		self.steps[worlds] = 0
+		self.runtime[worlds] = 0
+		self.runtime_checkpoint[worlds] = 0
+
+	def step(self) -> StepResult:
+		"""
+		Advances every world by one frame, then resets the finished ones
+
+		Returns:
+			StepResult: Observation after the resets, (K, 3) Rabbit, Fox and
+				Food counts and the done mask of this step, and the length of
+				the runs that ended
+		"""
+
+		self._respawn_food()
+		decision = self._decide()
+		self._commit(*decision)
+		self.steps += 1
+
+		counts = self.counts()
+		rabbits, foxes = counts[:, 0], counts[:, 1]
+		done = np.array([self.end_condition(_Populations(r, f)) for r, f in zip(rabbits, foxes)], dtype=bool)
+		lengths = np.where(done, self.steps, 0)
+		if done.any():
+			self.reset(done)
+		return StepResult(self.observe(), counts, done, lengths)
+
+	def counts(self) -> np.ndarray:
+		"""
+		Returns:
+			np.ndarray: (K, 3) Rabbit, Fox and Food count of each world
+		"""
+
+		return np.stack([
+			(self.alive & (self.species == RABBIT)).sum(axis=1),
+			(self.alive & (self.species == FOX)).sum(axis=1),
+			self.food_alive.sum(axis=1),
+		], axis=1)
+
+	def observe(self) -> {str: np.ndarray}:
+		"""
+		Returns:
+			{str: np.ndarray}: Copies of the stacked (K, capacity) animal and
+				(K, food capacity) Food arrays, dead slots masked out by alive
+		"""
+
+		return {
+			"alive": self.alive.copy(), "species": self.species.copy(), "x": self.x.copy(), "y": self.y.copy(),
+			"hunger": self.hunger.copy(), "thirst": self.thirst.copy(), "speed": self.speed.copy(),
+			"state": self.state.copy(), "food_alive": self.food_alive.copy(),
+			"food_x": self.food_x.copy(), "food_y": self.food_y.copy(),
+		}
+
+	def _decide(self) -> tuple:
+		"""
+		Decides every animal's step from the state at the start of the step,
+		as Rabbit.decide and Fox.decide
+
+		Returns:
+			tuple: New x, y and angle, intent, claimed slot, claim distance and
+				the remembered target's kind, slot and id
+		"""
+
+		# Slots past the last occupied one are left out of the pairwise distances
+		w = _Window(self)
+		alive, species = w.alive, w.species
+		x, y, pace = w.x, w.y, w.pace
+		rabbit = alive & (species == RABBIT)
+		fox = alive & (species == FOX)
+		sight = SIGHT[species]
+
+		dx = x[:, None, :] - x[:, :, None]
+		dy = y[:, None, :] - y[:, :, None]
+		apart = np.hypot(dx, dy)
+		in_sight = (apart <= sight[:, :, None]) & alive[:, None, :]
+		in_sight &= ~np.eye(alive.shape[1], dtype=bool)
+		food_apart = np.hypot(w.food_x[:, None, :] - x[:, :, None], w.food_y[:, None, :] - y[:, :, None])
+		food_apart[~np.broadcast_to(w.food_alive[:, None, :], food_apart.shape)] = np.inf
+
+		new_x, new_y = x.copy(), y.copy()
+		new_angle = w.angle.copy()
+		intent = np.full(alive.shape, MOVE, dtype=np.int8)
+		other = np.full(alive.shape, -1, dtype=np.int64)
+		claim = np.zeros(alive.shape)
+		kind, slot, tid = w.target_kind.copy(), w.target_slot.copy(), w.target_id.copy()
+		roam = np.zeros(alive.shape, dtype=bool)
+
+		# Rabbits flee from the average point of the Foxes in sight
+		seen_foxes = in_sight & fox[:, None, :]
+		fox_count = seen_foxes.sum(axis=2)
+		fleeing = rabbit & (fox_count > 0)
+		if fleeing.any():
+			with np.errstate(invalid="ignore", divide="ignore"):
+				average_x = (x[:, None, :]*seen_foxes).sum(axis=2) / fox_count
+				average_y = (y[:, None, :]*seen_foxes).sum(axis=2) / fox_count
+			turn = np.arctan2(average_y - y, average_x - x) + pi
+			flee_x, flee_y = x + pace*np.cos(turn), y + pace*np.sin(turn)
+			# Towards the center of the world when that leaves it, with Rabbit.decide's axes
+			outside = ~self._in_bounds(flee_x, flee_y)
+			turn = np.where(outside, np.arctan2(self.width/2 - y, self.height/2 - x), turn)
+			flee_x = np.where(outside, x + pace*np.cos(turn), flee_x)
+			flee_y = np.where(outside, y + pace*np.sin(turn), flee_y)
+			new_x[fleeing], new_y[fleeing] = flee_x[fleeing], flee_y[fleeing]
+
+		# Hungry or roaming animals go for the closest Food (Rabbits) or Rabbit (Foxes) in sight,
+		# else for the one they went for before if it still exists
+		seeking = alive & ~fleeing & ((w.state == ROAM) | (w.hunger <= HUNGER_THRESHOLD))
+		prey_apart = np.where(in_sight & rabbit[:, None, :], apart, np.inf)
+		nearest_prey = prey_apart.argmin(axis=2)
+		sees_prey = np.take_along_axis(prey_apart, nearest_prey[:, :, None], 2)[:, :, 0] < np.inf
+		food_apart_seen = np.where(food_apart <= sight[:, :, None], food_apart, np.inf)
+		nearest_food = food_apart_seen.argmin(axis=2)
+		sees_food = np.take_along_axis(food_apart_seen, nearest_food[:, :, None], 2)[:, :, 0] < np.inf
+
+		remembered_food = (kind == FOOD_TARGET) & self._food_exists(w, slot, tid)
+		remembered_prey = (kind == ANIMAL_TARGET) & self._animal_exists(w, slot, tid, RABBIT)
+		for who, sees, nearest, remembered, target_kind in (
+				(rabbit, sees_food, nearest_food, remembered_food, FOOD_TARGET),
+				(fox, sees_prey, nearest_prey, remembered_prey, ANIMAL_TARGET)):
+			mask = seeking & who
+			has = mask & (sees | remembered)
+			target = np.where(sees, nearest, slot)
+			if target_kind == FOOD_TARGET:
+				target_x, target_y = self._gather(w.food_x, target), self._gather(w.food_y, target)
+				target_id = np.where(sees, self._gather(w.food_ids, target), tid)
+			else:
+				target_x, target_y = self._gather(x, target), self._gather(y, target)
+				target_id = np.where(sees, self._gather(w.ids, target), tid)
+			self._approach(w, has, target, target_kind, target_id, target_x, target_y, EAT,
+				new_x, new_y, intent, other, claim, kind, slot, tid)
+			roam |= mask & ~has
+
+		# Reproducing animals go for the closest reproducing partner of the other sex in sight,
+		# else for the partner they went for before, else for water when thirsty
+		reproducing = alive & ~fleeing & ~seeking
+		if reproducing.any():
+			partner = (in_sight & (species[:, None, :] == species[:, :, None]) & (w.state[:, None, :] == REPRODUCE)
+				& (w.sex[:, None, :] != w.sex[:, :, None]))
+			partner_apart = np.where(partner, apart, np.inf)
+			nearest = partner_apart.argmin(axis=2)
+			sees = np.take_along_axis(partner_apart, nearest[:, :, None], 2)[:, :, 0] < np.inf
+			remembered = (kind == ANIMAL_TARGET) & self._animal_exists(w, slot, tid, species)
+			has = reproducing & (sees | remembered)
+			target = np.where(sees, nearest, slot)
+			target_id = np.where(sees, self._gather(w.ids, target), tid)
+			self._approach(w, has, target, ANIMAL_TARGET, target_id, self._gather(x, target), self._gather(y, target),
+				MATE, new_x, new_y, intent, other, claim, kind, slot, tid)
+
+			thirsty = reproducing & ~has & (w.thirst <= THIRST_THRESHOLD)
+			if thirsty.any():
+				water_x, water_y = self._nearest_water(thirsty, w)
+				self._approach(w, thirsty, np.zeros_like(slot), NO_TARGET, tid, water_x, water_y, DRINK,
+					new_x, new_y, intent, other, claim, kind, slot, tid)
+			roam |= reproducing & ~has & ~thirsty
+
+		roam_x, roam_y, roam_angle = self._roam(w)
+		new_x[roam], new_y[roam], new_angle[roam] = roam_x[roam], roam_y[roam], roam_angle[roam]
+		return w.widen(new_x, new_y, new_angle, intent, other, claim, kind, slot, tid)
+
+	def _approach(self, w, mask, target, target_kind, target_id, target_x, target_y, reached_intent,
+			new_x, new_y, intent, other, claim, kind, slot, tid) -> None:
+		"""
+		Jumps onto targets within a step, claiming them, and steps towards the others, in place
+
+		Args:
+			w (_Window): Occupied slots
+			mask (np.ndarray): Animals that have a target
+			target (np.ndarray): Slot of their target
+			target_kind (int): What the target is, remembered unless it was reached
+			target_id (np.ndarray): Id of their target
+			target_x (np.ndarray): x of their target
+			target_y (np.ndarray): y of their target
+			reached_intent (int): Intent of reaching the target
+		"""
+
+		apart = np.hypot(target_x - w.x, target_y - w.y)
+		reached = mask & (apart <= w.pace)
+		walking = mask & ~reached
+		with np.errstate(invalid="ignore", divide="ignore"):
+			ratio = w.pace / apart
+			new_x[walking] = (w.x + (target_x - w.x)*ratio)[walking]
+			new_y[walking] = (w.y + (target_y - w.y)*ratio)[walking]
+		new_x[reached], new_y[reached] = target_x[reached], target_y[reached]
+		intent[reached] = reached_intent
+		other[reached] = target[reached]
+		claim[reached] = apart[reached]
+		kind[reached] = NO_TARGET
+		kind[walking] = target_kind
+		slot[walking] = target[walking]
+		tid[walking] = target_id[walking]
+
+	def _roam(self, w: "_Window") -> (np.ndarray, np.ndarray, np.ndarray):
+		"""
+		Random movement towards the movement angle of every animal, as Animal._roam
+
+		Args:
+			w (_Window): Occupied slots
+
+		Returns:
+			(np.ndarray, np.ndarray, np.ndarray): New x, y and movement angle
+		"""
+
+		angle = w.angle.copy()
+		new_x = w.x + w.pace*np.cos(angle)
+		new_y = w.y + w.pace*np.sin(angle)
+		# Turn a quarter at a time away from the edge and from water
+		for _ in range(4):
+			blocked = ~self._walkable(new_x, new_y)
+			if not blocked.any():
+				break
+			angle[blocked] += pi/2
+			new_x[blocked] = (w.x + w.pace*np.cos(angle))[blocked]
+			new_y[blocked] = (w.y + w.pace*np.sin(angle))[blocked]
+		# Water all around, wade on but stay in the world
+		for _ in range(3):
+			outside = ~self._in_bounds(new_x, new_y)
+			if not outside.any():
+				break
+			angle[outside] += pi/2
+			new_x[outside] = (w.x + w.pace*np.cos(angle))[outside]
+			new_y[outside] = (w.y + w.pace*np.sin(angle))[outside]
+		angle += self.rng.uniform(-pi*2/36, pi*2/36, angle.shape)
+		return new_x, new_y, angle
+
+	def _commit(self, new_x, new_y, new_angle, intent, other, claim, kind, slot, tid) -> None:
+		"""
+		Applies the decisions of one step, as World._commit
+		"""
+
+		alive = self.alive
+		rabbit = alive & (self.species == RABBIT)
+		worlds = np.arange(self.count)[:, None].repeat(self.capacity, axis=1)
+
+		# Foxes eat the Rabbits they reached, killed Rabbits do nothing else
+		kills = alive & (self.species == FOX) & (intent == EAT)
+		k, s = np.nonzero(kills)
+		if len(k):
+			prey = other[k, s]
+			won = _resolve(k*self.capacity + prey, claim[k, s], self.ids[k, s])
+			k, s, prey = k[won], s[won], prey[won]
+		else:
+			prey = other[k, s]
+		killed = np.zeros_like(alive)
+		killed[k, prey] = True
+		moving = alive & ~killed
+		self.x[moving], self.y[moving], self.angle[moving] = new_x[moving], new_y[moving], new_angle[moving]
+		self.target_kind[moving], self.target_slot[moving], self.target_id[moving] = kind[moving], slot[moving], tid[moving]
+		self._eat(k, s)
+		alive &= ~killed
+
+		# Rabbits eat the Food they reached
+		meals = alive & rabbit & (intent == EAT)
+		k, s = np.nonzero(meals)
+		if len(k):
+			food = other[k, s]
+			won = _resolve(k*self.food_capacity + food, claim[k, s], self.ids[k, s])
+			self._eat(k[won], s[won])
+			self.food_alive[k[won], food[won]] = False
+
+		drinks = alive & (intent == DRINK)
+		if drinks.any():
+			species = self.species[drinks]
+			self.thirst[drinks] = np.minimum(self.thirst[drinks] + WATER_VALUE[species], 100)
+			self.drink_count[drinks] += 1
+			reproduce = drinks.copy()
+			reproduce[drinks] = self.drink_count[drinks] % DRINKS_TO_REPRODUCE[species] == 0
+			self.state[reproduce] = REPRODUCE
+
+		# Pairs reaching each other mate once per step, closest claims first
+		births = []
+		mating = alive & (intent == MATE)
+		mating[mating] &= alive[worlds[mating], other[mating]]
+		k, s = np.nonzero(mating)
+		if len(k):
+			partner = other[k, s]
+			won = _resolve(k*self.capacity + partner, claim[k, s], self.ids[k, s])
+			mated = set()
+			for world, first, second in zip(k[won].tolist(), s[won].tolist(), partner[won].tolist()):
+				if (world, first) not in mated and (world, second) not in mated:
+					mated.update(((world, first), (world, second)))
+					births.append((world, first, second))
+
+		# Hunger and thirst after movement
+		self.hunger[alive] -= self.size[alive]
+		self.thirst[alive] -= 0.1*self.speed[alive]
+		alive &= (self.hunger > 0) & (self.thirst > 0)
+
+		if births:
+			self._births(np.array(births))
+
+	def _eat(self, k: np.ndarray, s: np.ndarray) -> None:
+		"""
+		Restores hunger of animals that ate, as Animal.consume
+		"""
+
+		if not len(k):
+			return
+		species = self.species[k, s]
+		self.hunger[k, s] = np.minimum(self.hunger[k, s] + FOOD_VALUE[species], 100)
+		self.eat_count[k, s] += 1
+		reproduce = self.eat_count[k, s] % MEALS_TO_REPRODUCE[species] == 0
+		self.state[k[reproduce], s[reproduce]] = REPRODUCE
+
+	def _births(self, births: np.ndarray) -> None:
+		"""
+		Adds the offspring of mated pairs next to the first parent, as Animal.mate
+
+		Args:
+			births (np.ndarray): World, first and second parent slot of each pair
+		"""
+
+		k, first, second = births.T
+		self.state[k, first] = ROAM
+		self.state[k, second] = ROAM
+		speed = (self.speed[k, first] + self.speed[k, second])/2 + self.rng.uniform(-0.5, 0.5, len(k))
+
+		# The pairs of a world take its free slots one after another
+		order = np.argsort(k, kind="stable")
+		k, first, speed = k[order], first[order], speed[order]
+		index = np.arange(len(k))
+		rank = index - np.maximum.accumulate(np.where(np.r_[True, k[1:] != k[:-1]], index, 0))
+		free = ~self.alive[k]
+		room = rank < free.sum(axis=1)
+		k, first, speed, rank, free = k[room], first[room], speed[room], rank[room], free[room]
+		slot = (((np.cumsum(free, axis=1) - 1) == rank[:, None]) & free).argmax(axis=1)
+		self._spawn(k, slot, self.species[k, first], self.x[k, first], self.y[k, first], speed)
+
+	def _spawn(self, k, slot, species, x, y, speed) -> None:
+		"""
+		Fills slots with new animals, as Animal.__init__
+		"""
+
+		count = len(k)
+		self.alive[k, slot] = True
+		self.species[k, slot] = species
+		self.ids[k, slot] = self._ids(count)
+		self.x[k, slot], self.y[k, slot] = x, y
+		self.speed[k, slot] = speed
+		self.sex[k, slot] = self.rng.integers(0, 2, count)
+		self.size[k, slot] = self.rng.integers(5, 11, count)/10
+		self.angle[k, slot] = self.rng.uniform(0, 2*pi, count)
+		self.hunger[k, slot] = 100
+		self.thirst[k, slot] = 100
+		self.eat_count[k, slot] = 0
+		self.drink_count[k, slot] = 0
+		self.state[k, slot] = ROAM
+		self.target_kind[k, slot] = NO_TARGET
+
+	def _respawn_food(self) -> None:
+		"""
+		Adds one Food per simulated second to every world below the cap, as World._advance
+		"""
+
+		self.runtime += HEADLESS_FRAME_TIME
+		due = ((self.runtime - self.runtime_checkpoint)/1000 >= 1) & (self.food_alive.sum(axis=1) < self.food_cap)
+		for k in np.flatnonzero(due):
+			self.runtime_checkpoint[k] = self.runtime[k]
+			slot = np.argmin(self.food_alive[k])
+			(self.food_x[k, slot],), (self.food_y[k, slot],) = self._sample(self._landcells, k, 1)
+			self.food_alive[k, slot] = True
+			self.food_ids[k, slot] = self._ids(1)[0]
+
+	def _nearest_water(self, mask: np.ndarray, w: "_Window") -> (np.ndarray, np.ndarray):
+		"""
+		Picks the closest of WATER_SAMPLES random shore cells for animals, as Animal.sight_entities
+
+		Args:
+			mask (np.ndarray): Animals looking for water
+			w (_Window): Occupied slots
+
+		Returns:
+			(np.ndarray, np.ndarray): x and y of their water, 0 elsewhere
+		"""
+
+		water_x = np.zeros(mask.shape)
+		water_y = np.zeros(mask.shape)
+		k, s = np.nonzero(mask)
+		terrain = self.terrain_index[k]
+		for index in np.unique(terrain):
+			rows = terrain == index
+			cells = self._shorecells[index]
+			picked = cells[self.rng.integers(len(cells), size=(rows.sum(), WATER_SAMPLES))]
+			cell_y, cell_x = np.divmod(picked, self.width)
+			apart = np.hypot(cell_x - self.x[k[rows], s[rows]][:, None], cell_y - self.y[k[rows], s[rows]][:, None])
+			nearest = apart.argmin(axis=1)
+			chosen = np.arange(len(nearest))
+			water_x[k[rows], s[rows]] = cell_x[chosen, nearest]
+			water_y[k[rows], s[rows]] = cell_y[chosen, nearest]
+		return water_x, water_y
+
+	def _sample(self, cells: [np.ndarray], k: int, count: int) -> (np.ndarray, np.ndarray):
+		"""
+		Args:
+			cells ([np.ndarray]): Flat cell indices per terrain, e.g. self._landcells
+			k (int): World
+			count (int): Positions to draw
+
+		Returns:
+			(np.ndarray, np.ndarray): x and y of random cells of the world's terrain
+		"""
+
+		terrain_cells = cells[self.terrain_index[k]]
+		y, x = np.divmod(terrain_cells[self.rng.integers(len(terrain_cells), size=count)], self.width)
+		return x.astype(np.float64), y.astype(np.float64)
+
+	def _ids(self, count: int) -> np.ndarray:
+		ids = np.arange(self._next_id, self._next_id + count)
+		self._next_id += count
+		return ids
+
+	def _in_bounds(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+		return (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+
+	def _cells(self, x: np.ndarray, y: np.ndarray) -> (np.ndarray, np.ndarray):
+		"""
+		Args:
+			x (np.ndarray): (K, n) x positions
+			y (np.ndarray): (K, n) y positions
+
+		Returns:
+			(np.ndarray, np.ndarray): Row and column of the terrain cell under each, clamped to the world
+		"""
+
+		with np.errstate(invalid="ignore"):
+			rows = np.clip(y.astype(np.int64), 0, self.height - 1)
+			columns = np.clip(x.astype(np.int64), 0, self.width - 1)
+		return rows, columns
+
+	def _walkable(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+		rows, columns = self._cells(x, y)
+		water = self.terrains[self.terrain_index[:, None], rows, columns] == NoiseMapBiome.OCEAN.value
+		return self._in_bounds(x, y) & ~water
+
+	def _paces(self, w: "_Window") -> np.ndarray:
+		"""
+		Args:
+			w (_Window): Occupied slots
+
+		Returns:
+			np.ndarray: Distance every animal covers this step, its speed slowed down
+				by the terrain under it, in one gather over all worlds
+		"""
+
+		rows, columns = self._cells(w.x, w.y)
+		return w.speed*self.paces[self.terrain_index[:, None], rows, columns]
+
+	def _food_exists(self, w: "_Window", slot: np.ndarray, ids: np.ndarray) -> np.ndarray:
+		return self._gather(w.food_alive, slot) & (self._gather(w.food_ids, slot) == ids)
+
+	def _animal_exists(self, w: "_Window", slot: np.ndarray, ids: np.ndarray, species) -> np.ndarray:
+		return (self._gather(w.alive, slot) & (self._gather(w.ids, slot) == ids)
+			& (self._gather(w.species, slot) == species))
+
+	@staticmethod
+	def _gather(values: np.ndarray, slot: np.ndarray) -> np.ndarray:
+		"""
+		Args:
+			values (np.ndarray): (K, n) array
+			slot (np.ndarray): (K, capacity) indices into its rows
+
+		Returns:
+			np.ndarray: values[k, slot[k, i]] for every k and i
+		"""
+
+		return np.take_along_axis(values, np.clip(slot, 0, values.shape[1] - 1), axis=1)
+
+class _Window:
+	"""Views of the animal and Food arrays of a VectorWorlds up to their last occupied slots"""
+
+	ANIMAL_FIELDS = ("alive", "species", "ids", "x", "y", "angle", "speed", "sex", "hunger", "thirst", "state",
+		"target_kind", "target_slot", "target_id")
+	FOOD_FIELDS = ("food_alive", "food_ids", "food_x", "food_y")
+
+	def __init__(self, worlds: VectorWorlds):
+		self.worlds = worlds
+		occupied = np.flatnonzero(worlds.alive.any(axis=0))
+		self.width = occupied[-1] + 1 if len(occupied) else 1
+		food = np.flatnonzero(worlds.food_alive.any(axis=0))
+		food_width = food[-1] + 1 if len(food) else 1
+		for name in self.ANIMAL_FIELDS:
+			setattr(self, name, getattr(worlds, name)[:, :self.width])
+		for name in self.FOOD_FIELDS:
+			setattr(self, name, getattr(worlds, name)[:, :food_width])
+		self.pace = worlds._paces(self)
+
+	def widen(self, *arrays: np.ndarray) -> [np.ndarray]:
+		"""
+		Args:
+			*arrays (np.ndarray): (K, width) arrays
+
+		Returns:
+			[np.ndarray]: The arrays padded with zeros to (K, capacity)
+		"""
+
+		padded = []
+		for array in arrays:
+			full = np.zeros((array.shape[0], self.worlds.capacity), dtype=array.dtype)
+			full[:, :self.width] = array
+			padded.append(full)
+		return padded
+
+class _Populations:
+	"""Stand-in for a World in END_CONDITIONS, which only look at the population sizes"""
+
+	def __init__(self, rabbits: int, foxes: int):
+		self.rabbits = range(rabbits)
+		self.foxes = range(foxes)
+
+if __name__ == "__main__":
+	import random
+	from terrain_gen import generate_biomes
+	from world import World
+
+	parser = argparse.ArgumentParser(description="Compares stepping K Worlds in a loop with one VectorWorlds")
+	parser.add_argument('--worlds', help="Number of worlds.", type=int, default=64)
+	parser.add_argument('--steps', help="Steps to run.", type=int, default=300)
+	parser.add_argument('--rabbits', help="Initial number of rabbits.", type=int, default=20)
+	parser.add_argument('--foxes', help="Initial number of foxes.", type=int, default=12)
+	parser.add_argument('--food', help="Initial amount of food.", type=int, default=80)
+	parser.add_argument('--width', help="World width.", type=int, default=480)
+	parser.add_argument('--height', help="World height.", type=int, default=375)
+	parser.add_argument('--seed', help="Random seed.", type=int, default=0)
+	args = parser.parse_args()
+
+	biomes = generate_biomes(args.width, args.height)
+	random.seed(args.seed)
+
+	def fresh() -> World:
+		return World((args.width, args.height), None, None, biomes, rabbits=args.rabbits, foxes=args.foxes,
+			food=args.food, food_cap=args.food, drink_delay=0.0)
+
+	worlds = [fresh() for _ in range(args.worlds)]
+	start = perf_counter()
+	for _ in range(args.steps):
+		for i, world in enumerate(worlds):
+			world.step()
+			if not world.running:
+				worlds[i] = fresh()
+	looped = perf_counter() - start
+
+	env = VectorWorlds(args.worlds, [biomes], rabbits=args.rabbits, foxes=args.foxes, food=args.food,
+		food_cap=args.food, seed=args.seed)
+	finished = 0
+	start = perf_counter()
+	for _ in range(args.steps):
+		finished += int(env.step().done.sum())
+	vectorized = perf_counter() - start
+
+	print("{} worlds x {} steps".format(args.worlds, args.steps))
+	print("World loop:    {:.2f} s".format(looped))
+	print("VectorWorlds:  {:.2f} s ({:.1f}x), {} worlds reset".format(vectorized, looped/vectorized, finished))
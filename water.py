@@ -0,0 +1,7 @@
+class Water():
+	"""Class representing a drinkable shore point in the world"""
+
+	__slots__ = ("pos",)
+
+	def __init__(self, pos: (float, float)):
+		self.pos = pos
@@ -1,26 +1,70 @@
 import random
+from time import perf_counter
+import numpy as np
 from worldtools import *
-import pygame
 from rabbit import Rabbit
 from fox import Fox
 from food import Food
 from terrain_gen  import Map2D
-from terrain_gen import Cell, NoiseMapBiome
+from terrain_gen import NoiseMapBiome, pace_raster
+from scheduler import ActivityScheduler, MeterEvents, IDLE_CHECK_INTERVAL
+from aggregates import PopulationStats
+from metrics import StepMetrics
+from biomass import BiomassField
+from spatial import Snapshot
+from animal import Intent
+from eventlog import STARVED, DEHYDRATED
+
+LAND_BIOMES = (NoiseMapBiome.FOREST.value, NoiseMapBiome.GRASSLAND.value)
+
+# Frame time used when the world runs without a pygame Clock, in ms
+HEADLESS_FRAME_TIME = 1000 / 30
+
+# Food as discrete Food objects or as a BiomassField Rabbits graze
+FOOD_MODELS = ("objects", "biomass")
+
+END_CONDITIONS = {
+	# Stop when a single Rabbit or no Fox is left
+	"default": lambda world: len(world.rabbits) <= 1 or len(world.foxes) <= 0,
+	# Stop when either species is extinct
+	"extinction": lambda world: len(world.rabbits) <= 0 or len(world.foxes) <= 0,
+	# Run until stopped from outside
+	"never": lambda world: False,
+}
 
 
 class World():
 	"""Class representing an environment"""
 
-	def __init__(self, srn_sz: (float, float), clock: pygame.time.Clock, screen: pygame.Surface,allCells):
+	def __init__(self, srn_sz: (float, float), clock: "pygame.time.Clock", screen: "pygame.Surface", biomes: np.ndarray,
+			idle_check_interval: int = IDLE_CHECK_INTERVAL, rabbits: int = 20, foxes: int = 12,
+			food: int = 80, food_cap: int = 80, end_condition: str = "default", drink_delay: float = 0.5,
+			food_model: str = "objects"):
 		"""
 		Initializes the World
 
 		Args:
 			srn_sz ( (float, float) ): Screen size
-			clock (pygame.time.Clock): pygame Clock
-			screen (pygame.Surface): pygame Screen
+			clock (pygame.time.Clock): pygame Clock, None runs on a fixed HEADLESS_FRAME_TIME
+			screen (pygame.Surface): pygame Screen, None disables drawing
+			biomes (np.ndarray): (height, width) raster of NoiseMapBiome values
+			idle_check_interval (int): Steps between neighbour checks of idle animals, 1 disables idling
+			rabbits (int): Initial Rabbit count
+			foxes (int): Initial Fox count
+			food (int): Initial Food count
+			food_cap (int): No Food is added while this much Food is in the world
+			end_condition (str): Key of END_CONDITIONS deciding when the simulation is complete
+			drink_delay (float): Seconds an animal blocks the simulation while drinking
+			food_model (str): One of FOOD_MODELS, with "biomass" food and food_cap are ignored
+
+		Raises:
+			ValueError: Unknown end_condition or food_model
 		"""
 
+		if end_condition not in END_CONDITIONS:
+			raise ValueError("unknown end condition {}, expected one of {}".format(
+				end_condition, ", ".join(END_CONDITIONS)))
+
 		self.running = True
 
 		self._clock = clock
@@ -30,26 +74,45 @@ class World():
 		self.runtime_checkpoint = 0
 
 		self.size = srn_sz
+		self.food_cap = food_cap
+		self.end_condition = end_condition
+		self._ended = END_CONDITIONS[end_condition]
+		self.drink_delay = drink_delay
 		self.rabbits = []
 		self.foxes = []
 		self.food = []
-		self.landcells=[]
-		self.shorecells=[]
-		self.watercells=[]
-		self.cells=allCells
+		# Steps taken, hunger and thirst fall by one step's worth on every tick
+		self.tick = 0
+		self.meters = MeterEvents()
+		# Running aggregates kept up to date on birth, death, eating and drinking
+		self.rabbit_stats = PopulationStats(lambda: self.tick)
+		self.fox_stats = PopulationStats(lambda: self.tick)
+		self.biomes = biomes
+		# Seeded from random so that random.seed() reproduces the whole run
+		self.rng = np.random.default_rng(random.getrandbits(64))
+		self.scheduler = ActivityScheduler(idle_check_interval)
+		# Step counters read by the live metrics endpoint
+		self.metrics = StepMetrics()
+		# Optional TrajectoryRecorder, fed after every step
+		self.recorder = None
+		# Optional EventLog, fed from the commit phase
+		self.events = None
 		self._classify_terrain()
-		for _ in range(20):
+		# Food grows on the land instead of spawning as objects
+		self.biomass = None
+		if food_model == "biomass":
+			self.biomass = BiomassField(biomes)
+			self.food_cap = food = 0
+		elif food_model != "objects":
+			raise ValueError("unknown food model {}, expected one of {}".format(food_model, ", ".join(FOOD_MODELS)))
+		for rand_pos in self.sample_positions(self.landcells, rabbits):
+			self.add_animal(Rabbit(self, rand_pos,self._random_speed() ))#2.5
 
-			rand_pos=random.choice(self.landcells) 	
-			self.rabbits.append(Rabbit(self, (rand_pos.x,rand_pos.y),self._random_speed() ))#2.5
+		for rand_pos in self.sample_positions(self.landcells, foxes):
+			self.add_animal(Fox(self, rand_pos, self._random_speed())) #3 self._random_pos()
 
-		for _ in range(12):
-			rand_pos=random.choice(self.landcells) 	
-			self.foxes.append(Fox(self, (rand_pos.x,rand_pos.y), self._random_speed())) #3 self._random_pos()
-
-		for _ in range(80):
-			rand_pos=random.choice(self.landcells) 
-			self.food.append(Food(self,(rand_pos.x,rand_pos.y))) #self._random_pos()
+		for rand_pos in self.sample_positions(self.landcells, food):
+			self.food.append(Food(rand_pos)) #self._random_pos()
 
 		
 		self._update_screen()
@@ -60,18 +123,34 @@ class World():
 		Advances the world by one frame
 		"""
 
+		start = perf_counter()
+		self._advance()
+		if self.recorder is not None:
+			self.recorder.record(self)
+		self.metrics.record(start, perf_counter())
+
+	def _advance(self) -> None:
+		"""
+		Moves and redraws everything for one frame
+		"""
+
 		# Add food every time frame
-		self.runtime += self._clock.get_time()
-		if (self.runtime - self.runtime_checkpoint) / 1000 >= 1 and len(self.food) < 80:
+		self.runtime += self._clock.get_time() if self._clock is not None else HEADLESS_FRAME_TIME
+		if (self.runtime - self.runtime_checkpoint) / 1000 >= 1 and len(self.food) < self.food_cap:
 			self.runtime_checkpoint = self.runtime
-			rand_pos=random.choice(self.landcells) 
-			self.food.append(Food(self,(rand_pos.x,rand_pos.y))) 
+			rand_pos=self.sample_positions(self.landcells, 1)[0]
+			self.food.append(Food(rand_pos)) 
+			self.scheduler.wake_near(self.food[-1].pos)
+		if self.biomass is not None:
+			self.biomass.grow()
 			
-		# Move all animals
-		for rabbit in self.rabbits:
-			rabbit.move()
-		for fox in self.foxes:
-			fox.move()
+		# Sense: every animal decides from the same frozen snapshot, idle ones take the cheap path
+		self.update_paces()
+		snapshot = Snapshot(self)
+		actions = [self.scheduler.decide(animal, snapshot) for animal in self.rabbits + self.foxes]
+
+		# Commit: apply all decisions at once
+		self._commit(actions)
 		
 		# Stop condition
 		if self._end_condition():
@@ -86,6 +165,9 @@ class World():
 		Draws all entities in the world to the screen
 		"""
 
+		if self.screen is None:
+			return
+
 		for rabbit in self.rabbits:
 			rabbit.draw(self.screen)
 
@@ -95,6 +177,178 @@ class World():
 		for food in self.food:
 			food.draw(self.screen)
 		
+	def _commit(self, actions: ["Action"]) -> None:
+		"""
+		Applies the decisions of one step, independent of the order they were made in
+		1) Foxes eat the Rabbits they reached, killed Rabbits do nothing else
+		2) All survivors move, then eat or graze, drink and mate
+		3) Hunger and thirst decay, starved and dehydrated animals die
+		4) Offspring join the world
+
+		Food, prey and partners claimed by several animals go to the closest
+		claimant, ties going to the lowest id (see resolve_claims).
+
+		Args:
+			actions ([Action]): One decision per living animal
+		"""
+
+		events = self.events
+		step = self.tick
+		kills = resolve_claims([a for a in actions if a.intent == Intent.EAT and isinstance(a.other, Rabbit)])
+		killed = {action.other for action in kills}
+		actions = [action for action in actions if action.animal not in killed]
+
+		for action in actions:
+			action.animal.apply(action)
+
+		for action in kills:
+			action.animal.consume()
+			if events is not None:
+				events.kill(step, action.animal, action.other)
+		self.remove_animals(killed)
+
+		meals = resolve_claims([a for a in actions if a.intent == Intent.EAT and isinstance(a.other, Food)])
+		for action in meals:
+			action.animal.consume()
+			if events is not None:
+				events.eat(step, action.animal, action.other)
+		if meals:
+			eaten = {action.other for action in meals}
+			self.food = [food for food in self.food if food not in eaten]
+
+		if self.biomass is not None:
+			# Grazers share a cell until it runs out, in id order
+			for action in sorted([a for a in actions if a.intent == Intent.GRAZE], key=lambda a: a.animal.id):
+				if self.biomass.graze(action.animal.pos):
+					action.animal.consume()
+					if events is not None:
+						events.graze(step, action.animal)
+
+		for action in actions:
+			if action.intent == Intent.DRINK:
+				action.animal.quench()
+				if events is not None:
+					events.drink(step, action.animal)
+
+		births = []
+		mated = set()
+		# A partner eaten this step can't mate any more
+		for action in resolve_claims([a for a in actions if a.intent == Intent.MATE and a.other not in killed]):
+			# A partner that already mated this step can't mate again
+			if action.animal not in mated and action.other not in mated:
+				mated.update((action.animal, action.other))
+				child = action.animal.mate(action.other)
+				births.append(child)
+				if events is not None:
+					events.birth(step, child, action.animal, action.other)
+
+		# Hunger and thirst after movement
+		dead = self._metabolize()
+		if events is not None:
+			for animal in dead:
+				events.death(step, animal, STARVED if animal.hunger <= 0 else DEHYDRATED)
+		self.remove_animals(dead)
+
+		for child in births:
+			self.add_animal(child)
+
+		# Survivors may go idle
+		for action in actions:
+			if action.animal.stats is not None:
+				self.scheduler.settle(action)
+
+	def _metabolize(self) -> set:
+		"""
+		Lets one step's worth of hunger and thirst pass, touching only the animals
+		with a due event
+
+		Returns:
+			set: Animals that starved or dehydrated
+		"""
+
+		self.tick += 1
+		dead, crossed = self.meters.due(self.tick)
+		# Idle animals look around again once they get hungry or thirsty
+		for animal in crossed:
+			self.scheduler.wake(animal)
+		return dead
+
+	def add_animal(self, animal) -> None:
+		"""
+		Adds an animal to the world and its species aggregates, and wakes its idle neighbours
+
+		Args:
+			animal (Animal): The new Rabbit or Fox
+		"""
+
+		if isinstance(animal, Rabbit):
+			self.rabbits.append(animal)
+			animal.stats = self.rabbit_stats
+		else:
+			self.foxes.append(animal)
+			animal.stats = self.fox_stats
+		animal.start_meters(self.tick)
+		animal.stats.add(animal)
+		self.meters.schedule(animal)
+		self.scheduler.wake_near(animal.pos)
+
+	def remove_animal(self, animal) -> None:
+		"""
+		Removes a dead animal from the world and its species aggregates
+
+		Args:
+			animal (Animal): The dead Rabbit or Fox
+		"""
+
+		self.remove_animals({animal})
+
+	def remove_animals(self, dead: set) -> None:
+		"""
+		Removes many dead animals at once, rebuilding each population list a single time
+
+		Args:
+			dead (set): The dead Rabbits and Foxes
+		"""
+
+		if not dead:
+			return
+		self.rabbits = [rabbit for rabbit in self.rabbits if rabbit not in dead]
+		self.foxes = [fox for fox in self.foxes if fox not in dead]
+		for animal in dead:
+			animal.stats.remove(animal)
+			animal.stats = None
+			self.scheduler.forget(animal)
+			self.meters.forget(animal)
+
+	def update_paces(self) -> None:
+		"""
+		Sets how far every animal gets this step from its speed and the terrain under it,
+		one gather from the pace raster for the whole population
+		"""
+
+		animals = self.rabbits + self.foxes
+		if not animals:
+			return
+		count = len(animals)
+		x = np.fromiter((animal.pos[0] for animal in animals), np.float64, count)
+		y = np.fromiter((animal.pos[1] for animal in animals), np.float64, count)
+		speeds = np.fromiter((animal.speed for animal in animals), np.float64, count)
+		height, width = self.paces.shape
+		rows = np.clip(y.astype(np.int64), 0, height - 1)
+		columns = np.clip(x.astype(np.int64), 0, width - 1)
+		for animal, pace in zip(animals, (speeds*self.paces[rows, columns]).tolist()):
+			animal.pace = pace
+
+	def food_amount(self) -> int:
+		"""
+		Returns:
+			int: Food objects in the world, or whole meals left in the BiomassField
+		"""
+
+		if self.biomass is not None:
+			return int(self.biomass.total() // self.biomass.bite)
+		return len(self.food)
+
 	def in_bounds(self, pos: (float, float)) -> bool:
 		"""
 		Determines if a position is valid in the world
@@ -111,6 +365,34 @@ class World():
 			0 <= pos[1] < self.size[1]
 			)
 
+	def is_water(self, pos: (float, float)) -> bool:
+		"""
+		Determines if a position lies on an ocean cell
+
+		Args:
+			pos ( (float, float) ): Position
+
+		Returns:
+			bool: True if pos is in the world and on water, False otherwise
+		"""
+
+		return self.in_bounds(pos) and self.biomes[int(pos[1]), int(pos[0])] == NoiseMapBiome.OCEAN.value
+
+	def sample_positions(self, cells: np.ndarray, count: int) -> [(int, int)]:
+		"""
+		Draws random cell positions from a terrain class in one vectorized call
+
+		Args:
+			cells (np.ndarray): Flat cell indices, e.g. self.landcells
+			count (int): Number of positions to draw
+
+		Returns:
+			[(int, int)]: Positions of the drawn cells
+		"""
+
+		y, x = np.divmod(cells[self.rng.integers(len(cells), size=count)], self.biomes.shape[1])
+		return list(zip(x.tolist(), y.tolist()))
+
 	def _end_condition(self) -> bool:
 		"""
 		Determines if the simulation is completed
@@ -119,8 +401,7 @@ class World():
 			bool: True if the world is "complete", False otherwise
 		"""
 
-		return len(self.rabbits) <= 1 or len(self.foxes) <= 0
-		# return len(self.rabbits) <= 0 or len(self.foxes) <= 0
+		return self._ended(self)
 
 	def _random_pos(self) -> (float, float):
 		"""
@@ -157,18 +438,42 @@ class World():
 			self.size,
 			len(self.rabbits),
 			len(self.foxes),
-			len(self.food)
+			self.food_amount()
 		)
 
 	
-	def _classify_terrain(self):
-		for cell in self.cells: 
-			if cell.biome==NoiseMapBiome.FOREST or cell.biome==NoiseMapBiome.GRASSLAND:
-				self.landcells.append(cell)
-			elif cell.biome==NoiseMapBiome.SHALLOWS:
-				self.shorecells.append(cell)
-			elif cell.biome==NoiseMapBiome.OCEAN:
-				self.watercells.append(cell)
-		self.cells.clear()
-	
-		
\ No newline at end of file
+	def _classify_terrain(self) -> None:
+		"""
+		Splits the biome raster into flat cell index arrays of land, shore and water,
+		and precomputes the movement pace raster
+		"""
+
+		# Speed multiplier of every cell, looked up for all animals once per step
+		self.paces = pace_raster(self.biomes)
+		flat = self.biomes.ravel()
+		self.landcells = np.flatnonzero(np.isin(flat, LAND_BIOMES)).astype(np.int32)
+		self.shorecells = np.flatnonzero(flat == NoiseMapBiome.SHALLOWS.value).astype(np.int32)
+		self.watercells = np.flatnonzero(flat == NoiseMapBiome.OCEAN.value).astype(np.int32)
+
+def resolve_claims(actions: ["Action"]) -> ["Action"]:
+	"""
+	Settles animals claiming the same food, prey or partner
+
+	The claim made from the shortest distance wins, ties go to the lowest
+	animal id, so the result does not depend on the order of actions.
+
+	Args:
+		actions ([Action]): Claims, other being the claimed entity
+
+	Returns:
+		[Action]: One winning claim per claimed entity, ordered by precedence
+	"""
+
+	ordered = sorted(actions, key=lambda action: (action.distance, action.animal.id))
+	winners = []
+	claimed = set()
+	for action in ordered:
+		if action.other not in claimed:
+			claimed.add(action.other)
+			winners.append(action)
+	return winners